@@ -0,0 +1,388 @@
+"""Utilidades de persistencia de la base de conocimiento"""
+
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import stat
+import tempfile
+from array import array
+
+# Se incrementa cuando cambia el contenido de la cache binaria
+VERSION_CACHE_BINARIA = 1
+
+
+def _permisos_para(ruta):
+    """Permisos del archivo existente o, si no existe, los que tendria un archivo nuevo"""
+    try:
+        return stat.S_IMODE(os.stat(ruta).st_mode)
+    except FileNotFoundError:
+        mascara = os.umask(0)
+        os.umask(mascara)
+        return 0o666 & ~mascara
+
+
+def _sincronizar_directorio(directorio):
+    """Asegura que el renombrado quede en disco (no disponible en todas las plataformas)"""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    descriptor = os.open(directorio, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def escribir_atomicamente(ruta, escribir, binario=False):
+    """Escribe en un temporal del mismo directorio, lo sincroniza a disco y lo renombra sobre 'ruta'"""
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    descriptor, temporal = tempfile.mkstemp(prefix=f".{os.path.basename(ruta)}.", dir=directorio)
+    try:
+        os.chmod(temporal, _permisos_para(ruta))
+        modo = 'wb' if binario else 'w'
+        with open(descriptor, modo, **({} if binario else {"encoding": "utf-8"})) as archivo:
+            escribir(archivo)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+        raise
+    _sincronizar_directorio(directorio)
+
+
+def calcular_sha256(ruta):
+    """Hash SHA-256 del contenido de un archivo"""
+    resumen = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(1 << 20), b""):
+            resumen.update(bloque)
+    return resumen.hexdigest()
+
+
+def firma_archivo(ruta):
+    """Tamano y fecha de modificacion de un archivo (None si no existe)"""
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        return None
+    return {"tamano": estado.st_size, "mtime_ns": estado.st_mtime_ns}
+
+
+class CacheBinaria:
+    """Copia precompilada (pickle) de las reglas e indices, ubicada junto al archivo JSON
+
+    Solo debe usarse con archivos de cache escritos por el propio sistema: cargar un
+    pickle ajeno puede ejecutar codigo arbitrario.
+    """
+
+    def __init__(self, ruta_cache, ruta_json):
+        self.ruta_cache = ruta_cache
+        self.ruta_json = ruta_json
+
+    def leer(self, configuracion):
+        """Devuelve el contenido guardado si sigue correspondiendo al JSON y a la configuracion, o None"""
+        firma = firma_archivo(self.ruta_json)
+        if firma is None or not os.path.exists(self.ruta_cache):
+            return None
+        try:
+            with open(self.ruta_cache, 'rb') as archivo:
+                datos = pickle.load(archivo)
+        except Exception as e:
+            print(f"Cache binaria ilegible, se ignora: {e}")
+            return None
+
+        if (not isinstance(datos, dict) or datos.get("version") != VERSION_CACHE_BINARIA
+                or datos.get("configuracion") != configuracion):
+            return None
+        guardada = datos["firma"]
+        if guardada["tamano"] == firma["tamano"] and guardada["mtime_ns"] == firma["mtime_ns"]:
+            return datos["contenido"]
+        # La fecha cambio (copia, checkout, touch): se compara el contenido
+        if guardada["tamano"] == firma["tamano"] and guardada["sha256"] == calcular_sha256(self.ruta_json):
+            self.escribir(datos["contenido"], configuracion)
+            return datos["contenido"]
+        return None
+
+    def escribir(self, contenido, configuracion):
+        """Guarda el contenido junto con la firma actual del JSON"""
+        firma = firma_archivo(self.ruta_json)
+        if firma is None:
+            return False
+        firma["sha256"] = calcular_sha256(self.ruta_json)
+        datos = {
+            "version": VERSION_CACHE_BINARIA,
+            "configuracion": configuracion,
+            "firma": firma,
+            "contenido": contenido
+        }
+        try:
+            escribir_atomicamente(
+                self.ruta_cache,
+                lambda archivo: pickle.dump(datos, archivo, protocol=pickle.HIGHEST_PROTOCOL),
+                binario=True
+            )
+            return True
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+            print(f"Error guardando la cache binaria: {e}")
+            return False
+
+
+class AlmacenTextos:
+    """Textos guardados uno tras otro en un archivo UTF-8 y leidos bajo demanda mediante mmap"""
+
+    def __init__(self, ruta, limites):
+        self.ruta = ruta
+        # El texto numero i ocupa los bytes limites[i]:limites[i + 1] del archivo
+        self._limites = limites
+        self._abrir()
+
+    @classmethod
+    def escribir(cls, ruta, textos):
+        """Escribe los textos en 'ruta' y devuelve el almacen que los lee"""
+        limites = array('Q', [0])
+
+        def volcar(archivo):
+            for texto in textos:
+                datos = texto.encode('utf-8')
+                archivo.write(datos)
+                limites.append(limites[-1] + len(datos))
+
+        escribir_atomicamente(ruta, volcar, binario=True)
+        return cls(ruta, limites)
+
+    def _abrir(self):
+        with open(self.ruta, 'rb') as archivo:
+            tamano = os.fstat(archivo.fileno()).st_size
+            if tamano != self._limites[-1]:
+                raise ValueError(f"El archivo de textos {self.ruta} no corresponde a las reglas cargadas")
+            # mmap no admite archivos vacios
+            self._mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) if tamano else b""
+
+    def texto(self, numero):
+        """Decodifica el texto numero 'numero'"""
+        return self._mapa[self._limites[numero]:self._limites[numero + 1]].decode('utf-8')
+
+    def __len__(self):
+        return len(self._limites) - 1
+
+    def __getstate__(self):
+        return {"ruta": self.ruta, "limites": self._limites}
+
+    def __setstate__(self, estado):
+        self.ruta = estado["ruta"]
+        self._limites = estado["limites"]
+        self._abrir()
+
+
+class DiarioReglas:
+    """Registro de solo anexado con los cambios de reglas desde el ultimo guardado completo
+
+    Cada linea es un objeto JSON {"operacion": "guardar", "regla": {...}} o {"operacion": "eliminar", "id": ...}.
+    Al reproducirlo, cada regla guardada reemplaza a la que tenga su mismo id o se agrega al final,
+    asi que repetirlo no duplica reglas.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+
+    def existe(self):
+        return os.path.exists(self.ruta)
+
+    def firma(self):
+        return firma_archivo(self.ruta)
+
+    def _recortar_linea_incompleta(self):
+        """Elimina el final de una escritura interrumpida para que el siguiente registro empiece en su propia linea"""
+        try:
+            with open(self.ruta, 'rb+') as archivo:
+                tamano = archivo.seek(0, os.SEEK_END)
+                if tamano == 0:
+                    return
+                archivo.seek(tamano - 1)
+                if archivo.read(1) == b"\n":
+                    return
+                archivo.seek(0)
+                contenido = archivo.read()
+                archivo.truncate(contenido.rfind(b"\n") + 1)
+                os.fsync(archivo.fileno())
+        except FileNotFoundError:
+            pass
+
+    def entradas(self):
+        """Devuelve las entradas completas del diario, saltando una ultima linea interrumpida
+
+        No modifica el archivo: la linea puede ser un registro que otro escritor esta anexando.
+        """
+        if not self.existe():
+            return []
+        entradas = []
+        with open(self.ruta, 'r', encoding='utf-8') as archivo:
+            for numero, linea in enumerate(archivo, 1):
+                if not linea.endswith("\n"):
+                    break
+                if not linea.strip():
+                    continue
+                try:
+                    entrada = json.loads(linea)
+                    if entrada["operacion"] == "guardar":
+                        entrada["regla"]["id"]
+                    elif entrada["operacion"] == "eliminar":
+                        entrada["id"]
+                    else:
+                        raise ValueError(f"operacion no reconocida: {entrada['operacion']}")
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"Entrada {numero} del diario ignorada: {e}")
+                    continue
+                entradas.append(entrada)
+        return entradas
+
+    def registrar(self, entrada, default=None):
+        """Anexa una entrada y la sincroniza a disco antes de volver
+
+        Se llama con el bloqueo del sistema tomado; solo aqui se recorta una escritura interrumpida.
+        """
+        self._recortar_linea_incompleta()
+        linea = json.dumps(entrada, ensure_ascii=False, default=default) + "\n"
+        with open(self.ruta, 'ab') as archivo:
+            archivo.write(linea.encode('utf-8'))
+            archivo.flush()
+            os.fsync(archivo.fileno())
+
+    def eliminar(self):
+        """Borra el diario una vez que su contenido ya esta en el archivo principal"""
+        try:
+            os.unlink(self.ruta)
+        except FileNotFoundError:
+            pass
+
+
+def aplicar_diario(reglas, entradas):
+    """Reproduce las entradas del diario sobre la lista de reglas (reemplazando o eliminando por id)"""
+    posiciones = {regla["id"]: posicion for posicion, regla in enumerate(reglas)}
+    eliminadas = False
+    for entrada in entradas:
+        if entrada["operacion"] == "eliminar":
+            posicion = posiciones.pop(entrada["id"], None)
+            if posicion is not None:
+                reglas[posicion] = None
+                eliminadas = True
+            continue
+        regla = entrada["regla"]
+        posicion = posiciones.get(regla["id"])
+        if posicion is None:
+            posiciones[regla["id"]] = len(reglas)
+            reglas.append(regla)
+        else:
+            reglas[posicion] = regla
+    if eliminadas:
+        return [regla for regla in reglas if regla is not None]
+    return reglas
+
+
+class _LectorJSON:
+    """Recorre un archivo JSON por bloques, decodificando valores con raw_decode a medida que llegan"""
+
+    _ESPACIOS = " \t\n\r"
+    _CIFRAS = "0123456789+-.eE"
+
+    def __init__(self, archivo, tamano_bloque):
+        self._archivo = archivo
+        self._tamano_bloque = tamano_bloque
+        self._decodificador = json.JSONDecoder()
+        self._buffer = ""
+        self._posicion = 0
+        self._fin = False
+
+    def _leer_mas(self, tamano=None):
+        """Anexa otro bloque al buffer; devuelve False si el archivo ya termino"""
+        if self._fin:
+            return False
+        bloque = self._archivo.read(tamano or self._tamano_bloque)
+        if not bloque:
+            self._fin = True
+            return False
+        # Se descarta lo ya consumido para que el buffer no crezca con el archivo
+        self._buffer = self._buffer[self._posicion:] + bloque
+        self._posicion = 0
+        return True
+
+    def siguiente_caracter(self):
+        """Salta espacios y devuelve (sin consumirlo) el siguiente caracter, o '' al final"""
+        while True:
+            buffer = self._buffer
+            posicion = self._posicion
+            while posicion < len(buffer) and buffer[posicion] in self._ESPACIOS:
+                posicion += 1
+            self._posicion = posicion
+            if posicion < len(buffer):
+                return buffer[posicion]
+            if not self._leer_mas():
+                return ""
+
+    def esperar(self, caracteres):
+        """Consume el siguiente caracter, que debe ser uno de 'caracteres'"""
+        caracter = self.siguiente_caracter()
+        if not caracter or caracter not in caracteres:
+            raise ValueError(f"JSON invalido: se esperaba {' o '.join(repr(c) for c in caracteres)}"
+                             f" y se encontro {caracter or 'el final del archivo'!r}")
+        self._posicion += 1
+        return caracter
+
+    def valor(self):
+        """Decodifica el siguiente valor completo, leyendo mas bloques si quedo cortado"""
+        self.siguiente_caracter()
+        tamano = self._tamano_bloque
+        while True:
+            try:
+                valor, fin = self._decodificador.raw_decode(self._buffer, self._posicion)
+            except json.JSONDecodeError:
+                # Puede ser un valor incompleto: se lee mas (cada vez mas, para valores grandes)
+                if not self._leer_mas(tamano):
+                    raise
+                tamano *= 2
+                continue
+            # Un numero al final del buffer podria continuar en el bloque siguiente ("1." + "5e10")
+            if (isinstance(valor, (int, float)) and not isinstance(valor, bool)
+                    and not self._buffer[fin:].lstrip(self._CIFRAS) and self._leer_mas()):
+                continue
+            self._posicion = fin
+            return valor
+
+
+def leer_reglas_json(archivo, tamano_bloque=1 << 16):
+    """Genera una a una las reglas del arreglo "reglas" de un archivo JSON, sin cargar el documento completo
+
+    El resto de las claves del objeto principal se decodifica y se descarta.
+    """
+    lector = _LectorJSON(archivo, tamano_bloque)
+    lector.esperar("{")
+    encontrada = False
+    if lector.siguiente_caracter() == "}":
+        lector.esperar("}")
+    else:
+        while True:
+            clave = lector.valor()
+            if not isinstance(clave, str):
+                raise ValueError("JSON invalido: las claves deben ser textos")
+            lector.esperar(":")
+            if clave == "reglas" and not encontrada:
+                encontrada = True
+                lector.esperar("[")
+                if lector.siguiente_caracter() == "]":
+                    lector.esperar("]")
+                else:
+                    while True:
+                        yield lector.valor()
+                        if lector.esperar(",]") == "]":
+                            break
+            else:
+                lector.valor()
+            if lector.esperar(",}") == "}":
+                break
+    if lector.siguiente_caracter():
+        raise ValueError("JSON invalido: hay contenido despues del objeto principal")
+    if not encontrada:
+        raise ValueError("El archivo JSON no contiene la clave 'reglas'")
@@ -0,0 +1,105 @@
+"""Indice invertido para buscar reglas por texto, atributo o valor sin recorrer toda la base"""
+
+import bisect
+import re
+import unicodedata
+
+_PALABRA = re.compile(r"\w+")
+
+
+def normalizar(texto):
+    """Minusculas y sin tildes, para que 'imagenes' encuentre 'Imágenes'"""
+    texto = str(texto).lower()
+    if texto.isascii():
+        return texto
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    return "".join(caracter for caracter in descompuesto if not unicodedata.combining(caracter))
+
+
+def _texto_valor(valor):
+    """Texto con el que se indexa el valor de una condicion (los booleanos como true/false)"""
+    if isinstance(valor, bool):
+        return "true" if valor else "false"
+    return normalizar(valor)
+
+
+class IndiceBusqueda:
+    """Posiciones de las reglas que contienen cada termino
+
+    Se indexan las palabras de la recomendacion, los atributos y valores de las condiciones,
+    cada par "atributo=valor" y el id como "#id". Una consulta es una lista de terminos separados
+    por espacios que deben cumplirse todos; cada uno se busca como prefijo, asi que sirve para
+    filtrar mientras se escribe:
+
+        "cnn tipo_datos=imag #1"
+    """
+
+    def __init__(self, reglas):
+        self.reglas = reglas
+        posiciones = {}
+        # Las mismas condiciones se repiten en muchas reglas: sus terminos se calculan una vez
+        terminos_condicion = {}
+        for posicion, regla in enumerate(reglas):
+            if regla is None:
+                continue
+            for termino in self._terminos(regla, terminos_condicion):
+                lista = posiciones.setdefault(termino, [])
+                # Un termino repetido en la misma regla se registra una vez
+                if not lista or lista[-1] != posicion:
+                    lista.append(posicion)
+        self._posiciones = posiciones
+        self._terminos_ordenados = sorted(posiciones)
+
+    @staticmethod
+    def _terminos(regla, terminos_condicion):
+        yield f"#{regla['id']}"
+        yield from _PALABRA.findall(normalizar(regla["recomendacion"]))
+        for atributo, valor in regla["condiciones"].items():
+            # El tipo forma parte de la clave para no confundir True con 1
+            condicion = (atributo, valor, type(valor))
+            try:
+                terminos = terminos_condicion[condicion]
+            except (KeyError, TypeError):
+                texto_atributo = normalizar(atributo)
+                texto_valor = _texto_valor(valor)
+                terminos = (f"{texto_atributo}={texto_valor}", texto_atributo, *_PALABRA.findall(texto_valor))
+                try:
+                    terminos_condicion[condicion] = terminos
+                except TypeError:
+                    # Valores no hashables (listas) no se memorizan
+                    pass
+            yield from terminos
+
+    def _con_prefijo(self, prefijo):
+        """Posiciones de las reglas con algun termino que empiece por 'prefijo'"""
+        inicio = bisect.bisect_left(self._terminos_ordenados, prefijo)
+        fin = bisect.bisect_left(self._terminos_ordenados, prefijo + "\U0010ffff")
+        terminos = self._terminos_ordenados[inicio:fin]
+        if len(terminos) == 1:
+            return set(self._posiciones[terminos[0]])
+        encontradas = set()
+        for termino in terminos:
+            encontradas.update(self._posiciones[termino])
+        return encontradas
+
+    @staticmethod
+    def _prefijos(consulta):
+        """Terminos de la consulta, normalizados igual que los indexados"""
+        for parte in normalizar(consulta).split():
+            if "=" in parte or (parte.startswith("#") and parte[1:].isdigit()):
+                yield parte
+            else:
+                yield from _PALABRA.findall(parte)
+
+    def buscar(self, consulta):
+        """Posiciones, en orden de archivo, de las reglas que cumplen todos los terminos (None si no hay terminos)"""
+        conjuntos = [self._con_prefijo(prefijo) for prefijo in self._prefijos(consulta)]
+        if not conjuntos:
+            return None
+        conjuntos.sort(key=len)
+        encontradas = conjuntos[0]
+        for conjunto in conjuntos[1:]:
+            if not encontradas:
+                break
+            encontradas &= conjunto
+        return sorted(encontradas)
@@ -0,0 +1,238 @@
+"""Catalogo declarativo de las preguntas que hacen la consola y la interfaz grafica
+
+Cada pregunta asigna un atributo de los hechos. crear_catalogo completa el catalogo base con
+los atributos y valores que aparecen en las condiciones de las reglas, asi que un atributo
+nuevo en base_conocimiento.json se pregunta en ambas interfaces sin cambiar codigo.
+"""
+
+
+def _clave_valor(valor):
+    """Clave de un valor de opcion que no confunde True con 1"""
+    return type(valor), valor
+
+
+def etiqueta_valor(valor):
+    """Texto que se muestra para un valor sin etiqueta en el catalogo base"""
+    if isinstance(valor, bool):
+        return "Sí" if valor else "No"
+    return str(valor).replace("_", " ").capitalize()
+
+
+class Pregunta:
+    """Pregunta de opcion multiple sobre un atributo; cada opcion es (etiqueta, valor)
+
+    Una opcion con valor None se puede elegir pero no registra ningun hecho. Con 'tipo_datos'
+    la pregunta solo se hace para ese tipo de datos.
+    """
+
+    __slots__ = ("atributo", "titulo", "texto", "opciones", "obligatoria", "tipo_datos", "indicacion",
+                 "_valores_por_etiqueta", "_indices_por_valor")
+
+    def __init__(self, atributo, titulo, texto, opciones, obligatoria=False, tipo_datos=None,
+                 indicacion="Seleccione una opción..."):
+        self.atributo = atributo
+        self.titulo = titulo
+        self.texto = texto
+        self.opciones = tuple(opciones)
+        self.obligatoria = obligatoria
+        self.tipo_datos = tipo_datos
+        # Texto de la primera entrada (sin respuesta) de los combos de la interfaz grafica
+        self.indicacion = indicacion
+        self._valores_por_etiqueta = {etiqueta: valor for etiqueta, valor in self.opciones}
+        self._indices_por_valor = {}
+        for indice, (_, valor) in enumerate(self.opciones):
+            if valor is not None:
+                self._indices_por_valor.setdefault(_clave_valor(valor), indice)
+
+    def etiquetas(self):
+        return [etiqueta for etiqueta, _ in self.opciones]
+
+    def valor(self, etiqueta):
+        """Valor de la opcion con esa etiqueta"""
+        return self._valores_por_etiqueta[etiqueta]
+
+    def indice(self, valor):
+        """Indice de la opcion con ese valor, o None si la pregunta no lo ofrece"""
+        return self._indices_por_valor.get(_clave_valor(valor))
+
+    def valores(self):
+        """Valores que puede registrar la pregunta, sin repetir y en orden"""
+        return [self.opciones[indice][1] for indice in self._indices_por_valor.values()]
+
+    def con_valores(self, valores):
+        """Copia de la pregunta con una opcion mas por cada valor que todavia no ofrece"""
+        nuevas = [(etiqueta_valor(valor), valor) for valor in valores if self.indice(valor) is None]
+        if not nuevas:
+            return self
+        return Pregunta(self.atributo, self.titulo, self.texto, self.opciones + tuple(nuevas),
+                        self.obligatoria, self.tipo_datos, self.indicacion)
+
+    def __repr__(self):
+        return f"Pregunta({self.atributo!r}, tipo_datos={self.tipo_datos!r})"
+
+
+PREGUNTAS = (
+    Pregunta("tipo_datos", "Tipo de Datos", "¿Qué tipo de datos tiene?", [
+        ("Imágenes (fotos, dibujos, etc.)", "imagenes"),
+        ("Texto (documentos, mensajes, etc.)", "texto"),
+        ("Series Temporales (datos con orden temporal)", "series_temporales"),
+        ("Datos Tabulares (tablas, hojas de cálculo)", "tabular"),
+        ("Audio (sonidos, voz, música)", "audio"),
+    ], obligatoria=True, indicacion="Seleccione el tipo de datos..."),
+    Pregunta("tamano_dataset", "Tamaño del Dataset", "¿Qué tamaño tiene su dataset?", [
+        ("Muy pequeño (menos de 1,000 muestras)", "muy_pequeno"),
+        ("Pequeño (1,000 - 10,000 muestras)", "pequeno"),
+        ("Medio (10,000 - 100,000 muestras)", "medio"),
+        ("Grande (100,000 - 1,000,000 muestras)", "grande"),
+        ("Muy grande (más de 1,000,000 muestras)", "muy_grande"),
+    ], obligatoria=True, indicacion="Seleccione el tamaño..."),
+    Pregunta("recursos_computacionales", "Recursos Computacionales",
+             "¿Qué recursos computacionales tiene disponibles?", [
+                 ("Muy bajos (solo CPU básico)", "muy_bajo"),
+                 ("Bajos (CPU bueno, sin GPU)", "bajo"),
+                 ("Medios (GPU básica o limitada)", "medio"),
+                 ("Altos (GPU buena, como RTX 3080/4090)", "alto"),
+                 ("Muy altos (múltiples GPUs, servidores)", "muy_alto"),
+             ], obligatoria=True, indicacion="Seleccione los recursos..."),
+    Pregunta("tarea", "Tarea Principal", "¿Cuál es la tarea principal que quiere realizar?", [
+        ("Clasificación (categorizar en clases)", "clasificacion"),
+        ("Regresión (predecir valores numéricos)", "regresion"),
+        ("Segmentación (dividir en partes)", "segmentacion"),
+        ("Detección (encontrar objetos)", "deteccion"),
+        ("Generación (crear nuevo contenido)", "generacion"),
+        ("Reconocimiento de voz", "reconocimiento_voz"),
+    ], indicacion="Seleccione la tarea..."),
+    Pregunta("longitud_texto", "Características del Texto", "¿Qué longitud tienen sus textos?", [
+        ("Corto (menos de 128 palabras/tokens)", "corto"),
+        ("Medio (128-512 palabras/tokens)", "medio"),
+        ("Largo (más de 512 palabras/tokens)", "largo"),
+    ], tipo_datos="texto", indicacion="Seleccione la longitud..."),
+    Pregunta("patrones_temporales", "Patrones Temporales", "¿Qué tipo de patrones temporales espera encontrar?", [
+        ("Simples (patrones fáciles de identificar)", "simples"),
+        ("Complejos (múltiples patrones entrelazados)", "complejos"),
+        ("Largos (dependencias de largo plazo)", "largos"),
+    ], tipo_datos="series_temporales", indicacion="Seleccione los patrones..."),
+    Pregunta("relaciones_no_lineales", "Relaciones entre Variables",
+             "¿Espera encontrar relaciones complejas entre las variables?", [
+                 ("Sí, hay relaciones complejas y no lineales", True),
+                 ("No, las relaciones son simples o lineales", False),
+             ], tipo_datos="tabular"),
+    # Solo el reconocimiento de voz corresponde a una tarea de las reglas
+    Pregunta("tarea", "Tipo de Audio", "¿Qué tipo de tarea desea realizar con el audio?", [
+        ("Reconocimiento de voz", "reconocimiento_voz"),
+        ("Clasificación de sonidos", None),
+        ("Generación de audio", None),
+        ("Separación de fuentes", None),
+    ], tipo_datos="audio", indicacion="Seleccione la tarea..."),
+    Pregunta("requiere_interpretabilidad", "Interpretabilidad", "¿Requiere que el modelo sea interpretable?", [
+        ("Sí, es importante entender cómo el modelo toma decisiones", True),
+        ("No, el rendimiento es más importante que la explicabilidad", False),
+    ]),
+)
+
+
+class CatalogoPreguntas:
+    """Preguntas en el orden en que se hacen, con los recorridos por tipo de datos ya calculados"""
+
+    def __init__(self, preguntas):
+        self.preguntas = tuple(preguntas)
+        self.pregunta_tipo = next(pregunta for pregunta in self.preguntas if pregunta.atributo == "tipo_datos")
+        self._especificas = {}
+        for pregunta in self.preguntas:
+            if pregunta.tipo_datos is not None:
+                self._especificas.setdefault(pregunta.tipo_datos, []).append(pregunta)
+        self._dominios = {}
+
+    def tipos_datos(self):
+        return self.pregunta_tipo.valores()
+
+    def generales(self):
+        """Preguntas que se hacen para cualquier tipo de datos"""
+        return [pregunta for pregunta in self.preguntas if pregunta.tipo_datos is None]
+
+    def especificas(self, tipo_datos):
+        """Preguntas adicionales de un tipo de datos"""
+        return self._especificas.get(tipo_datos, [])
+
+    def para_tipo(self, tipo_datos):
+        """Preguntas que se hacen, en orden, cuando el tipo de datos es 'tipo_datos'"""
+        return [pregunta for pregunta in self.preguntas if pregunta.tipo_datos in (None, tipo_datos)]
+
+    def dominio(self, tipo_datos):
+        """Valores posibles de cada atributo para un tipo de datos; None si puede quedar sin responder"""
+        dominio = self._dominios.get(tipo_datos)
+        if dominio is None:
+            dominio = {}
+            for pregunta in self.para_tipo(tipo_datos):
+                valores = dominio.setdefault(pregunta.atributo, [])
+                sin_respuesta = pregunta.obligatoria is False or any(valor is None for _, valor in pregunta.opciones)
+                if pregunta.atributo == "tipo_datos":
+                    valores[:] = [tipo_datos]
+                    continue
+                for valor in ([None] if sin_respuesta else []) + pregunta.valores():
+                    if not any(_clave_valor(valor) == _clave_valor(otro) for otro in valores):
+                        valores.append(valor)
+            self._dominios[tipo_datos] = dominio
+        return dominio
+
+    def combinaciones(self, tipo_datos):
+        """Cantidad de combinaciones de respuestas posibles para un tipo de datos"""
+        cantidad = 1
+        for valores in self.dominio(tipo_datos).values():
+            cantidad *= len(valores)
+        return cantidad
+
+    def a_json(self):
+        """Resumen de lo que puede responderse, para comprobar que una tabla guardada sigue vigente"""
+        return [[pregunta.atributo, pregunta.tipo_datos, pregunta.obligatoria, pregunta.valores()]
+                for pregunta in self.preguntas]
+
+
+def crear_catalogo(reglas=()):
+    """Catalogo base completado con los atributos y valores que usan las condiciones de las reglas
+
+    Los valores nuevos de un atributo ya preguntado se agregan como opciones de su primera
+    pregunta. Un atributo sin pregunta recibe una opcional, especifica del tipo de datos si
+    todas las reglas que lo mencionan exigen el mismo tipo.
+    """
+    valores = {}
+    tipos = {}
+    for regla in reglas:
+        if regla is None:
+            continue
+        condiciones = regla["condiciones"]
+        for atributo, valor in condiciones.items():
+            try:
+                clave = _clave_valor(valor)
+                valores.setdefault(atributo, {}).setdefault(clave, valor)
+            except TypeError:
+                # Una lista no es una respuesta de opcion multiple
+                continue
+            tipos.setdefault(atributo, set()).add(condiciones.get("tipo_datos"))
+
+    preguntas = []
+    completados = set()
+    for pregunta in PREGUNTAS:
+        if pregunta.atributo in valores and pregunta.atributo not in completados:
+            completados.add(pregunta.atributo)
+            pregunta = pregunta.con_valores(valores[pregunta.atributo].values())
+        preguntas.append(pregunta)
+
+    # Las especificas nuevas van junto a las demas especificas, asi ambas interfaces las hacen en el mismo orden
+    posicion_especificas = max(i for i, pregunta in enumerate(preguntas) if pregunta.tipo_datos is not None) + 1
+    especificas = []
+    for atributo, valores_atributo in valores.items():
+        if atributo in completados:
+            continue
+        tipos_atributo = tipos[atributo]
+        tipo_datos = next(iter(tipos_atributo)) if len(tipos_atributo) == 1 else None
+        titulo = etiqueta_valor(atributo)
+        opciones = [(etiqueta_valor(valor), valor) for valor in valores_atributo.values()]
+        pregunta = Pregunta(atributo, titulo, f"¿{titulo}?", opciones, tipo_datos=tipo_datos)
+        (preguntas if tipo_datos is None else especificas).append(pregunta)
+    preguntas[posicion_especificas:posicion_especificas] = especificas
+    return CatalogoPreguntas(preguntas)
+
+
+# Catalogo sin reglas, para quien no tiene una base de conocimiento a mano
+CATALOGO_BASE = crear_catalogo()
@@ -0,0 +1,93 @@
+"""Importacion masiva de reglas desde archivos JSON Lines o CSV, guardando la base una sola vez"""
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+from sistema_experto import SistemaExpertoDL
+
+# Columnas del CSV que no son condiciones
+COLUMNAS_REGLA = ("id", "recomendacion", "justificacion", "confianza")
+
+
+def leer_reglas_jsonl(entrada):
+    """Genera una regla por cada linea no vacia de la entrada"""
+    for numero, linea in enumerate(entrada, 1):
+        if not linea.strip():
+            continue
+        try:
+            yield json.loads(linea)
+        except ValueError as e:
+            raise ValueError(f"JSON invalido en la linea {numero}: {e}") from None
+
+
+def _valor_condicion(texto):
+    """Las celdas true/false se interpretan como booleanos; el resto se conserva como texto"""
+    minusculas = texto.strip().lower()
+    if minusculas == "true":
+        return True
+    if minusculas == "false":
+        return False
+    return texto.strip()
+
+
+def leer_reglas_csv(entrada):
+    """Genera una regla por fila; las columnas distintas de COLUMNAS_REGLA son condiciones (celda vacia = sin condicion)"""
+    lector = csv.DictReader(entrada)
+    faltantes = [columna for columna in COLUMNAS_REGLA[1:] if columna not in (lector.fieldnames or ())]
+    if faltantes:
+        raise ValueError(f"Faltan las columnas: {', '.join(faltantes)}")
+    for fila in lector:
+        try:
+            confianza = float(fila["confianza"])
+        except (TypeError, ValueError):
+            raise ValueError(f"Confianza invalida en la linea {lector.line_num}: {fila['confianza']!r}") from None
+        yield {
+            "condiciones": {
+                columna: _valor_condicion(valor) for columna, valor in fila.items()
+                if columna not in COLUMNAS_REGLA and columna is not None and valor and valor.strip()
+            },
+            "recomendacion": fila["recomendacion"],
+            "justificacion": fila["justificacion"],
+            "confianza": confianza
+        }
+
+
+def leer_reglas(entrada, formato):
+    """Lector de reglas para el formato indicado ('jsonl' o 'csv')"""
+    if formato == "csv":
+        return leer_reglas_csv(entrada)
+    if formato == "jsonl":
+        return leer_reglas_jsonl(entrada)
+    raise ValueError(f"Formato desconocido: {formato} (opciones: jsonl, csv)")
+
+
+def main(argumentos=None):
+    """Punto de entrada de la linea de comandos"""
+    parser = argparse.ArgumentParser(description="Agrega a la base de conocimiento las reglas de un archivo JSONL o CSV")
+    parser.add_argument("entrada", help="Archivo con una regla por linea ('-' para la entrada estandar)")
+    parser.add_argument("-b", "--base", default="base_conocimiento.json", help="Archivo de la base de conocimiento")
+    parser.add_argument("-f", "--formato", choices=("jsonl", "csv"),
+                        help="Formato de la entrada (por defecto se deduce de la extension)")
+    args = parser.parse_args(argumentos)
+
+    formato = args.formato or ("csv" if os.path.splitext(args.entrada)[1].lower() == ".csv" else "jsonl")
+    # Los mensajes del sistema van a stderr, igual que en procesar_lote.py
+    with contextlib.redirect_stdout(sys.stderr):
+        sistema = SistemaExpertoDL(args.base)
+        try:
+            if args.entrada == "-":
+                guardado = sistema.agregar_reglas_lote(leer_reglas(sys.stdin, formato))
+            else:
+                with open(args.entrada, 'r', encoding='utf-8', newline='') as entrada:
+                    guardado = sistema.agregar_reglas_lote(leer_reglas(entrada, formato))
+        except (OSError, ValueError) as e:
+            print(f"No se importo ninguna regla: {e}")
+            return 1
+    return 0 if guardado else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
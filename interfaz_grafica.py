@@ -1,14 +1,27 @@
 import sys
 import json
+import html
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, 
                              QWidget, QLabel, QComboBox, QPushButton, QTextEdit, 
                              QGroupBox, QScrollArea, QFrame, QProgressBar,
-                             QTabWidget, QListWidget, QListWidgetItem, QMessageBox,
-                             QCheckBox, QSpinBox, QSlider)
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal
-from PyQt5.QtGui import QFont, QPalette, QColor, QIcon
+                             QTabWidget, QMessageBox, QLineEdit,
+                             QCheckBox, QSpinBox, QSlider, QListView, QStyledItemDelegate)
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal, QAbstractListModel, QModelIndex, QRect, QSize
+from PyQt5.QtGui import QFont, QPalette, QColor, QIcon, QPainter, QFontMetrics
 from sistema_experto import SistemaExpertoDL
 
+# Recomendaciones que se muestran de una vez; el resto se pide con "Mostrar más"
+RESULTADOS_POR_PAGINA = 10
+
+# Filas que la lista de reglas agrega cada vez que se desplaza hasta el final
+REGLAS_POR_LOTE = 200
+
+# Milisegundos sin escribir antes de filtrar la lista de reglas
+ESPERA_FILTRO_MS = 200
+
+# Milisegundos sin cambios en el formulario antes de recalcular la vista previa
+ESPERA_VISTA_PREVIA_MS = 150
+
 class StyledComboBox(QComboBox):
     """ComboBox con estilo personalizado"""
     def __init__(self, parent=None):
@@ -88,71 +101,265 @@ class QuestionGroup(QGroupBox):
             }
         """)
 
-class ResultCard(QFrame):
-    """Tarjeta para mostrar resultados"""
-    def __init__(self, resultado, parent=None):
+def colores_confianza(confianza):
+    """Colores de texto y fondo para un porcentaje de confianza"""
+    if confianza > 80:
+        return "#28a745", "#d4edda"
+    if confianza > 60:
+        return "#ffc107", "#fff3cd"
+    return "#dc3545", "#f8d7da"
+
+class ModeloResultados(QAbstractListModel):
+    """Lista de recomendaciones; cada fila es el diccionario devuelto por la inferencia"""
+    
+    def __init__(self, parent=None):
         super().__init__(parent)
-        self.resultado = resultado
-        self.setup_ui()
-        
-    def setup_ui(self):
-        self.setFrameStyle(QFrame.StyledPanel)
-        self.setStyleSheet("""
-            QFrame {
-                background-color: #f8f9fa;
-                border: 1px solid #dee2e6;
-                border-radius: 8px;
-                padding: 16px;
-                margin: 8px 0px;
-            }
-        """)
-        
-        layout = QVBoxLayout()
+        self.recomendaciones = []
         
-        # Header con técnica y confianza
-        header_layout = QHBoxLayout()
-        
-        tecnica_label = QLabel(self.resultado['tecnica'])
-        tecnica_label.setStyleSheet("font-size: 16px; font-weight: bold; color: #212529;")
-        tecnica_label.setWordWrap(True)
-        
-        confianza = self.resultado['confianza'] * 100
-        confianza_label = QLabel(f"{confianza:.1f}%")
-        confianza_label.setStyleSheet(f"""
-            font-size: 14px; 
-            font-weight: bold; 
-            color: {'#28a745' if confianza > 80 else '#ffc107' if confianza > 60 else '#dc3545'};
-            background-color: {'#d4edda' if confianza > 80 else '#fff3cd' if confianza > 60 else '#f8d7da'};
-            border-radius: 12px;
-            padding: 4px 12px;
-        """)
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.recomendaciones)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        resultado = self.recomendaciones[index.row()]
+        if role == Qt.DisplayRole:
+            return resultado['tecnica']
+        if role == Qt.UserRole:
+            return resultado
+        return None
+    
+    def reemplazar(self, recomendaciones):
+        """Cambia las filas en su lugar: solo se repintan las distintas y se agregan o quitan las que sobran"""
+        anteriores = self.recomendaciones
+        comunes = min(len(anteriores), len(recomendaciones))
+        distintas = [fila for fila in range(comunes) if anteriores[fila] != recomendaciones[fila]]
+        
+        if len(recomendaciones) < len(anteriores):
+            self.beginRemoveRows(QModelIndex(), comunes, len(anteriores) - 1)
+            self.recomendaciones = list(recomendaciones)
+            self.endRemoveRows()
+        elif len(recomendaciones) > len(anteriores):
+            self.beginInsertRows(QModelIndex(), comunes, len(recomendaciones) - 1)
+            self.recomendaciones = list(recomendaciones)
+            self.endInsertRows()
+        else:
+            self.recomendaciones = list(recomendaciones)
+        if distintas:
+            self.dataChanged.emit(self.index(distintas[0]), self.index(distintas[-1]))
         
-        header_layout.addWidget(tecnica_label)
-        header_layout.addWidget(confianza_label)
-        layout.addLayout(header_layout)
+    def agregar(self, recomendaciones):
+        """Agrega filas al final (la página siguiente de resultados)"""
+        if not recomendaciones:
+            return
+        inicio = len(self.recomendaciones)
+        self.beginInsertRows(QModelIndex(), inicio, inicio + len(recomendaciones) - 1)
+        self.recomendaciones.extend(recomendaciones)
+        self.endInsertRows()
+
+class ModeloReglas(QAbstractListModel):
+    """Reglas de la pestaña de información; las filas se crean por lotes a medida que se desplaza la lista"""
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.reglas = []
+        self.cargadas = 0
         
-        # Justificación
-        justificacion_label = QLabel(self.resultado['justificacion'])
-        justificacion_label.setStyleSheet("font-size: 14px; color: #6c757d; margin-top: 8px;")
-        justificacion_label.setWordWrap(True)
-        layout.addWidget(justificacion_label)
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.cargadas
+    
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.cargadas < len(self.reglas)
+    
+    def fetchMore(self, parent=QModelIndex()):
+        cantidad = min(REGLAS_POR_LOTE, len(self.reglas) - self.cargadas)
+        if parent.isValid() or cantidad <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.cargadas, self.cargadas + cantidad - 1)
+        self.cargadas += cantidad
+        self.endInsertRows()
+        
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        regla = self.reglas[index.row()]
+        if role == Qt.DisplayRole:
+            return f"Regla #{regla['id']}: {regla['recomendacion']}"
+        if role == Qt.UserRole:
+            # Se guarda el id para buscar la regla directamente al seleccionarla
+            return regla['id']
+        return None
+    
+    def establecer_reglas(self, reglas):
+        """Reemplaza las reglas; la vista vuelve a pedir solo el primer lote"""
+        self.beginResetModel()
+        self.reglas = reglas
+        self.cargadas = 0
+        self.endResetModel()
+
+class DelegadoResultado(QStyledItemDelegate):
+    """Pinta cada recomendación como una tarjeta, sin crear widgets por fila"""
+    
+    MARGEN = 8
+    RELLENO = 16
+    SEPARACION = 8
+    
+    def _fuentes(self, base):
+        """Fuentes de la técnica, la confianza, la justificación y el número de regla"""
+        fuentes = []
+        for tamano, negrita in ((16, True), (14, True), (14, False), (12, False)):
+            fuente = QFont(base)
+            fuente.setPixelSize(tamano)
+            fuente.setBold(negrita)
+            fuentes.append(fuente)
+        return fuentes
+    
+    def _disposicion(self, base, ancho, resultado):
+        """Rectángulos de cada parte de la tarjeta, relativos a su esquina, y alto total de la fila"""
+        fuente_tecnica, fuente_confianza, fuente_justificacion, fuente_regla = self._fuentes(base)
+        interior = ancho - 2 * (self.MARGEN + self.RELLENO)
+        izquierda = self.MARGEN + self.RELLENO
+        arriba = self.MARGEN + self.RELLENO
+        
+        texto_confianza = f"{resultado['confianza'] * 100:.1f}%"
+        metricas = QFontMetrics(fuente_confianza)
+        pastilla = QRect(0, arriba, metricas.horizontalAdvance(texto_confianza) + 24, metricas.height() + 8)
+        pastilla.moveRight(izquierda + interior - 1)
+        
+        tecnica = QFontMetrics(fuente_tecnica).boundingRect(
+            QRect(izquierda, arriba, max(1, interior - pastilla.width() - self.SEPARACION), 0),
+            Qt.TextWordWrap, resultado['tecnica'])
+        encabezado = max(tecnica.bottom(), pastilla.bottom()) + 1
+        justificacion = QFontMetrics(fuente_justificacion).boundingRect(
+            QRect(izquierda, encabezado + self.SEPARACION, max(1, interior), 0),
+            Qt.TextWordWrap, resultado['justificacion'])
+        regla = QRect(izquierda, justificacion.bottom() + 1 + self.SEPARACION,
+                      max(1, interior), QFontMetrics(fuente_regla).height())
+        alto = regla.bottom() + 1 + self.RELLENO + self.MARGEN
+        return {"tecnica": tecnica, "confianza": pastilla, "texto_confianza": texto_confianza,
+                "justificacion": justificacion, "regla": regla, "alto": alto}
+    
+    def sizeHint(self, option, index):
+        ancho = self.parent().viewport().width()
+        return QSize(ancho, self._disposicion(option.font, ancho, index.data(Qt.UserRole))["alto"])
+    
+    def paint(self, painter, option, index):
+        resultado = index.data(Qt.UserRole)
+        caja = self._disposicion(option.font, option.rect.width(), resultado)
+        fuente_tecnica, fuente_confianza, fuente_justificacion, fuente_regla = self._fuentes(option.font)
+        color_texto, color_fondo = colores_confianza(resultado['confianza'] * 100)
+        
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.translate(option.rect.topLeft())
+        
+        tarjeta = QRect(0, 0, option.rect.width(), option.rect.height()).adjusted(
+            self.MARGEN, self.MARGEN, -self.MARGEN, -self.MARGEN)
+        painter.setPen(QColor("#dee2e6"))
+        painter.setBrush(QColor("#f8f9fa"))
+        painter.drawRoundedRect(tarjeta, 8, 8)
+        
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(color_fondo))
+        painter.drawRoundedRect(caja["confianza"], 12, 12)
+        painter.setPen(QColor(color_texto))
+        painter.setFont(fuente_confianza)
+        painter.drawText(caja["confianza"], Qt.AlignCenter, caja["texto_confianza"])
+        
+        painter.setPen(QColor("#212529"))
+        painter.setFont(fuente_tecnica)
+        painter.drawText(caja["tecnica"], Qt.TextWordWrap, resultado['tecnica'])
+        
+        painter.setPen(QColor("#6c757d"))
+        painter.setFont(fuente_justificacion)
+        painter.drawText(caja["justificacion"], Qt.TextWordWrap, resultado['justificacion'])
+        
+        painter.setPen(QColor("#adb5bd"))
+        painter.setFont(fuente_regla)
+        painter.drawText(caja["regla"], Qt.AlignLeft, f"Regla aplicada: #{resultado['regla_id']}")
+        painter.restore()
+
+class HiloInferencia(QThread):
+    """Calcula una página de recomendaciones fuera del hilo de la interfaz"""
+    
+    # Número de consulta, recomendaciones y cursor para la página siguiente (None al terminar)
+    resultados_listos = pyqtSignal(int, list, object)
+    fallo = pyqtSignal(int, str)
+    
+    def __init__(self, sistema, numero, hechos, cursor=0, parent=None):
+        super().__init__(parent)
+        self.sistema = sistema
+        self.numero = numero
+        self.hechos = hechos
+        self.cursor = cursor
         
-        # Regla ID
-        regla_label = QLabel(f"Regla aplicada: #{self.resultado['regla_id']}")
-        regla_label.setStyleSheet("font-size: 12px; color: #adb5bd; margin-top: 8px;")
-        layout.addWidget(regla_label)
+    def run(self):
+        try:
+            # Una consulta reemplazada se abandona en la siguiente etapa y libera el sistema para la nueva
+            resultado = self.sistema.inferir_pagina(self.hechos, RESULTADOS_POR_PAGINA, self.cursor,
+                                                    cancelado=self.isInterruptionRequested)
+        except Exception as e:
+            if not self.isInterruptionRequested():
+                self.fallo.emit(self.numero, str(e))
+            return
+        # Una consulta reemplazada por otra no entrega resultados
+        if resultado is not None and not self.isInterruptionRequested():
+            recomendaciones, cursor = resultado
+            self.resultados_listos.emit(self.numero, recomendaciones, cursor)
+
+class HiloVistaPrevia(QThread):
+    """Calcula las recomendaciones parciales del formulario fuera del hilo de la interfaz"""
+    
+    # Número de vista previa, mejores recomendaciones y reglas que aún pueden cumplirse
+    vista_previa_lista = pyqtSignal(int, list, int)
+    
+    def __init__(self, sistema, numero, hechos, parent=None):
+        super().__init__(parent)
+        self.sistema = sistema
+        self.numero = numero
+        self.hechos = hechos
         
-        self.setLayout(layout)
+    def run(self):
+        try:
+            recomendaciones, posibles = self.sistema.vista_previa(self.hechos)
+        except Exception:
+            # La vista previa es orientativa; los errores se informan al analizar
+            return
+        if not self.isInterruptionRequested():
+            self.vista_previa_lista.emit(self.numero, recomendaciones, posibles)
 
 class InterfazSistemaExperto(QMainWindow):
     """Interfaz gráfica principal del sistema experto"""
     
+    # Se emite desde el hilo de vigilancia; Qt entrega la señal en el hilo de la interfaz
+    reglas_recargadas = pyqtSignal()
+    
     def __init__(self):
         super().__init__()
-        self.sistema = SistemaExpertoDL("base_conocimiento.json")
+        self.sistema = SistemaExpertoDL("base_conocimiento.json", cache_binaria=True)
         self.hechos_actuales = {}
+        self.cursor_resultados = None
+        # Cada inferencia lleva un número; solo se muestran los resultados de la última
+        self.numero_consulta = 0
+        self.hilo_inferencia = None
+        self.continuando_resultados = False
+        self.numero_vista_previa = 0
         self.setup_ui()
         
+        # Recargar la base cuando alguien modifique el archivo de reglas
+        self.reglas_recargadas.connect(self.on_reglas_recargadas)
+        self.sistema.vigilar_cambios(al_recargar=self.reglas_recargadas.emit)
+        
+    def closeEvent(self, event):
+        """Detiene la vigilancia del archivo de reglas y las inferencias en curso al cerrar la ventana"""
+        self.sistema.detener_vigilancia()
+        self.cancelar_inferencia()
+        # Qt no permite destruir un QThread que sigue corriendo
+        for hilo in self.findChildren(QThread):
+            hilo.requestInterruption()
+            hilo.wait()
+        super().closeEvent(event)
+        
     def setup_ui(self):
         self.setWindowTitle("Sistema Experto - Recomendación de Técnicas de Aprendizaje Profundo")
         self.setGeometry(100, 100, 1200, 800)
@@ -224,6 +431,22 @@ class InterfazSistemaExperto(QMainWindow):
         scroll_area.setWidget(scroll_widget)
         layout.addWidget(scroll_area)
         
+        # Vista previa: las reglas más probables según lo respondido hasta ahora
+        grupo_vista_previa = QuestionGroup("Vista Previa")
+        layout_vista_previa = QVBoxLayout()
+        self.label_vista_previa = QLabel()
+        self.label_vista_previa.setWordWrap(True)
+        layout_vista_previa.addWidget(self.label_vista_previa)
+        grupo_vista_previa.setLayout(layout_vista_previa)
+        layout.addWidget(grupo_vista_previa)
+        
+        # Se recalcula cuando el usuario deja de cambiar respuestas, no en cada cambio
+        self.temporizador_vista_previa = QTimer(self)
+        self.temporizador_vista_previa.setSingleShot(True)
+        self.temporizador_vista_previa.setInterval(ESPERA_VISTA_PREVIA_MS)
+        self.temporizador_vista_previa.timeout.connect(self.actualizar_vista_previa)
+        self.mostrar_vista_previa([], None)
+        
         # Barra de progreso
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
@@ -254,126 +477,60 @@ class InterfazSistemaExperto(QMainWindow):
         self.tab_widget.addTab(consulta_widget, "🏠 Consulta")
         
     def setup_preguntas(self):
-        """Configura todas las preguntas del formulario"""
-        
-        # 1. Tipo de datos
-        grupo_tipo = QuestionGroup("1. Tipo de Datos")
-        layout_tipo = QVBoxLayout()
-        
-        self.combo_tipo = StyledComboBox()
-        self.combo_tipo.addItems([
-            "Seleccione el tipo de datos...",
-            "Imágenes (fotos, dibujos, etc.)",
-            "Texto (documentos, mensajes, etc.)", 
-            "Series Temporales (datos con orden temporal)",
-            "Datos Tabulares (tablas, hojas de cálculo)",
-            "Audio (sonidos, voz, música)"
-        ])
-        self.combo_tipo.currentIndexChanged.connect(self.on_tipo_datos_changed)
-        
-        layout_tipo.addWidget(QLabel("¿Qué tipo de datos tiene?"))
-        layout_tipo.addWidget(self.combo_tipo)
-        grupo_tipo.setLayout(layout_tipo)
-        self.preguntas_layout.addWidget(grupo_tipo)
-        
-        # 2. Tamaño del dataset
-        grupo_tamano = QuestionGroup("2. Tamaño del Dataset")
-        layout_tamano = QVBoxLayout()
-        
-        self.combo_tamano = StyledComboBox()
-        self.combo_tamano.addItems([
-            "Seleccione el tamaño...",
-            "Muy pequeño (menos de 1,000 muestras)",
-            "Pequeño (1,000 - 10,000 muestras)",
-            "Medio (10,000 - 100,000 muestras)", 
-            "Grande (100,000 - 1,000,000 muestras)",
-            "Muy grande (más de 1,000,000 muestras)"
-        ])
-        
-        layout_tamano.addWidget(QLabel("¿Qué tamaño tiene su dataset?"))
-        layout_tamano.addWidget(self.combo_tamano)
-        grupo_tamano.setLayout(layout_tamano)
-        self.preguntas_layout.addWidget(grupo_tamano)
-        
-        # 3. Recursos computacionales
-        grupo_recursos = QuestionGroup("3. Recursos Computacionales")
-        layout_recursos = QVBoxLayout()
-        
-        self.combo_recursos = StyledComboBox()
-        self.combo_recursos.addItems([
-            "Seleccione los recursos...",
-            "Muy bajos (solo CPU básico)",
-            "Bajos (CPU bueno, sin GPU)",
-            "Medios (GPU básica o limitada)",
-            "Altos (GPU buena, como RTX 3080/4090)",
-            "Muy altos (múltiples GPUs, servidores)"
-        ])
-        
-        layout_recursos.addWidget(QLabel("¿Qué recursos computacionales tiene disponibles?"))
-        layout_recursos.addWidget(self.combo_recursos)
-        grupo_recursos.setLayout(layout_recursos)
-        self.preguntas_layout.addWidget(grupo_recursos)
-        
-        # 4. Tarea principal
-        grupo_tarea = QuestionGroup("4. Tarea Principal (Opcional)")
-        layout_tarea = QVBoxLayout()
-        
-        self.combo_tarea = StyledComboBox()
-        self.combo_tarea.addItems([
-            "Seleccione la tarea...",
-            "Clasificación (categorizar en clases)",
-            "Regresión (predecir valores numéricos)",
-            "Segmentación (dividir en partes)",
-            "Detección (encontrar objetos)",
-            "Generación (crear nuevo contenido)",
-            "Reconocimiento de voz"
-        ])
-        
-        layout_tarea.addWidget(QLabel("¿Cuál es la tarea principal que quiere realizar?"))
-        layout_tarea.addWidget(self.combo_tarea)
-        grupo_tarea.setLayout(layout_tarea)
-        self.preguntas_layout.addWidget(grupo_tarea)
-        
-        # 5. Preguntas específicas (se muestran dinámicamente)
-        self.grupo_especifico = QuestionGroup("5. Características Específicas")
+        """Construye el formulario a partir del catálogo de preguntas de la base de conocimiento"""
+        self.catalogo = self.sistema.catalogo_preguntas()
+        # (pregunta, combo) de las preguntas generales y de las del tipo de datos elegido
+        self.combos_preguntas = []
+        self.combos_especificos = []
+        self.grupo_especifico = None
+        
+        numero = 0
+        for pregunta in self.catalogo.preguntas:
+            if pregunta.tipo_datos is not None:
+                # Las preguntas específicas comparten un grupo, en el lugar de la primera
+                if self.grupo_especifico is None:
+                    numero += 1
+                    self.agregar_grupo_especifico(numero)
+                continue
+            
+            numero += 1
+            titulo = f"{numero}. {pregunta.titulo}" + ("" if pregunta.obligatoria else " (Opcional)")
+            grupo = QuestionGroup(titulo)
+            layout_grupo = QVBoxLayout()
+            combo = self.crear_combo_pregunta(pregunta)
+            layout_grupo.addWidget(QLabel(pregunta.texto))
+            layout_grupo.addWidget(combo)
+            grupo.setLayout(layout_grupo)
+            self.preguntas_layout.addWidget(grupo)
+            self.combos_preguntas.append((pregunta, combo))
+            if pregunta is self.catalogo.pregunta_tipo:
+                self.combo_tipo = combo
+                self.combo_tipo.currentIndexChanged.connect(self.on_tipo_datos_changed)
+        
+        if self.grupo_especifico is None:
+            self.agregar_grupo_especifico(numero + 1)
+        
+        # Espaciador
+        self.preguntas_layout.addStretch()
+        
+    def agregar_grupo_especifico(self, numero):
+        """Agrega el grupo (oculto) donde se muestran las preguntas del tipo de datos elegido"""
+        self.numero_especifico = numero
+        self.grupo_especifico = QuestionGroup(f"{numero}. Características Específicas")
         self.layout_especifico = QVBoxLayout()
         self.grupo_especifico.setLayout(self.layout_especifico)
         self.grupo_especifico.setVisible(False)
         self.preguntas_layout.addWidget(self.grupo_especifico)
         
-        # 6. Interpretabilidad
-        grupo_interpretabilidad = QuestionGroup("6. Interpretabilidad (Opcional)")
-        layout_interpretabilidad = QVBoxLayout()
-        
-        self.check_interpretabilidad = QCheckBox("¿Requiere que el modelo sea interpretable?")
-        self.check_interpretabilidad.setStyleSheet("""
-            QCheckBox {
-                font-size: 14px;
-                color: #495057;
-                spacing: 8px;
-            }
-            QCheckBox::indicator {
-                width: 18px;
-                height: 18px;
-            }
-            QCheckBox::indicator:unchecked {
-                border: 2px solid #6c757d;
-                border-radius: 3px;
-                background-color: white;
-            }
-            QCheckBox::indicator:checked {
-                border: 2px solid #007bff;
-                border-radius: 3px;
-                background-color: #007bff;
-            }
-        """)
-        
-        layout_interpretabilidad.addWidget(self.check_interpretabilidad)
-        grupo_interpretabilidad.setLayout(layout_interpretabilidad)
-        self.preguntas_layout.addWidget(grupo_interpretabilidad)
-        
-        # Espaciador
-        self.preguntas_layout.addStretch()
+    def crear_combo_pregunta(self, pregunta):
+        """Combo con las opciones de una pregunta; cada opción guarda su valor como userData"""
+        combo = StyledComboBox()
+        # La primera entrada indica que la pregunta no se ha respondido
+        combo.addItem(pregunta.indicacion, None)
+        for etiqueta, valor in pregunta.opciones:
+            combo.addItem(etiqueta, valor)
+        combo.currentIndexChanged.connect(self.programar_vista_previa)
+        return combo
         
     def setup_preguntas_especificas(self, tipo_datos):
         """Configura preguntas específicas según el tipo de datos"""
@@ -382,66 +539,20 @@ class InterfazSistemaExperto(QMainWindow):
             widget = self.layout_especifico.itemAt(i).widget()
             if widget:
                 widget.deleteLater()
+        self.combos_especificos = []
         
-        if tipo_datos == "texto":
-            self.grupo_especifico.setTitle("5. Características del Texto")
-            
-            label = QLabel("¿Qué longitud tienen sus textos?")
-            self.layout_especifico.addWidget(label)
-            
-            self.combo_longitud = StyledComboBox()
-            self.combo_longitud.addItems([
-                "Seleccione la longitud...",
-                "Corto (menos de 128 palabras/tokens)",
-                "Medio (128-512 palabras/tokens)", 
-                "Largo (más de 512 palabras/tokens)"
-            ])
-            self.layout_especifico.addWidget(self.combo_longitud)
-            
-        elif tipo_datos == "series_temporales":
-            self.grupo_especifico.setTitle("5. Patrones Temporales")
-            
-            label = QLabel("¿Qué tipo de patrones temporales espera encontrar?")
-            self.layout_especifico.addWidget(label)
-            
-            self.combo_patrones = StyledComboBox()
-            self.combo_patrones.addItems([
-                "Seleccione los patrones...",
-                "Simples (patrones fáciles de identificar)",
-                "Complejos (múltiples patrones entrelazados)",
-                "Largos (dependencias de largo plazo)"
-            ])
-            self.layout_especifico.addWidget(self.combo_patrones)
-            
-        elif tipo_datos == "tabular":
-            self.grupo_especifico.setTitle("5. Relaciones entre Variables")
-            
-            label = QLabel("¿Espera encontrar relaciones complejas entre las variables?")
-            self.layout_especifico.addWidget(label)
-            
-            self.combo_relaciones = StyledComboBox()
-            self.combo_relaciones.addItems([
-                "Seleccione una opción...",
-                "Sí, hay relaciones complejas y no lineales",
-                "No, las relaciones son simples o lineales"
-            ])
-            self.layout_especifico.addWidget(self.combo_relaciones)
-            
-        elif tipo_datos == "audio":
-            self.grupo_especifico.setTitle("5. Tipo de Audio")
-            
-            label = QLabel("¿Qué tipo de tarea desea realizar con el audio?")
-            self.layout_especifico.addWidget(label)
-            
-            self.combo_tarea_audio = StyledComboBox()
-            self.combo_tarea_audio.addItems([
-                "Seleccione la tarea...",
-                "Reconocimiento de voz",
-                "Clasificación de sonidos",
-                "Generación de audio",
-                "Separación de fuentes"
-            ])
-            self.layout_especifico.addWidget(self.combo_tarea_audio)
+        preguntas = self.catalogo.especificas(tipo_datos)
+        if not preguntas:
+            self.grupo_especifico.setVisible(False)
+            return
+        
+        titulo = preguntas[0].titulo if len(preguntas) == 1 else "Características Específicas"
+        self.grupo_especifico.setTitle(f"{self.numero_especifico}. {titulo}")
+        for pregunta in preguntas:
+            combo = self.crear_combo_pregunta(pregunta)
+            self.layout_especifico.addWidget(QLabel(pregunta.texto))
+            self.layout_especifico.addWidget(combo)
+            self.combos_especificos.append((pregunta, combo))
         
         self.grupo_especifico.setVisible(True)
         
@@ -462,22 +573,65 @@ class InterfazSistemaExperto(QMainWindow):
         self.label_resumen.setWordWrap(True)
         layout.addWidget(self.label_resumen)
         
-        # Área de scroll para resultados
-        self.scroll_resultados = QScrollArea()
-        self.scroll_resultados.setWidgetResizable(True)
-        self.widget_resultados = QWidget()
-        self.layout_resultados = QVBoxLayout(self.widget_resultados)
-        self.scroll_resultados.setWidget(self.widget_resultados)
-        
-        layout.addWidget(self.scroll_resultados)
+        self.label_sin_resultados = QLabel(
+            "No se encontraron recomendaciones específicas para las características proporcionadas.\n\n"
+            "Sugerencia: Intente ajustar algunos parámetros o consulte con un experto en aprendizaje profundo."
+        )
+        self.label_sin_resultados.setStyleSheet("font-size: 16px; color: #6c757d; text-align: center; padding: 40px;")
+        self.label_sin_resultados.setAlignment(Qt.AlignCenter)
+        self.label_sin_resultados.setVisible(False)
+        layout.addWidget(self.label_sin_resultados)
+        
+        self.titulo_recomendaciones = QLabel("Técnicas Recomendadas:")
+        self.titulo_recomendaciones.setStyleSheet("font-size: 20px; font-weight: bold; color: #212529; margin: 20px 0px 10px 0px;")
+        self.titulo_recomendaciones.setVisible(False)
+        layout.addWidget(self.titulo_recomendaciones)
+        
+        # Lista virtual: solo se pintan las tarjetas visibles
+        self.modelo_resultados = ModeloResultados(self)
+        self.lista_resultados = QListView()
+        self.lista_resultados.setModel(self.modelo_resultados)
+        self.lista_resultados.setItemDelegate(DelegadoResultado(self.lista_resultados))
+        self.lista_resultados.setVerticalScrollMode(QListView.ScrollPerPixel)
+        self.lista_resultados.setResizeMode(QListView.Adjust)
+        self.lista_resultados.setSelectionMode(QListView.NoSelection)
+        self.lista_resultados.setFrameShape(QFrame.NoFrame)
+        self.lista_resultados.setVisible(False)
+        layout.addWidget(self.lista_resultados)
+        
+        # Botón para pedir la siguiente página
+        self.btn_mostrar_mas = StyledButton("Mostrar más recomendaciones")
+        self.btn_mostrar_mas.clicked.connect(self.mostrar_mas_resultados)
+        self.btn_mostrar_mas.setVisible(False)
+        layout.addWidget(self.btn_mostrar_mas)
+        
+        # Recomendación principal
+        self.label_principal = QLabel()
+        self.label_principal.setStyleSheet("font-size: 18px; font-weight: bold; color: #28a745; margin: 20px 0px; padding: 15px; background-color: #d4edda; border-radius: 8px;")
+        self.label_principal.setAlignment(Qt.AlignCenter)
+        self.label_principal.setVisible(False)
+        layout.addWidget(self.label_principal)
         
         resultados_widget.setLayout(layout)
         self.tab_widget.addTab(resultados_widget, "📊 Resultados")
         
     def setup_info_tab(self):
-        """Configura la pestaña de información del sistema"""
-        info_widget = QWidget()
-        layout = QVBoxLayout()
+        """Agrega la pestaña de información; su contenido se construye la primera vez que se abre"""
+        self.info_widget = QWidget()
+        self.info_widget.setLayout(QVBoxLayout())
+        self.info_construida = False
+        self.tab_widget.addTab(self.info_widget, "ℹ️ Información")
+        self.tab_widget.currentChanged.connect(self.on_tab_changed)
+        
+    def on_tab_changed(self, indice):
+        """Construye la pestaña de información al abrirla por primera vez"""
+        if not self.info_construida and self.tab_widget.widget(indice) is self.info_widget:
+            self.construir_info_tab()
+        
+    def construir_info_tab(self):
+        """Crea el contenido de la pestaña de información del sistema"""
+        self.info_construida = True
+        layout = self.info_widget.layout()
         
         # Título
         titulo = QLabel("Información del Sistema Experto")
@@ -490,7 +644,8 @@ class InterfazSistemaExperto(QMainWindow):
         stats_layout = QVBoxLayout()
         
         stats_layout.addWidget(QLabel(f"Base de conocimiento: {self.sistema.archivo_base_conocimiento}"))
-        stats_layout.addWidget(QLabel(f"Reglas cargadas: {len(self.sistema.reglas)}"))
+        self.label_reglas_cargadas = QLabel()
+        stats_layout.addWidget(self.label_reglas_cargadas)
         
         stats_group.setLayout(stats_layout)
         layout.addWidget(stats_group)
@@ -499,190 +654,190 @@ class InterfazSistemaExperto(QMainWindow):
         reglas_group = QuestionGroup("Reglas Disponibles")
         reglas_layout = QVBoxLayout()
         
-        self.lista_reglas = QListWidget()
-        for regla in self.sistema.reglas:
-            item_text = f"Regla #{regla['id']}: {regla['recomendacion']}"
-            item = QListWidgetItem(item_text)
-            self.lista_reglas.addItem(item)
-        
+        self.filtro_reglas = QLineEdit()
+        self.filtro_reglas.setPlaceholderText("Buscar por texto, atributo=valor o #id (ej.: cnn tipo_datos=imagenes)")
+        self.filtro_reglas.setClearButtonEnabled(True)
+        # Se filtra cuando el usuario deja de escribir, no en cada tecla
+        self.temporizador_filtro = QTimer(self)
+        self.temporizador_filtro.setSingleShot(True)
+        self.temporizador_filtro.setInterval(ESPERA_FILTRO_MS)
+        self.temporizador_filtro.timeout.connect(self.actualizar_info_reglas)
+        self.filtro_reglas.textChanged.connect(self.temporizador_filtro.start)
+        
+        self.modelo_reglas = ModeloReglas(self)
+        self.lista_reglas = QListView()
+        self.lista_reglas.setModel(self.modelo_reglas)
+        self.lista_reglas.setUniformItemSizes(True)
+        self.lista_reglas.selectionModel().currentChanged.connect(self.mostrar_detalle_regla)
+        
+        self.detalle_regla = QLabel("Seleccione una regla para ver su detalle")
+        self.detalle_regla.setWordWrap(True)
+        self.detalle_regla.setStyleSheet("color: #495057; padding: 8px;")
+        
+        reglas_layout.addWidget(self.filtro_reglas)
         reglas_layout.addWidget(self.lista_reglas)
+        reglas_layout.addWidget(self.detalle_regla)
         reglas_group.setLayout(reglas_layout)
         layout.addWidget(reglas_group)
         
-        info_widget.setLayout(layout)
-        self.tab_widget.addTab(info_widget, "ℹ️ Información")
+        self.actualizar_info_reglas()
+        
+    def actualizar_info_reglas(self):
+        """Muestra la cantidad de reglas cargadas y las que cumplen el filtro actual"""
+        if not self.info_construida:
+            return
+        consulta = self.filtro_reglas.text()
+        reglas = self.sistema.buscar_reglas(consulta)
+        texto = f"Reglas cargadas: {self.sistema.cantidad_reglas()}"
+        if consulta.strip():
+            texto += f" (coinciden con la búsqueda: {len(reglas)})"
+        self.label_reglas_cargadas.setText(texto)
+        self.modelo_reglas.establecer_reglas(reglas)
+        
+    def on_reglas_recargadas(self):
+        """Refleja en la interfaz una base de conocimiento recargada desde disco"""
+        self.actualizar_info_reglas()
+        self.programar_vista_previa()
+        # Las páginas siguientes saldrían de otra base, así que se deja de ofrecer "Mostrar más"
+        if self.continuando_resultados:
+            self.cancelar_inferencia()
+        self.btn_mostrar_mas.setVisible(False)
+        self.cursor_resultados = None
+        self.statusBar().showMessage("Base de conocimiento actualizada desde el archivo", 5000)
+        
+    def mostrar_detalle_regla(self, actual, _anterior=None):
+        """Muestra condiciones, confianza y justificacion de la regla seleccionada"""
+        regla = self.sistema.obtener_regla(actual.data(Qt.UserRole)) if actual.isValid() else None
+        if regla is None:
+            self.detalle_regla.setText("Seleccione una regla para ver su detalle")
+            return
+        condiciones = ", ".join(f"{atributo} = {valor}" for atributo, valor in regla['condiciones'].items())
+        self.detalle_regla.setText(
+            f"<b>{html.escape(regla['recomendacion'])}</b> (confianza {regla['confianza']*100:.1f}%)<br>"
+            f"Condiciones: {html.escape(condiciones) or 'ninguna'}<br>"
+            f"Justificación: {html.escape(regla['justificacion'])}"
+        )
+        
+    def programar_vista_previa(self, *_):
+        """Reinicia la espera antes de recalcular la vista previa"""
+        self.temporizador_vista_previa.start()
+        
+    def actualizar_vista_previa(self):
+        """Calcula en segundo plano las mejores recomendaciones para las respuestas actuales"""
+        hechos = self.recolectar_hechos()
+        self.numero_vista_previa += 1
+        if not hechos:
+            self.mostrar_vista_previa([], None)
+            return
+        hilo = HiloVistaPrevia(self.sistema, self.numero_vista_previa, hechos, self)
+        hilo.vista_previa_lista.connect(self.on_vista_previa_lista)
+        hilo.finished.connect(hilo.deleteLater)
+        hilo.start()
+        
+    def on_vista_previa_lista(self, numero, recomendaciones, posibles):
+        """Muestra la vista previa si corresponde a las respuestas actuales"""
+        if numero == self.numero_vista_previa:
+            self.mostrar_vista_previa(recomendaciones, posibles)
+        
+    def mostrar_vista_previa(self, recomendaciones, posibles):
+        """Actualiza el panel de vista previa (posibles es None mientras no haya respuestas)"""
+        if posibles is None:
+            self.label_vista_previa.setText("Responda las preguntas para ver aquí las recomendaciones más probables.")
+            return
+        lineas = [
+            f"• <b>{html.escape(rec['tecnica'])}</b> ({rec['confianza']*100:.1f}%)"
+            for rec in recomendaciones
+        ] or ["Todavía ninguna regla se cumple con las respuestas dadas."]
+        lineas.append(f"<span style='color: #6c757d;'>Reglas que aún pueden cumplirse: {posibles}</span>")
+        self.label_vista_previa.setText("<br>".join(lineas))
         
     def on_tipo_datos_changed(self, index):
         """Maneja el cambio en el tipo de datos"""
-        if index > 0:
-            tipo_texto = self.combo_tipo.currentText()
-            tipos = {
-                "Imágenes (fotos, dibujos, etc.)": "imagenes",
-                "Texto (documentos, mensajes, etc.)": "texto",
-                "Series Temporales (datos con orden temporal)": "series_temporales",
-                "Datos Tabulares (tablas, hojas de cálculo)": "tabular",
-                "Audio (sonidos, voz, música)": "audio"
-            }
-            tipo_datos = tipos[tipo_texto]
-            self.setup_preguntas_especificas(tipo_datos)
-        else:
-            self.grupo_especifico.setVisible(False)
+        # Sin tipo elegido no hay preguntas específicas y el grupo se oculta
+        self.setup_preguntas_especificas(self.combo_tipo.currentData())
             
     def limpiar_formulario(self):
         """Limpia todo el formulario"""
-        self.combo_tipo.setCurrentIndex(0)
-        self.combo_tamano.setCurrentIndex(0)
-        self.combo_recursos.setCurrentIndex(0)
-        self.combo_tarea.setCurrentIndex(0)
-        self.check_interpretabilidad.setChecked(False)
+        for _, combo in self.combos_preguntas:
+            combo.setCurrentIndex(0)
         self.grupo_especifico.setVisible(False)
         
         QMessageBox.information(self, "Formulario Limpiado", 
                               "Todos los campos han sido restablecidos.")
         
     def recolectar_hechos(self):
-        """Recolecta los hechos del formulario"""
+        """Recolecta los hechos del formulario a partir del valor guardado en cada opción"""
         hechos = {}
-        
-        # Tipo de datos
-        if self.combo_tipo.currentIndex() > 0:
-            tipo_texto = self.combo_tipo.currentText()
-            tipos = {
-                "Imágenes (fotos, dibujos, etc.)": "imagenes",
-                "Texto (documentos, mensajes, etc.)": "texto",
-                "Series Temporales (datos con orden temporal)": "series_temporales",
-                "Datos Tabulares (tablas, hojas de cálculo)": "tabular",
-                "Audio (sonidos, voz, música)": "audio"
-            }
-            hechos["tipo_datos"] = tipos[tipo_texto]
-        
-        # Tamaño del dataset
-        if self.combo_tamano.currentIndex() > 0:
-            tamano_texto = self.combo_tamano.currentText()
-            tamanos = {
-                "Muy pequeño (menos de 1,000 muestras)": "muy_pequeno",
-                "Pequeño (1,000 - 10,000 muestras)": "pequeno",
-                "Medio (10,000 - 100,000 muestras)": "medio",
-                "Grande (100,000 - 1,000,000 muestras)": "grande",
-                "Muy grande (más de 1,000,000 muestras)": "muy_grande"
-            }
-            hechos["tamano_dataset"] = tamanos[tamano_texto]
-        
-        # Recursos computacionales
-        if self.combo_recursos.currentIndex() > 0:
-            recursos_texto = self.combo_recursos.currentText()
-            recursos = {
-                "Muy bajos (solo CPU básico)": "muy_bajo",
-                "Bajos (CPU bueno, sin GPU)": "bajo",
-                "Medios (GPU básica o limitada)": "medio",
-                "Altos (GPU buena, como RTX 3080/4090)": "alto",
-                "Muy altos (múltiples GPUs, servidores)": "muy_alto"
-            }
-            hechos["recursos_computacionales"] = recursos[recursos_texto]
-        
-        # Tarea principal
-        if self.combo_tarea.currentIndex() > 0:
-            tarea_texto = self.combo_tarea.currentText()
-            tareas = {
-                "Clasificación (categorizar en clases)": "clasificacion",
-                "Regresión (predecir valores numéricos)": "regresion",
-                "Segmentación (dividir en partes)": "segmentacion",
-                "Detección (encontrar objetos)": "deteccion",
-                "Generación (crear nuevo contenido)": "generacion",
-                "Reconocimiento de voz": "reconocimiento_voz"
-            }
-            hechos["tarea"] = tareas[tarea_texto]
-        
-        # Preguntas específicas
-        if self.grupo_especifico.isVisible():
-            tipo_datos = hechos.get("tipo_datos", "")
-            
-            if tipo_datos == "texto" and hasattr(self, 'combo_longitud'):
-                if self.combo_longitud.currentIndex() > 0:
-                    longitud_texto = self.combo_longitud.currentText()
-                    longitudes = {
-                        "Corto (menos de 128 palabras/tokens)": "corto",
-                        "Medio (128-512 palabras/tokens)": "medio",
-                        "Largo (más de 512 palabras/tokens)": "largo"
-                    }
-                    hechos["longitud_texto"] = longitudes[longitud_texto]
-                    
-            elif tipo_datos == "series_temporales" and hasattr(self, 'combo_patrones'):
-                if self.combo_patrones.currentIndex() > 0:
-                    patrones_texto = self.combo_patrones.currentText()
-                    patrones = {
-                        "Simples (patrones fáciles de identificar)": "simples",
-                        "Complejos (múltiples patrones entrelazados)": "complejos",
-                        "Largos (dependencias de largo plazo)": "largos"
-                    }
-                    hechos["patrones_temporales"] = patrones[patrones_texto]
-                    
-            elif tipo_datos == "tabular" and hasattr(self, 'combo_relaciones'):
-                if self.combo_relaciones.currentIndex() > 0:
-                    relaciones_texto = self.combo_relaciones.currentText()
-                    hechos["relaciones_no_lineales"] = relaciones_texto.startswith("Sí")
-                    
-            elif tipo_datos == "audio" and hasattr(self, 'combo_tarea_audio'):
-                if self.combo_tarea_audio.currentIndex() > 0:
-                    tarea_audio_texto = self.combo_tarea_audio.currentText()
-                    if tarea_audio_texto == "Reconocimiento de voz":
-                        hechos["tarea"] = "reconocimiento_voz"
-        
-        # Interpretabilidad
-        if self.check_interpretabilidad.isChecked():
-            hechos["requiere_interpretabilidad"] = True
-        
+        # Las preguntas específicas van al final: pueden precisar un atributo general (la tarea en audio)
+        for pregunta, combo in self.combos_preguntas + self.combos_especificos:
+            valor = combo.currentData()
+            if valor is not None:
+                hechos[pregunta.atributo] = valor
         return hechos
         
     def realizar_analisis(self):
         """Realiza el análisis y muestra los resultados"""
         # Validar campos obligatorios
-        if (self.combo_tipo.currentIndex() == 0 or 
-            self.combo_tamano.currentIndex() == 0 or 
-            self.combo_recursos.currentIndex() == 0):
-            
+        faltantes = [pregunta.titulo for pregunta, combo in self.combos_preguntas
+                     if pregunta.obligatoria and combo.currentIndex() == 0]
+        if faltantes:
             QMessageBox.warning(self, "Campos Incompletos", 
-                              "Por favor complete los campos obligatorios:\n"
-                              "- Tipo de datos\n"
-                              "- Tamaño del dataset\n" 
-                              "- Recursos computacionales")
+                              "Por favor complete los campos obligatorios:\n" +
+                              "\n".join(f"- {titulo}" for titulo in faltantes))
             return
         
-        # Mostrar progreso
-        self.progress_bar.setVisible(True)
-        self.progress_bar.setRange(0, 0)  # Progress bar indeterminado
-        
         # Recolectar hechos
         self.hechos_actuales = self.recolectar_hechos()
+        self.iniciar_inferencia()
+        
+    def iniciar_inferencia(self, cursor=0):
+        """Lanza en segundo plano la página de resultados que empieza en 'cursor', cancelando la anterior"""
+        self.cancelar_inferencia()
+        self.numero_consulta += 1
+        self.continuando_resultados = cursor > 0
+        hilo = HiloInferencia(self.sistema, self.numero_consulta, dict(self.hechos_actuales), cursor, self)
+        hilo.resultados_listos.connect(self.on_resultados_listos)
+        hilo.fallo.connect(self.on_fallo_inferencia)
+        hilo.finished.connect(hilo.deleteLater)
+        self.hilo_inferencia = hilo
+        
+        # La barra queda visible solo mientras el hilo trabaja
+        self.progress_bar.setRange(0, 0)  # Progress bar indeterminado
+        self.progress_bar.setVisible(True)
+        hilo.start()
         
-        # Simular procesamiento (en una aplicación real, esto sería asíncrono)
-        QTimer.singleShot(1000, self.procesar_analisis)
+    def cancelar_inferencia(self):
+        """Descarta la inferencia en curso, si hay una; su hilo termina sin entregar resultados"""
+        if self.hilo_inferencia is not None:
+            self.hilo_inferencia.requestInterruption()
+            self.hilo_inferencia = None
+            self.progress_bar.setVisible(False)
         
-    def procesar_analisis(self):
-        """Procesa el análisis después del delay simulado"""
-        try:
-            # Realizar inferencia
-            recomendaciones = self.sistema.inferir(self.hechos_actuales)
-            
-            # Mostrar resultados
+    def on_resultados_listos(self, numero, recomendaciones, cursor):
+        """Recibe en el hilo de la interfaz la página calculada por HiloInferencia"""
+        if numero != self.numero_consulta:
+            return
+        self.hilo_inferencia = None
+        self.progress_bar.setVisible(False)
+        self.cursor_resultados = cursor
+        if self.continuando_resultados:
+            self.agregar_resultados(recomendaciones)
+        else:
             self.mostrar_resultados(recomendaciones)
-            
             # Cambiar a pestaña de resultados
             self.tab_widget.setCurrentIndex(1)
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Ocurrió un error durante el análisis:\n{str(e)}")
-        finally:
-            self.progress_bar.setVisible(False)
+        
+    def on_fallo_inferencia(self, numero, mensaje):
+        """Informa un error de la inferencia en curso"""
+        if numero != self.numero_consulta:
+            return
+        self.hilo_inferencia = None
+        self.progress_bar.setVisible(False)
+        self.btn_mostrar_mas.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Ocurrió un error durante el análisis:\n{mensaje}")
             
     def mostrar_resultados(self, recomendaciones):
-        """Muestra los resultados en la pestaña correspondiente"""
-        # Limpiar resultados anteriores
-        for i in reversed(range(self.layout_resultados.count())):
-            widget = self.layout_resultados.itemAt(i).widget()
-            if widget:
-                widget.deleteLater()
-        
+        """Muestra los resultados en la pestaña correspondiente, actualizando la lista en su lugar"""
         # Mostrar resumen de características
         resumen_texto = "Características analizadas:\n"
         for clave, valor in self.hechos_actuales.items():
@@ -690,36 +845,40 @@ class InterfazSistemaExperto(QMainWindow):
             if isinstance(valor, bool):
                 valor_str = "Sí" if valor else "No"
             else:
-                valor_str = valor.replace('_', ' ').title()
+                # Los atributos tomados de las reglas pueden tener valores numéricos
+                valor_str = str(valor).replace('_', ' ').title()
             resumen_texto += f"• {nombre_bonito}: {valor_str}\n"
         
         self.label_resumen.setText(resumen_texto)
         
         # Mostrar recomendaciones
-        if not recomendaciones:
-            no_results_label = QLabel(
-                "No se encontraron recomendaciones específicas para las características proporcionadas.\n\n"
-                "Sugerencia: Intente ajustar algunos parámetros o consulte con un experto en aprendizaje profundo."
-            )
-            no_results_label.setStyleSheet("font-size: 16px; color: #6c757d; text-align: center; padding: 40px;")
-            no_results_label.setAlignment(Qt.AlignCenter)
-            self.layout_resultados.addWidget(no_results_label)
-        else:
-            # Título de recomendaciones
-            titulo_recomendaciones = QLabel("Técnicas Recomendadas:")
-            titulo_recomendaciones.setStyleSheet("font-size: 20px; font-weight: bold; color: #212529; margin: 20px 0px 10px 0px;")
-            self.layout_resultados.addWidget(titulo_recomendaciones)
+        self.modelo_resultados.reemplazar(recomendaciones)
+        hay_resultados = bool(recomendaciones)
+        self.label_sin_resultados.setVisible(not hay_resultados)
+        self.titulo_recomendaciones.setVisible(hay_resultados)
+        self.lista_resultados.setVisible(hay_resultados)
+        self.label_principal.setVisible(hay_resultados)
+        if hay_resultados:
+            self.label_principal.setText(f"🎯 Recomendación Principal: {recomendaciones[0]['tecnica']}")
+            self.lista_resultados.scrollToTop()
+        self.actualizar_boton_mostrar_mas()
             
-            # Mostrar cada recomendación
-            for i, rec in enumerate(recomendaciones, 1):
-                result_card = ResultCard(rec)
-                self.layout_resultados.addWidget(result_card)
+    def actualizar_boton_mostrar_mas(self):
+        """El botón solo se ofrece mientras queden páginas por pedir"""
+        self.btn_mostrar_mas.setVisible(self.cursor_resultados is not None)
+        self.btn_mostrar_mas.setEnabled(True)
             
-            # Recomendación principal
-            recomendacion_principal = QLabel(f"🎯 Recomendación Principal: {recomendaciones[0]['tecnica']}")
-            recomendacion_principal.setStyleSheet("font-size: 18px; font-weight: bold; color: #28a745; margin: 20px 0px; padding: 15px; background-color: #d4edda; border-radius: 8px;")
-            recomendacion_principal.setAlignment(Qt.AlignCenter)
-            self.layout_resultados.addWidget(recomendacion_principal)
+    def mostrar_mas_resultados(self):
+        """Pide en segundo plano la siguiente página de recomendaciones"""
+        if self.cursor_resultados is None:
+            return
+        self.btn_mostrar_mas.setEnabled(False)
+        self.iniciar_inferencia(self.cursor_resultados)
+        
+    def agregar_resultados(self, recomendaciones):
+        """Agrega una página de recomendaciones al final de la lista"""
+        self.modelo_resultados.agregar(recomendaciones)
+        self.actualizar_boton_mostrar_mas()
 
 def main():
     """Función principal para ejecutar la aplicación"""
@@ -1,5 +1,9 @@
 from sistema_experto import SistemaExpertoDL
-from interfaz_grafica import main as gui_main
+
+def iniciar_interfaz_grafica():
+    """Importa la interfaz grafica (y PyQt5) solo cuando se elige usarla"""
+    from interfaz_grafica import main as gui_main
+    gui_main()
 
 def mostrar_bienvenida():
     """Muestra el mensaje de bienvenida"""
@@ -10,9 +14,32 @@ def mostrar_bienvenida():
     print("aprendizaje profundo segun las caracteristicas de su dataset.")
     print("\nSolo responda las preguntas una por una cuando se le solicite.")
 
+def mostrar_detalle_reglas(sistema):
+    """Muestra el detalle de las reglas que el usuario pida por numero"""
+    while True:
+        respuesta = input("\nIngrese el numero de una regla para ver su detalle (Enter para continuar): ").strip()
+        if not respuesta:
+            return
+        try:
+            regla = sistema.obtener_regla(int(respuesta.lstrip("#")))
+        except ValueError:
+            print("ERROR: Por favor, ingrese un numero valido")
+            continue
+        if regla is None:
+            print(f"No existe la regla #{respuesta}")
+            continue
+        print(f"\nRegla #{regla['id']}: {regla['recomendacion']}")
+        print(f"   Confianza: {regla['confianza']*100:.1f}%")
+        print(f"   Justificacion: {regla['justificacion']}")
+        print("   Condiciones:")
+        for atributo, valor in regla["condiciones"].items():
+            print(f"     - {atributo}: {valor}")
+
 def main_consola():
     """Versión de consola del sistema"""
-    sistema = SistemaExpertoDL("base_conocimiento.json")
+    sistema = SistemaExpertoDL("base_conocimiento.json", cache_binaria=True)
+    # Los cambios al archivo de reglas se cargan en segundo plano sin reiniciar
+    sistema.vigilar_cambios()
     
     while True:
         mostrar_bienvenida()
@@ -51,15 +78,17 @@ def main_consola():
             print("INFORMACION DEL SISTEMA")
             print("="*60)
             print(f"Base de conocimiento: {sistema.archivo_base_conocimiento}")
-            print(f"Reglas cargadas: {len(sistema.reglas)}")
+            print(f"Reglas cargadas: {sistema.cantidad_reglas()}")
             print("\nReglas disponibles:")
             for regla in sistema.reglas:
                 print(f"  - Regla #{regla['id']}: {regla['recomendacion']}")
-            input("\nPresione Enter para continuar...")
+            mostrar_detalle_reglas(sistema)
                 
         elif opcion == "3":
             print("\nIniciando interfaz grafica...")
-            gui_main()
+            # La interfaz grafica crea su propio sistema y vigila los mismos archivos
+            sistema.detener_vigilancia()
+            iniciar_interfaz_grafica()
             break
             
         elif opcion == "4":
@@ -80,6 +109,6 @@ if __name__ == "__main__":
     
     if eleccion == "2":
         print("\nIniciando interfaz gráfica...")
-        gui_main()
+        iniciar_interfaz_grafica()
     else:
         main_consola()
\ No newline at end of file
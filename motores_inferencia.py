@@ -0,0 +1,551 @@
+"""Motores de emparejamiento de reglas para el sistema experto"""
+
+import heapq
+
+
+def _mascara_desde_posiciones(posiciones, total):
+    """Construye un entero cuyos bits encendidos son las posiciones dadas"""
+    bits = bytearray((total + 7) // 8)
+    for posicion in posiciones:
+        bits[posicion >> 3] |= 1 << (posicion & 7)
+    return int.from_bytes(bits, "little")
+
+
+def _posiciones_desde_mascara(mascara):
+    """Devuelve en orden creciente las posiciones de los bits encendidos"""
+    # bin() invierte el orden de los bits; se recorre la cadena en C con find()
+    bits = bin(mascara)[:1:-1]
+    posiciones = []
+    posicion = bits.find("1")
+    while posicion != -1:
+        posiciones.append(posicion)
+        posicion = bits.find("1", posicion + 1)
+    return posiciones
+
+
+def cumple_condiciones(condiciones, hechos):
+    """Evalua si los hechos cumplen todas las condiciones de una regla"""
+    for clave, valor in condiciones.items():
+        if clave not in hechos:
+            return False
+        if hechos[clave] != valor:
+            return False
+    return True
+
+
+# Centinela para atributos ausentes: no es igual a ningun valor de condicion
+_FALTA = object()
+
+
+def _nunca(hechos):
+    """Predicado de las posiciones que quedaron libres al eliminar una regla"""
+    return False
+
+
+class EstadisticasSelectividad:
+    """Tasas de rechazo por atributo y frecuencia de pares (atributo, valor) observadas en consultas reales"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.evaluaciones = {}
+        self.rechazos = {}
+        self.apariciones = {}
+
+    def registrar(self, hechos, reglas):
+        """Registra una consulta y, para cada condicion de las reglas dadas, si la rechazo"""
+        self.consultas += 1
+        for par in hechos.items():
+            try:
+                self.apariciones[par] = self.apariciones.get(par, 0) + 1
+            except TypeError:
+                pass
+        # Se evaluan todas las condiciones (no solo hasta el primer fallo) para
+        # que la medicion no dependa del orden de comprobacion vigente
+        for regla in reglas:
+            for atributo, valor in regla["condiciones"].items():
+                self.evaluaciones[atributo] = self.evaluaciones.get(atributo, 0) + 1
+                if hechos.get(atributo, _FALTA) != valor:
+                    self.rechazos[atributo] = self.rechazos.get(atributo, 0) + 1
+
+    def prioridad_atributos(self):
+        """Probabilidad estimada de que una condicion sobre cada atributo rechace la regla"""
+        return {
+            atributo: round((self.rechazos.get(atributo, 0) + 1) / (evaluaciones + 2), 2)
+            for atributo, evaluaciones in self.evaluaciones.items()
+        }
+
+    def frecuencia_pares(self):
+        """Fraccion de consultas en que aparece cada par (atributo, valor)"""
+        if not self.consultas:
+            return {}
+        return {par: round(veces / self.consultas, 2) for par, veces in self.apariciones.items()}
+
+    def a_json(self):
+        """Representacion serializable de las estadisticas"""
+        return {
+            "consultas": self.consultas,
+            "evaluaciones": self.evaluaciones,
+            "rechazos": self.rechazos,
+            "apariciones": [[atributo, valor, veces] for (atributo, valor), veces in self.apariciones.items()]
+        }
+
+    @classmethod
+    def desde_json(cls, datos):
+        """Reconstruye las estadisticas guardadas con a_json"""
+        estadisticas = cls()
+        estadisticas.consultas = datos["consultas"]
+        estadisticas.evaluaciones = dict(datos["evaluaciones"])
+        estadisticas.rechazos = dict(datos["rechazos"])
+        estadisticas.apariciones = {(atributo, valor): veces for atributo, valor, veces in datos["apariciones"]}
+        return estadisticas
+
+
+def _ranking(puntajes):
+    """Orden de claves por puntaje descendente (empates por clave)"""
+    return sorted(puntajes, key=lambda clave: (-puntajes[clave], repr(clave)))
+
+
+class PredicadosReglas:
+    """Compila cada regla en una funcion especializada que evalua sus condiciones"""
+
+    def __init__(self, reglas, prioridad=None):
+        self.reglas = reglas
+        self._fabricas = {}
+        self.prioridad = prioridad if prioridad else self._prioridad_por_cardinalidad(reglas)
+        self._predicados = [self._compilar(regla) for regla in reglas]
+
+    def reordenar(self, prioridad):
+        """Recompila los predicados si cambia el orden de los atributos; devuelve True si lo hizo"""
+        if not prioridad or _ranking(prioridad) == _ranking(self.prioridad):
+            return False
+        self.prioridad = prioridad
+        self._predicados = [self._compilar(regla) for regla in self.reglas]
+        return True
+
+    @staticmethod
+    def _prioridad_por_cardinalidad(reglas):
+        """Atributos con mas valores distintos tienden a rechazar mas: se comprueban primero"""
+        valores = {}
+        for regla in reglas:
+            if regla is None:
+                continue
+            for atributo, valor in regla["condiciones"].items():
+                try:
+                    valores.setdefault(atributo, set()).add(valor)
+                except TypeError:
+                    pass
+        return {atributo: len(distintos) for atributo, distintos in valores.items()}
+
+    def _fabrica(self, atributos):
+        """Genera (una vez por combinacion de atributos) la funcion que crea predicados"""
+        fabrica = self._fabricas.get(atributos)
+        if fabrica is None:
+            parametros = "".join(f", v{i}" for i in range(len(atributos)))
+            comparaciones = " and ".join(
+                f"hechos.get({atributo!r}, _FALTA) == v{i}" for i, atributo in enumerate(atributos)
+            ) or "True"
+            codigo = (
+                f"def fabrica(_FALTA{parametros}):\n"
+                f"    def predicado(hechos):\n"
+                f"        return {comparaciones}\n"
+                f"    return predicado\n"
+            )
+            espacio = {}
+            exec(compile(codigo, f"<predicado {', '.join(atributos)}>", "exec"), espacio)
+            fabrica = self._fabricas[atributos] = espacio["fabrica"]
+        return fabrica
+
+    def _compilar(self, regla):
+        if regla is None:
+            return _nunca
+        condiciones = regla["condiciones"]
+        if not all(isinstance(atributo, str) for atributo in condiciones):
+            # Claves no textuales (no provienen de JSON): se usa la evaluacion generica
+            return lambda hechos: cumple_condiciones(condiciones, hechos)
+        prioridad = self.prioridad
+        atributos = tuple(sorted(condiciones, key=lambda atributo: (-prioridad.get(atributo, 0), atributo)))
+        return self._fabrica(atributos)(_FALTA, *(condiciones[atributo] for atributo in atributos))
+
+    def __getstate__(self):
+        # Las funciones generadas no se pueden serializar: se guardan reglas y prioridad
+        return {"reglas": self.reglas, "prioridad": self.prioridad}
+
+    def __setstate__(self, estado):
+        self.reglas = estado["reglas"]
+        self.prioridad = estado["prioridad"]
+        self._fabricas = {}
+        self._predicados = [self._compilar(regla) for regla in self.reglas]
+
+    def compilar(self, posicion, regla):
+        """Compila (o recompila) solo el predicado de la regla en 'posicion'"""
+        predicado = self._compilar(regla)
+        if posicion == len(self._predicados):
+            self._predicados.append(predicado)
+        else:
+            self._predicados[posicion] = predicado
+
+    def retirar(self, posicion):
+        """Hace que la posicion de una regla eliminada no se cumpla nunca"""
+        self._predicados[posicion] = _nunca
+
+    def __getitem__(self, posicion):
+        return self._predicados[posicion]
+
+    def __iter__(self):
+        return iter(self._predicados)
+
+
+class MotorIndexado:
+    """Motor que indexa las reglas por pares (atributo, valor) de sus condiciones"""
+
+    def __init__(self, reglas, selectividad=None):
+        self.reglas = reglas
+        prioridad = selectividad.prioridad_atributos() if selectividad else None
+        self.predicados = PredicadosReglas(reglas, prioridad)
+        self._frecuencias = selectividad.frecuencia_pares() if selectividad else {}
+        self._construir_indice()
+
+    def _construir_indice(self):
+        # Cada regla se registra bajo un unico par "ancla": si la regla se cumple,
+        # su ancla forzosamente esta entre los hechos, asi que basta con un par.
+        self._indice = {}
+        self._sin_condiciones = set()
+        for posicion, regla in enumerate(self.reglas):
+            if regla is not None:
+                self._anclar(posicion, regla)
+
+    def reordenar(self, selectividad):
+        """Aplica la selectividad medida al orden de las condiciones y a la eleccion de anclas"""
+        self.predicados.reordenar(selectividad.prioridad_atributos())
+        frecuencias = selectividad.frecuencia_pares()
+        if _ranking(frecuencias) != _ranking(self._frecuencias):
+            self._frecuencias = frecuencias
+            self._construir_indice()
+
+    def indexar(self, posicion, regla):
+        """Registra la regla ubicada en 'posicion' dentro del indice"""
+        self.predicados.compilar(posicion, regla)
+        self._anclar(posicion, regla)
+
+    def retirar(self, posicion, regla):
+        """Quita del indice la regla que ocupaba 'posicion' (con sus condiciones de entonces)"""
+        self.predicados.retirar(posicion)
+        self._sin_condiciones.discard(posicion)
+        # El ancla es uno de sus pares: basta con buscarla entre las condiciones
+        for par in regla["condiciones"].items():
+            indexadas = self._indice.get(par)
+            if indexadas is not None and posicion in indexadas:
+                indexadas.discard(posicion)
+                if not indexadas:
+                    del self._indice[par]
+                break
+
+    def _anclar(self, posicion, regla):
+        condiciones = regla["condiciones"]
+        if not condiciones:
+            self._sin_condiciones.add(posicion)
+            return
+        # El par que menos aparece en las consultas (y, a igualdad, el menos
+        # poblado en el indice) produce menos candidatas por consulta
+        frecuencias = self._frecuencias
+        ancla = min(condiciones.items(), key=lambda par: (frecuencias.get(par, 0), len(self._indice.get(par, ()))))
+        self._indice.setdefault(ancla, set()).add(posicion)
+
+    def candidatas(self, hechos):
+        """Devuelve, en orden, las posiciones de reglas que comparten algun hecho"""
+        posiciones = list(self._sin_condiciones)
+        for par in hechos.items():
+            try:
+                indexadas = self._indice.get(par)
+            except TypeError:
+                # Un valor no hashable (lista, diccionario) no es igual a ninguna condicion indexada
+                continue
+            if indexadas:
+                posiciones.extend(indexadas)
+        posiciones.sort()
+        return posiciones
+
+    def coincidencias(self, hechos):
+        """Devuelve, en orden, las posiciones de las reglas que se cumplen"""
+        predicados = self.predicados
+        return [posicion for posicion in self.candidatas(hechos) if predicados[posicion](hechos)]
+
+
+class MotorLineal:
+    """Motor de referencia que evalua todas las reglas en cada consulta"""
+
+    def __init__(self, reglas, selectividad=None):
+        self.reglas = reglas
+        prioridad = selectividad.prioridad_atributos() if selectividad else None
+        self.predicados = PredicadosReglas(reglas, prioridad)
+
+    def indexar(self, posicion, regla):
+        """Recompila el predicado de la regla"""
+        self.predicados.compilar(posicion, regla)
+
+    def retirar(self, posicion, regla):
+        """La posicion de la regla eliminada deja de cumplirse"""
+        self.predicados.retirar(posicion)
+
+    def reordenar(self, selectividad):
+        """Aplica la selectividad medida al orden de las condiciones"""
+        self.predicados.reordenar(selectividad.prioridad_atributos())
+
+    def candidatas(self, hechos):
+        """Todas las reglas son candidatas"""
+        return range(len(self.reglas))
+
+    def coincidencias(self, hechos):
+        """Devuelve, en orden, las posiciones de las reglas que se cumplen"""
+        return [posicion for posicion, predicado in enumerate(self.predicados) if predicado(hechos)]
+
+
+class MotorBitset:
+    """Motor que representa cada par (atributo, valor) como mascara de bits sobre las reglas"""
+
+    def __init__(self, reglas, selectividad=None):
+        self.reglas = reglas
+        posiciones_por_par = {}
+        posiciones_por_atributo = {}
+        vivas = []
+        for posicion, regla in enumerate(reglas):
+            if regla is None:
+                continue
+            vivas.append(posicion)
+            for par in regla["condiciones"].items():
+                posiciones_por_par.setdefault(par, []).append(posicion)
+                posiciones_por_atributo.setdefault(par[0], []).append(posicion)
+
+        # Las mascaras se construyen de una vez: hacer OR regla por regla
+        # sobre enteros grandes seria cuadratico en la carga
+        total = len(reglas)
+        self._mascaras = {
+            par: _mascara_desde_posiciones(posiciones, total)
+            for par, posiciones in posiciones_por_par.items()
+        }
+        self._con_atributo = {
+            atributo: _mascara_desde_posiciones(posiciones, total)
+            for atributo, posiciones in posiciones_por_atributo.items()
+        }
+        self._todas = (1 << total) - 1 if len(vivas) == total else _mascara_desde_posiciones(vivas, total)
+
+    def indexar(self, posicion, regla):
+        """Enciende el bit de la regla en las mascaras de sus condiciones"""
+        bit = 1 << posicion
+        self._todas |= bit
+        for par in regla["condiciones"].items():
+            self._mascaras[par] = self._mascaras.get(par, 0) | bit
+            self._con_atributo[par[0]] = self._con_atributo.get(par[0], 0) | bit
+
+    def retirar(self, posicion, regla):
+        """Apaga el bit de la regla en todas las mascaras donde estaba encendido"""
+        bit = 1 << posicion
+        self._todas &= ~bit
+        for par in regla["condiciones"].items():
+            self._mascaras[par] &= ~bit
+            self._con_atributo[par[0]] &= ~bit
+
+    def candidatas(self, hechos):
+        """Todas las reglas participan en las operaciones de bits"""
+        return range(len(self.reglas))
+
+    def coincidencias(self, hechos):
+        """Devuelve, en orden, las posiciones de las reglas que se cumplen"""
+        # Una regla falla si restringe un atributo ausente en los hechos
+        # o si lo restringe a un valor distinto al proporcionado
+        fallidas = 0
+        for atributo, restringidas in self._con_atributo.items():
+            if atributo in hechos:
+                try:
+                    aceptadas = self._mascaras.get((atributo, hechos[atributo]), 0)
+                except TypeError:
+                    # Un valor no hashable no cumple ninguna condicion sobre el atributo
+                    aceptadas = 0
+                fallidas |= restringidas & ~aceptadas
+            else:
+                fallidas |= restringidas
+        return _posiciones_desde_mascara(self._todas & ~fallidas)
+
+    def reordenar(self, selectividad):
+        """El orden de las condiciones no influye en las operaciones de bits"""
+
+
+class MatrizReglas:
+    """Codificacion de las condiciones como matriz de enteros (una columna por atributo)"""
+
+    # Codigo usado tanto para "la regla no restringe el atributo" como para
+    # "el hecho falta o tiene un valor que ninguna regla menciona"
+    SIN_VALOR = -1
+
+    def __init__(self, reglas):
+        self.reglas = reglas
+        self.atributos = []
+        self._columnas = {}
+        self._codigos = []
+        condiciones_codificadas = []
+        vivas = []
+        for posicion, regla in enumerate(reglas):
+            codificadas = {}
+            condiciones_codificadas.append(codificadas)
+            if regla is None:
+                continue
+            vivas.append(posicion)
+            for atributo, valor in regla["condiciones"].items():
+                columna = self._columnas.get(atributo)
+                if columna is None:
+                    columna = self._columnas[atributo] = len(self.atributos)
+                    self.atributos.append(atributo)
+                    self._codigos.append({})
+                codigos = self._codigos[columna]
+                codificadas[columna] = codigos.setdefault(valor, len(codigos))
+
+        columnas = range(len(self.atributos))
+        self.filas = [
+            tuple(codificadas.get(columna, self.SIN_VALOR) for columna in columnas)
+            for codificadas in condiciones_codificadas
+        ]
+
+        # Para cada columna y codigo: reglas que aceptan ese valor, es decir,
+        # las que lo exigen mas las que no restringen la columna
+        total = len(reglas)
+        # Las posiciones de reglas eliminadas no se cumplen nunca
+        self._todas = (1 << total) - 1 if len(vivas) == total else _mascara_desde_posiciones(vivas, total)
+        self._libres = []
+        self._aceptan = []
+        for columna in columnas:
+            posiciones_por_codigo = {}
+            for posicion, fila in enumerate(self.filas):
+                posiciones_por_codigo.setdefault(fila[columna], []).append(posicion)
+            libres = _mascara_desde_posiciones(posiciones_por_codigo.pop(self.SIN_VALOR, ()), total)
+            self._libres.append(libres)
+            self._aceptan.append({
+                codigo: libres | _mascara_desde_posiciones(posiciones, total)
+                for codigo, posiciones in posiciones_por_codigo.items()
+            })
+
+    def codificar(self, hechos):
+        """Convierte un diccionario de hechos en una fila de codigos"""
+        fila = []
+        for atributo, codigos in zip(self.atributos, self._codigos):
+            if atributo in hechos:
+                try:
+                    fila.append(codigos.get(hechos[atributo], self.SIN_VALOR))
+                except TypeError:
+                    # Un valor no hashable no coincide con ningun valor de las reglas
+                    fila.append(self.SIN_VALOR)
+            else:
+                fila.append(self.SIN_VALOR)
+        return tuple(fila)
+
+    def coincidencias_lote(self, filas):
+        """Devuelve, por cada fila distinta de codigos, las posiciones de las reglas que se cumplen"""
+        resultados = {}
+        for fila in filas:
+            if fila in resultados:
+                continue
+            mascara = self._todas
+            for libres, aceptan, codigo in zip(self._libres, self._aceptan, fila):
+                mascara &= aceptan.get(codigo, libres)
+                if not mascara:
+                    break
+            resultados[fila] = _posiciones_desde_mascara(mascara)
+        return resultados
+
+
+class EmparejadorIncremental:
+    """Mantiene el estado de emparejamiento parcial de cada regla mientras se responden hechos"""
+
+    def __init__(self, reglas):
+        self.reglas = reglas
+        self.hechos = {}
+        self._por_atributo = {}
+        self._pendientes = []
+        self._violadas = [0] * len(reglas)
+        for posicion, regla in enumerate(reglas):
+            if regla is None:
+                # Posicion de una regla eliminada: queda descartada desde el inicio
+                self._pendientes.append(1)
+                self._violadas[posicion] = 1
+                continue
+            condiciones = regla["condiciones"]
+            self._pendientes.append(len(condiciones))
+            for atributo, valor in condiciones.items():
+                self._por_atributo.setdefault(atributo, []).append((posicion, valor))
+        self._cumplidas = {posicion for posicion, pendientes in enumerate(self._pendientes) if not pendientes}
+        self._posibles = {posicion for posicion, violadas in enumerate(self._violadas) if not violadas}
+
+    def asignar(self, atributo, valor):
+        """Registra (o cambia) un hecho y actualiza solo las reglas que mencionan el atributo"""
+        self._actualizar(atributo, valor, presente=True)
+
+    def retirar(self, atributo):
+        """Elimina un hecho previamente registrado"""
+        if atributo in self.hechos:
+            self._actualizar(atributo, None, presente=False)
+
+    def _actualizar(self, atributo, valor, presente):
+        anterior_presente = atributo in self.hechos
+        anterior = self.hechos.get(atributo)
+        if presente:
+            self.hechos[atributo] = valor
+        else:
+            del self.hechos[atributo]
+
+        pendientes = self._pendientes
+        violadas = self._violadas
+        for posicion, esperado in self._por_atributo.get(atributo, ()):
+            if anterior_presente:
+                if anterior == esperado:
+                    pendientes[posicion] += 1
+                else:
+                    violadas[posicion] -= 1
+            if presente:
+                if valor == esperado:
+                    pendientes[posicion] -= 1
+                else:
+                    violadas[posicion] += 1
+
+            if violadas[posicion]:
+                self._posibles.discard(posicion)
+                self._cumplidas.discard(posicion)
+            else:
+                self._posibles.add(posicion)
+                if pendientes[posicion]:
+                    self._cumplidas.discard(posicion)
+                else:
+                    self._cumplidas.add(posicion)
+
+    def coincidencias(self):
+        """Posiciones, en orden, de las reglas que ya se cumplen con los hechos actuales"""
+        return sorted(self._cumplidas)
+
+    def posibles(self):
+        """Posiciones, en orden, de las reglas que aun pueden cumplirse (ninguna condicion contradicha)"""
+        return sorted(self._posibles)
+
+    def mejores(self, k):
+        """Posiciones de las k reglas cumplidas de mayor confianza (empates en orden de regla)"""
+        reglas = self.reglas
+        return heapq.nsmallest(k, self._cumplidas, key=lambda posicion: (-reglas[posicion]["confianza"], posicion))
+
+    def cantidad_coincidencias(self):
+        """Numero de reglas que ya se cumplen"""
+        return len(self._cumplidas)
+
+    def cantidad_posibles(self):
+        """Numero de reglas que aun pueden cumplirse"""
+        return len(self._posibles)
+
+
+MOTORES = {
+    "indice": MotorIndexado,
+    "bitset": MotorBitset,
+    "lineal": MotorLineal,
+}
+
+
+def crear_motor(nombre, reglas, selectividad=None):
+    """Instancia el motor de emparejamiento registrado bajo 'nombre'"""
+    if nombre not in MOTORES:
+        raise ValueError(f"Motor de inferencia desconocido: {nombre} (opciones: {', '.join(MOTORES)})")
+    return MOTORES[nombre](reglas, selectividad)
@@ -0,0 +1,91 @@
+"""Procesamiento por lotes sin interfaz: lee hechos en JSON Lines y escribe un resultado JSON por linea"""
+
+import argparse
+import contextlib
+import itertools
+import json
+import sys
+from sistema_experto import SistemaExpertoDL
+
+TAMANO_BLOQUE = 1000
+
+
+def leer_bloques(entrada, tamano_bloque=TAMANO_BLOQUE):
+    """Agrupa las lineas no vacias de la entrada en bloques de (numero_linea, texto)"""
+    lineas = ((numero, linea) for numero, linea in enumerate(entrada, 1) if linea.strip())
+    while True:
+        bloque = list(itertools.islice(lineas, tamano_bloque))
+        if not bloque:
+            return
+        yield bloque
+
+
+def _decodificar(numero, linea):
+    """Convierte una linea en un diccionario de hechos o en un mensaje de error"""
+    try:
+        hechos = json.loads(linea)
+    except ValueError as e:
+        return None, f"JSON invalido en la linea {numero}: {e}"
+    if not isinstance(hechos, dict):
+        return None, f"La linea {numero} no contiene un objeto JSON"
+    for atributo, valor in hechos.items():
+        # Un hecho es la respuesta a una pregunta: listas y objetos no tienen sentido como valor
+        if isinstance(valor, (list, dict)):
+            return None, f"El hecho '{atributo}' de la linea {numero} debe tener un valor simple"
+    return hechos, None
+
+
+def procesar(entrada, salida, sistema, tamano_bloque=TAMANO_BLOQUE, top_k=None):
+    """Procesa la entrada bloque a bloque y devuelve (procesadas, errores)"""
+    procesadas = errores = 0
+    for bloque in leer_bloques(entrada, tamano_bloque):
+        decodificadas = [(numero,) + _decodificar(numero, linea) for numero, linea in bloque]
+        validas = [hechos for _, hechos, error in decodificadas if error is None]
+        resultados = iter(sistema.inferir_lote(validas, top_k=top_k))
+
+        # Una linea de salida por cada linea no vacia de entrada, en el mismo orden
+        for numero, hechos, error in decodificadas:
+            if error is not None:
+                registro = {"linea": numero, "error": error}
+                errores += 1
+            else:
+                registro = {"hechos": hechos, "recomendaciones": next(resultados)}
+                procesadas += 1
+            salida.write(json.dumps(registro, ensure_ascii=False))
+            salida.write("\n")
+    salida.flush()
+    return procesadas, errores
+
+
+def main(argumentos=None):
+    """Punto de entrada de la linea de comandos"""
+    parser = argparse.ArgumentParser(
+        description="Recomienda tecnicas para cada conjunto de hechos recibido en formato JSON Lines")
+    parser.add_argument("entrada", nargs="?", default="-",
+                        help="Archivo JSONL con un objeto de hechos por linea ('-' para la entrada estandar)")
+    parser.add_argument("-b", "--base", default="base_conocimiento.json",
+                        help="Archivo de la base de conocimiento")
+    parser.add_argument("-n", "--tamano-bloque", type=int, default=TAMANO_BLOQUE,
+                        help="Cantidad de lineas procesadas por bloque")
+    parser.add_argument("-k", "--top-k", type=int, default=None,
+                        help="Limita la cantidad de recomendaciones por linea")
+    parser.add_argument("--textos-mapeados", action="store_true",
+                        help="Mantiene recomendaciones y justificaciones en un archivo mapeado en memoria")
+    args = parser.parse_args(argumentos)
+
+    # La salida estandar queda reservada para los resultados: los mensajes de carga van a stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        sistema = SistemaExpertoDL(args.base, cache_binaria=True, textos_mapeados=args.textos_mapeados)
+
+    if args.entrada == "-":
+        procesadas, errores = procesar(sys.stdin, sys.stdout, sistema, args.tamano_bloque, args.top_k)
+    else:
+        with open(args.entrada, 'r', encoding='utf-8') as entrada:
+            procesadas, errores = procesar(entrada, sys.stdout, sistema, args.tamano_bloque, args.top_k)
+
+    print(f"Lineas procesadas: {procesadas}, con error: {errores}", file=sys.stderr)
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""Representacion compacta en memoria de las reglas de la base de conocimiento"""
+
+from collections.abc import Mapping
+from almacenamiento import AlmacenTextos
+
+CAMPOS_REGLA = ("id", "condiciones", "recomendacion", "justificacion", "confianza")
+
+
+class Regla:
+    """Regla con atributos fijos (__slots__) y acceso compatible con el diccionario original"""
+
+    __slots__ = CAMPOS_REGLA + ("extras",)
+
+    def __init__(self, id, condiciones, recomendacion, justificacion, confianza, extras=None):
+        self.id = id
+        self.condiciones = condiciones
+        self.recomendacion = recomendacion
+        self.justificacion = justificacion
+        self.confianza = confianza
+        # Campos adicionales del JSON que el sistema no usa pero debe conservar al guardar
+        self.extras = extras
+
+    def __getitem__(self, clave):
+        if clave in CAMPOS_REGLA:
+            return getattr(self, clave)
+        if self.extras is not None and clave in self.extras:
+            return self.extras[clave]
+        raise KeyError(clave)
+
+    def get(self, clave, por_defecto=None):
+        try:
+            return self[clave]
+        except KeyError:
+            return por_defecto
+
+    def __contains__(self, clave):
+        return clave in CAMPOS_REGLA or (self.extras is not None and clave in self.extras)
+
+    def keys(self):
+        return list(self.a_dict())
+
+    def items(self):
+        return self.a_dict().items()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(CAMPOS_REGLA) + (len(self.extras) if self.extras else 0)
+
+    def __eq__(self, otra):
+        if isinstance(otra, (Regla, Mapping)):
+            return self.a_dict() == dict(otra.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Regla({self.a_dict()!r})"
+
+    def a_dict(self):
+        """Devuelve la regla como diccionario, en el formato del archivo JSON"""
+        datos = {
+            "id": self.id,
+            "condiciones": dict(self.condiciones),
+            "recomendacion": self.recomendacion,
+            "justificacion": self.justificacion,
+            "confianza": self.confianza
+        }
+        if self.extras:
+            datos.update(self.extras)
+        return datos
+
+
+class ReglaDiferida(Regla):
+    """Regla que conserva en memoria sus condiciones y lee sus textos del almacen solo al consultarlos"""
+
+    __slots__ = ("_almacen", "_numero")
+
+    def __init__(self, id, condiciones, confianza, almacen, numero, extras=None):
+        self.id = id
+        self.condiciones = condiciones
+        self.confianza = confianza
+        self.extras = extras
+        self._almacen = almacen
+        # Textos 2 * numero (recomendacion) y 2 * numero + 1 (justificacion) del almacen
+        self._numero = numero
+
+    @property
+    def recomendacion(self):
+        return self._almacen.texto(2 * self._numero)
+
+    @property
+    def justificacion(self):
+        return self._almacen.texto(2 * self._numero + 1)
+
+    def __reduce__(self):
+        return (ReglaDiferida, (self.id, self.condiciones, self.confianza, self._almacen, self._numero, self.extras))
+
+
+def validar_regla(regla):
+    """Comprueba los campos y tipos de una regla nueva; lanza ValueError describiendo el problema"""
+    if not isinstance(regla, Mapping):
+        raise ValueError("la regla debe ser un objeto")
+    faltantes = [campo for campo in CAMPOS_REGLA if campo != "id" and campo not in regla]
+    if faltantes:
+        raise ValueError(f"faltan los campos {', '.join(faltantes)}")
+    condiciones = regla["condiciones"]
+    if not isinstance(condiciones, Mapping) or not all(isinstance(atributo, str) for atributo in condiciones):
+        raise ValueError("'condiciones' debe ser un objeto con atributos de texto")
+    for atributo, valor in condiciones.items():
+        # Los motores indexan los pares (atributo, valor): el valor debe ser un escalar
+        if not isinstance(valor, (str, int, float)):
+            raise ValueError(f"la condicion '{atributo}' debe ser un texto, numero o booleano")
+    for campo in ("recomendacion", "justificacion"):
+        if not isinstance(regla[campo], str) or not regla[campo].strip():
+            raise ValueError(f"'{campo}' debe ser un texto no vacio")
+    confianza = regla["confianza"]
+    if isinstance(confianza, bool) or not isinstance(confianza, (int, float)) or not 0 <= confianza <= 1:
+        raise ValueError("'confianza' debe ser un numero entre 0 y 1")
+
+
+def regla_a_json(objeto):
+    """Funcion 'default' para json.dump que serializa objetos Regla"""
+    if isinstance(objeto, Regla):
+        return objeto.a_dict()
+    raise TypeError(f"Objeto de tipo {type(objeto).__name__} no serializable a JSON")
+
+
+class CompiladorReglas:
+    """Convierte reglas en objetos Regla compartiendo textos y condiciones repetidas"""
+
+    def __init__(self):
+        self._textos = {}
+        self._condiciones = {}
+
+    def _compartir(self, valor):
+        """Devuelve una unica instancia para cada texto repetido"""
+        if isinstance(valor, str):
+            return self._textos.setdefault(valor, valor)
+        return valor
+
+    def _compartir_condiciones(self, condiciones):
+        """Devuelve un unico diccionario para cada conjunto de condiciones repetido"""
+        condiciones = {self._compartir(clave): self._compartir(valor) for clave, valor in condiciones.items()}
+        try:
+            # El tipo forma parte de la clave para no confundir True con 1 al guardar
+            clave = tuple((atributo, type(valor), valor) for atributo, valor in condiciones.items())
+            return self._condiciones.setdefault(clave, condiciones)
+        except TypeError:
+            return condiciones
+
+    def compilar(self, regla):
+        """Convierte una regla (diccionario u objeto Regla) en un objeto Regla compacto"""
+        extras = {clave: valor for clave, valor in regla.items() if clave not in CAMPOS_REGLA} or None
+        return Regla(
+            regla["id"],
+            self._compartir_condiciones(regla["condiciones"]),
+            self._compartir(regla["recomendacion"]),
+            self._compartir(regla["justificacion"]),
+            regla["confianza"],
+            extras
+        )
+
+    def compilar_todas(self, reglas):
+        """Convierte una lista de reglas"""
+        return [self.compilar(regla) for regla in reglas]
+
+    def compilar_diferidas(self, reglas, ruta_textos):
+        """Convierte las reglas en objetos ReglaDiferida, escribiendo sus textos en 'ruta_textos'
+
+        Recorre 'reglas' una sola vez, asi que acepta un iterador que se va leyendo del disco.
+        """
+        diferidas = []
+
+        def textos():
+            for numero, regla in enumerate(reglas):
+                diferidas.append(ReglaDiferida(
+                    regla["id"],
+                    self._compartir_condiciones(regla["condiciones"]),
+                    regla["confianza"],
+                    None,
+                    numero,
+                    {clave: valor for clave, valor in regla.items() if clave not in CAMPOS_REGLA} or None
+                ))
+                yield regla["recomendacion"]
+                yield regla["justificacion"]
+
+        almacen = AlmacenTextos.escribir(ruta_textos, textos())
+        # El almacen solo existe una vez escrito el archivo
+        for regla in diferidas:
+            regla._almacen = almacen
+        return diferidas
@@ -1,31 +1,451 @@
+import functools
+import heapq
 import json
 import os
+import threading
+from collections import OrderedDict
+from motores_inferencia import (EmparejadorIncremental, EstadisticasSelectividad, MatrizReglas,
+                                crear_motor, cumple_condiciones)
+from tabla_respuestas import TablaRespuestas
+from busqueda_reglas import IndiceBusqueda
+from catalogo_preguntas import crear_catalogo
+from representacion_reglas import CAMPOS_REGLA, CompiladorReglas, regla_a_json, validar_regla
+from almacenamiento import (CacheBinaria, DiarioReglas, aplicar_diario, escribir_atomicamente, firma_archivo,
+                            leer_reglas_json)
+
+class CacheLRU:
+    """Cache acotada que descarta primero las entradas usadas hace mas tiempo"""
+    
+    def __init__(self, capacidad):
+        self.capacidad = capacidad
+        self._entradas = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+    
+    def obtener(self, clave):
+        """Devuelve el valor asociado a la clave o None si no esta en cache"""
+        try:
+            valor = self._entradas[clave]
+        except KeyError:
+            self.fallos += 1
+            return None
+        self._entradas.move_to_end(clave)
+        self.aciertos += 1
+        return valor
+    
+    def guardar(self, clave, valor):
+        """Guarda un valor desalojando la entrada menos reciente si hace falta"""
+        self._entradas[clave] = valor
+        self._entradas.move_to_end(clave)
+        if len(self._entradas) > self.capacidad:
+            self._entradas.popitem(last=False)
+            self.desalojos += 1
+    
+    def limpiar(self):
+        """Vacia la cache conservando los contadores"""
+        self._entradas.clear()
+    
+    def estadisticas(self):
+        """Devuelve los contadores de uso de la cache"""
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "desalojos": self.desalojos,
+            "entradas": len(self._entradas),
+            "capacidad": self.capacidad
+        }
+
+# Aprendizaje de selectividad: se mide 1 de cada MUESTREO_SELECTIVIDAD consultas,
+# sobre a lo sumo MAX_REGLAS_MUESTRA candidatas, y se reordena cada REORDENAR_CADA muestras
+MUESTREO_SELECTIVIDAD = 16
+MAX_REGLAS_MUESTRA = 256
+REORDENAR_CADA = 64
+
+# Las reglas eliminadas dejan un hueco en su posicion; cuando los huecos superan
+# esta cantidad y la cuarta parte de las posiciones, se compactan y se reindexa
+MIN_ELIMINADAS_COMPACTAR = 64
+
+# Segundos entre revisiones del archivo de reglas cuando se vigilan sus cambios
+INTERVALO_VIGILANCIA = 1.0
+
+# Recomendaciones que devuelve vista_previa mientras se completa un formulario
+TOP_VISTA_PREVIA = 3
+
+def sincronizado(metodo):
+    """Ejecuta el metodo con el bloqueo del sistema: las consultas y ediciones nunca ven una recarga a medias"""
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        with self._bloqueo:
+            return metodo(self, *args, **kwargs)
+    return envoltura
 
 class SistemaExpertoDL:
-    def __init__(self, archivo_base_conocimiento="base_conocimiento.json"):
+    def __init__(self, archivo_base_conocimiento="base_conocimiento.json", motor="indice", tamano_cache=0,
+                 tabla_respuestas=None, reglas_compactas=False, aprender_selectividad=False,
+                 cache_binaria=False, textos_mapeados=False, diario=False, json_compacto=False):
         self.archivo_base_conocimiento = archivo_base_conocimiento
-        self.reglas = self._cargar_reglas_desde_json()
+        self.nombre_motor = motor
+        self.modo_tabla = tabla_respuestas
+        self.reglas_compactas = reglas_compactas
+        self.cache_binaria = cache_binaria
+        self.textos_mapeados = textos_mapeados
+        self.usar_diario = diario
+        self.json_compacto = json_compacto
+        self._diario = DiarioReglas(self._ruta_auxiliar("diario.jsonl"))
+        self._compilador = None
+        self._cache = CacheLRU(tamano_cache) if tamano_cache > 0 else None
+        self._selectividad = self._cargar_selectividad()
+        self.aprender_selectividad = aprender_selectividad
+        self._consultas_observadas = 0
+        self._bloqueo = threading.RLock()
+        self._version_reglas = 0
+        self._vigilancia = None
+        self._matriz_lote = None
+        self._indice_busqueda = None
+        self._catalogo = None
+        self._vista_previa = None
+        self._instalar_estado(self._cargar_estado())
         self.hechos = {}
+        self.emparejador = None
+    
+    @property
+    @sincronizado
+    def reglas(self):
+        """Copia de las reglas vigentes, en el orden del archivo (se modifican con agregar_regla y demas)"""
+        if not self._eliminadas:
+            return list(self._reglas)
+        return [regla for regla in self._reglas if regla is not None]
+    
+    def _usar_reglas(self, reglas):
+        """Cambia la lista de reglas; quien la llama reconstruye motor, tabla e indices"""
+        # Los motores y la tabla trabajan con posiciones de
+        # self._reglas, donde las reglas eliminadas dejan un None hasta compactar
+        self._reglas = reglas
+        self._eliminadas = reglas.count(None)
+        self._posiciones = None
+    
+    def _indice_ids(self):
+        """Posicion de cada regla por id; se construye en la primera consulta por id"""
+        if self._posiciones is None:
+            self._posiciones = {regla["id"]: posicion for posicion, regla in enumerate(self._reglas)
+                                if regla is not None}
+        return self._posiciones
+    
+    @sincronizado
+    def cantidad_reglas(self):
+        """Numero de reglas vigentes"""
+        return len(self._reglas) - self._eliminadas
+    
+    @sincronizado
+    def obtener_regla(self, regla_id):
+        """Devuelve la regla con ese id, o None si no existe (para modificarla, usar actualizar_regla)"""
+        posicion = self._indice_ids().get(regla_id)
+        return None if posicion is None else self._reglas[posicion]
     
-    def _cargar_reglas_desde_json(self):
+    @sincronizado
+    def buscar_reglas(self, consulta):
+        """Reglas vigentes, en orden de archivo, que contienen todos los terminos de la consulta
+
+        Ver IndiceBusqueda para la sintaxis; una consulta vacia devuelve todas las reglas.
+        """
+        posiciones = None
+        if consulta.strip():
+            # El indice se construye en la primera busqueda y se descarta al modificar las reglas
+            if self._indice_busqueda is None:
+                self._indice_busqueda = IndiceBusqueda(self._reglas)
+            posiciones = self._indice_busqueda.buscar(consulta)
+        if posiciones is None:
+            # Siempre una lista nueva: self._reglas cambia con cada edicion
+            return [regla for regla in self._reglas if regla is not None]
+        return [self._reglas[posicion] for posicion in posiciones]
+    
+    def recargar_reglas(self):
+        """Vuelve a leer la base de conocimiento desde el archivo JSON"""
+        self._instalar_estado(self._cargar_estado())
+    
+    def _firma_en_disco(self):
+        """Identidad actual del archivo de reglas y del diario, para detectar cambios hechos por otros"""
+        try:
+            estado = os.stat(self.archivo_base_conocimiento)
+        except OSError:
+            firma = None
+        else:
+            # El inodo cambia cuando el archivo se reemplaza, aunque conserve tamano y fecha
+            firma = (estado.st_ino, estado.st_size, estado.st_mtime_ns)
+        return firma, self._diario.firma()
+    
+    def _cargar_estado(self, estricto=False):
+        """Lee la base y construye reglas, motor y tabla sin tocar los que estan en uso
+
+        Con 'estricto', un archivo ilegible lanza la excepcion en lugar de usar las reglas por defecto.
+        """
+        # La firma se toma antes de leer: un cambio durante la carga provoca otra recarga
+        firma = self._firma_en_disco()
+        reglas, motor, compilador = self._cargar_reglas_y_motor(estricto)
+        return {
+            "firma": firma,
+            "reglas": reglas,
+            "motor": motor,
+            "compilador": compilador,
+            "siguiente_id": self._calcular_siguiente_id(reglas),
+            "tabla": self._crear_tabla_respuestas(reglas)
+        }
+    
+    @sincronizado
+    def _instalar_estado(self, estado):
+        """Reemplaza de una vez todo el estado derivado de las reglas"""
+        self._firma_disco = estado["firma"]
+        self._usar_reglas(estado["reglas"])
+        self._motor = estado["motor"]
+        self._compilador = estado["compilador"]
+        self._siguiente_id = estado["siguiente_id"]
+        self._tabla = estado["tabla"]
+        self._reglas_modificadas()
+    
+    def recargar_si_cambio(self):
+        """Recarga la base si su archivo o su diario cambiaron en disco; devuelve True si hubo recarga
+
+        La lectura y los indices nuevos se construyen sin bloquear las consultas, que siguen
+        usando las reglas anteriores hasta el reemplazo.
+        """
+        firma = self._firma_en_disco()
+        if firma == self._firma_disco:
+            return False
+        version = self._version_reglas
+        try:
+            estado = self._cargar_estado(estricto=True)
+        except Exception:
+            # Un archivo a medio escribir no reemplaza a las reglas en uso; se
+            # vuelve a intentar cuando cambie otra vez
+            self._firma_disco = firma
+            raise
+        with self._bloqueo:
+            # Una edicion hecha durante la carga ya esta en disco: se descarta lo leido y
+            # la siguiente revision vuelve a cargar si todavia hace falta
+            if self._version_reglas != version:
+                return False
+            self._instalar_estado(estado)
+        return True
+    
+    def vigilar_cambios(self, intervalo=INTERVALO_VIGILANCIA, al_recargar=None):
+        """Revisa el archivo en un hilo aparte y recarga la base cuando cambia
+
+        'al_recargar' se llama desde ese hilo despues de cada reemplazo.
+        """
+        if self._vigilancia is not None:
+            return
+        detener = threading.Event()
+        
+        def vigilar():
+            while not detener.wait(intervalo):
+                try:
+                    if self.recargar_si_cambio() and al_recargar is not None:
+                        al_recargar()
+                except Exception as e:
+                    print(f"Error recargando la base de conocimiento, se mantienen las reglas anteriores: {e}")
+        
+        hilo = threading.Thread(target=vigilar, name="vigilancia-base-conocimiento", daemon=True)
+        self._vigilancia = (detener, hilo)
+        hilo.start()
+    
+    def detener_vigilancia(self):
+        """Detiene el hilo iniciado por vigilar_cambios y espera a que termine"""
+        if self._vigilancia is None:
+            return
+        detener, hilo = self._vigilancia
+        self._vigilancia = None
+        detener.set()
+        hilo.join()
+    
+    def _ruta_auxiliar(self, sufijo):
+        """Ruta de un archivo auxiliar ubicado junto a la base de conocimiento"""
+        return f"{os.path.splitext(self.archivo_base_conocimiento)[0]}.{sufijo}"
+    
+    def _firma_base_conocimiento(self, reglas):
+        """Identifica la version del archivo de reglas a partir de su tamano y fecha de modificacion"""
+        firma = firma_archivo(self.archivo_base_conocimiento)
+        if firma is not None:
+            firma["reglas"] = len(reglas)
+            # Las reglas del diario pendiente tambien forman parte de la base cargada
+            firma["diario"] = self._diario.firma()
+        return firma
+    
+    def _crear_tabla_respuestas(self, reglas, usar_guardada=True):
+        """Construye (o lee de disco) la tabla de respuestas segun el modo configurado"""
+        if self.modo_tabla is None:
+            return None
+        # El dominio de la tabla son las respuestas posibles del catalogo de estas reglas
+        catalogo = crear_catalogo(reglas)
+        if self.modo_tabla == "perezosa":
+            return TablaRespuestas(reglas, perezosa=True, catalogo=catalogo)
+        if self.modo_tabla != "completa":
+            raise ValueError(f"Modo de tabla de respuestas desconocido: {self.modo_tabla} (opciones: completa, perezosa)")
+        
+        # En modo completo la tabla se guarda junto a la base para omitir la construccion al reiniciar
+        ruta = self._ruta_auxiliar("tabla.json")
+        firma = self._firma_base_conocimiento(reglas)
+        if usar_guardada and firma is not None and os.path.exists(ruta):
+            try:
+                tabla = TablaRespuestas.cargar(ruta, reglas, firma, catalogo)
+                if tabla is not None:
+                    return tabla
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"Error leyendo la tabla de respuestas: {e}")
+        
+        tabla = TablaRespuestas(reglas, catalogo=catalogo)
+        if firma is not None:
+            try:
+                tabla.guardar(ruta, firma)
+            except OSError as e:
+                print(f"Error guardando la tabla de respuestas: {e}")
+        return tabla
+    
+    def _reglas_modificadas(self):
+        """Descarta las estructuras derivadas de las reglas anteriores"""
+        self._version_reglas += 1
+        self._matriz_lote = None
+        self._indice_busqueda = None
+        self._catalogo = None
+        if self._cache is not None:
+            self._cache.limpiar()
+    
+    def _cargar_selectividad(self):
+        """Lee la selectividad guardada junto a la base de conocimiento, si existe"""
+        ruta = self._ruta_auxiliar("selectividad.json")
+        if not os.path.exists(ruta):
+            return None
+        try:
+            with open(ruta, 'r', encoding='utf-8') as archivo:
+                return EstadisticasSelectividad.desde_json(json.load(archivo))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Error leyendo la selectividad guardada: {e}")
+            return None
+    
+    def _observar_selectividad(self, motor, hechos):
+        """Mide en una muestra de consultas que condiciones rechazan y reordena periodicamente"""
+        self._consultas_observadas += 1
+        if self._consultas_observadas % MUESTREO_SELECTIVIDAD:
+            return
+        if self._selectividad is None:
+            self._selectividad = EstadisticasSelectividad()
+        candidatas = motor.candidatas(hechos)
+        paso = max(1, len(candidatas) // MAX_REGLAS_MUESTRA)
+        muestra = (motor.reglas[p] for p in candidatas[::paso])
+        self._selectividad.registrar(hechos, (regla for regla in muestra if regla is not None))
+        if self._selectividad.consultas % REORDENAR_CADA == 0:
+            motor.reordenar(self._selectividad)
+    
+    def congelar_selectividad(self):
+        """Deja de medir y fija el orden aprendido hasta ahora"""
+        self.aprender_selectividad = False
+        if self._selectividad is not None:
+            self._motor.reordenar(self._selectividad)
+    
+    def guardar_selectividad(self):
+        """Guarda la selectividad aprendida junto a la base de conocimiento"""
+        if self._selectividad is None:
+            return False
+        ruta = self._ruta_auxiliar("selectividad.json")
+        try:
+            with open(ruta, 'w', encoding='utf-8') as archivo:
+                json.dump(self._selectividad.a_json(), archivo, ensure_ascii=False)
+            print(f"Selectividad guardada en: {ruta}")
+            return True
+        except (OSError, TypeError) as e:
+            print(f"Error guardando la selectividad: {e}")
+            return False
+    
+    def estadisticas_cache(self):
+        """Devuelve los contadores de la cache de resultados (None si esta desactivada)"""
+        return self._cache.estadisticas() if self._cache is not None else None
+    
+    def _cache_binaria(self):
+        """Cache binaria de reglas y motor ubicada junto a la base (None si esta desactivada)"""
+        if not self.cache_binaria:
+            return None
+        return CacheBinaria(self._ruta_auxiliar("cache.pkl"), self.archivo_base_conocimiento)
+    
+    def _configuracion_cache(self):
+        """Opciones que determinan el contenido de la cache binaria"""
+        # El diario pendiente forma parte de las reglas cargadas, asi que tambien invalida la cache
+        return {"motor": self.nombre_motor, "compactas": self.reglas_compactas, "textos": self.textos_mapeados,
+                "diario": self._diario.firma()}
+    
+    def _cargar_reglas_y_motor(self, estricto=False):
+        """Obtiene las reglas y el motor ya indexado, desde la cache binaria si sigue vigente"""
+        cache = self._cache_binaria()
+        if cache is not None:
+            contenido = cache.leer(self._configuracion_cache())
+            if contenido is not None:
+                motor = contenido["motor"]
+                if self._selectividad is not None:
+                    motor.reordenar(self._selectividad)
+                print(f"Base de conocimiento cargada desde cache: {len(contenido['reglas'])} reglas")
+                return contenido["reglas"], motor, contenido["compilador"]
+        
+        reglas, compilador = self._cargar_reglas(estricto)
+        motor = crear_motor(self.nombre_motor, reglas, self._selectividad)
+        if cache is not None:
+            self._guardar_cache_binaria(cache, reglas, motor, compilador)
+        return reglas, motor, compilador
+    
+    def _guardar_cache_binaria(self, cache, reglas, motor, compilador):
+        """Escribe la cache binaria a partir del estado en memoria"""
+        # Las reglas van primero para que el motor las reciba completas al deserializar
+        contenido = {"reglas": reglas, "compilador": compilador, "motor": motor}
+        return cache.escribir(contenido, self._configuracion_cache())
+    
+    def _cargar_reglas(self, estricto=False):
+        """Carga las reglas (y el compilador que las convirtio, si se pidio la representacion compacta)"""
+        reglas = None
+        compilador = CompiladorReglas() if self.textos_mapeados or self.reglas_compactas else None
+        if self.textos_mapeados:
+            # Los textos pasan a un archivo mapeado en memoria mientras se lee el JSON; las reglas
+            # agregadas despues conservan los suyos en memoria hasta la siguiente carga
+            ruta_textos = self._ruta_auxiliar("textos.bin")
+            try:
+                reglas = self._leer_reglas_json(
+                    lambda leidas: compilador.compilar_diferidas(leidas, ruta_textos))
+            except (OSError, ValueError) as e:
+                print(f"No se pudieron mapear los textos, se mantienen en memoria: {e}")
+        if reglas is None:
+            convertir = compilador.compilar_todas if compilador is not None else list
+            reglas = self._leer_reglas_json(convertir) if estricto else self._cargar_reglas_desde_json(convertir)
+        if self._diario.existe():
+            entradas = self._diario.entradas()
+            if compilador is not None:
+                for entrada in entradas:
+                    if entrada["operacion"] == "guardar":
+                        entrada["regla"] = compilador.compilar(entrada["regla"])
+            reglas = aplicar_diario(reglas, entradas)
+            print(f"Diario aplicado: {len(entradas)} cambios de reglas")
+        return reglas, compilador
+    
+    def _cargar_reglas_desde_json(self, convertir=list):
         """Carga las reglas desde un archivo JSON externo"""
         try:
-            if not os.path.exists(self.archivo_base_conocimiento):
-                raise FileNotFoundError(f"No se encontro el archivo: {self.archivo_base_conocimiento}")
-            
-            with open(self.archivo_base_conocimiento, 'r', encoding='utf-8') as archivo:
-                datos = json.load(archivo)
-            
-            if "reglas" not in datos:
-                raise ValueError("El archivo JSON no contiene la clave 'reglas'")
-            
-            print(f"Base de conocimiento cargada: {len(datos['reglas'])} reglas")
-            return datos["reglas"]
-            
+            return self._leer_reglas_json(convertir)
         except Exception as e:
             print(f"Error cargando la base de conocimiento: {e}")
             print("Usando reglas por defecto...")
-            return self._cargar_reglas_por_defecto()
+            return convertir(self._cargar_reglas_por_defecto())
+    
+    def _leer_reglas_json(self, convertir):
+        """Lee el arreglo "reglas" de a una regla y lo pasa a 'convertir' sin materializar el documento
+
+        'convertir' recibe un iterador de diccionarios y devuelve la lista de reglas; asi las
+        representaciones compactas se construyen mientras se lee y nunca estan todos los
+        diccionarios en memoria a la vez.
+        """
+        if not os.path.exists(self.archivo_base_conocimiento):
+            raise FileNotFoundError(f"No se encontro el archivo: {self.archivo_base_conocimiento}")
+        
+        with open(self.archivo_base_conocimiento, 'r', encoding='utf-8') as archivo:
+            reglas = convertir(leer_reglas_json(archivo))
+        
+        print(f"Base de conocimiento cargada: {len(reglas)} reglas")
+        return reglas
     
     def _cargar_reglas_por_defecto(self):
         """Reglas por defecto en caso de error"""
@@ -39,21 +459,70 @@ class SistemaExpertoDL:
             }
         ]
     
-    def guardar_reglas_en_json(self):
-        """Guarda las reglas actuales en el archivo JSON"""
+    @sincronizado
+    def guardar_reglas_en_json(self, compacto=None):
+        """Guarda las reglas actuales en el archivo JSON (compacto: sin sangria ni espacios)"""
+        if compacto is None:
+            compacto = self.json_compacto
         try:
             datos = {"reglas": self.reglas}
-            with open(self.archivo_base_conocimiento, 'w', encoding='utf-8') as archivo:
-                json.dump(datos, archivo, indent=2, ensure_ascii=False)
+            formato = {"separators": (",", ":")} if compacto else {"indent": 2}
+            # Se escribe en un temporal que luego reemplaza al archivo: una interrupcion deja la version anterior intacta
+            escribir_atomicamente(
+                self.archivo_base_conocimiento,
+                lambda archivo: json.dump(datos, archivo, ensure_ascii=False, default=regla_a_json, **formato)
+            )
             print(f"Base de conocimiento guardada en: {self.archivo_base_conocimiento}")
-            return True
         except Exception as e:
             print(f"Error guardando la base de conocimiento: {e}")
             return False
+        
+        # El diario se borra solo despues de que el archivo principal ya contiene sus reglas
+        self._diario.eliminar()
+        self._firma_disco = self._firma_en_disco()
+        cache = self._cache_binaria()
+        if cache is not None:
+            self._guardar_cache_binaria(cache, self._reglas, self._motor, self._compilador)
+        return True
+    
+    def compactar_diario(self):
+        """Incorpora las reglas del diario al archivo JSON principal y elimina el diario"""
+        if not self._diario.existe():
+            return True
+        return self.guardar_reglas_en_json()
+    
+    def _calcular_siguiente_id(self, reglas):
+        """Id que recibira la proxima regla agregada; los de reglas eliminadas no se asignan de nuevo"""
+        siguiente = max((regla["id"] for regla in reglas if regla is not None), default=0) + 1
+        return max(siguiente, self._leer_siguiente_id_guardado())
+    
+    def _leer_siguiente_id_guardado(self):
+        """Siguiente id registrado al eliminar reglas (0 si no hay registro)"""
+        ruta = self._ruta_auxiliar("ids.json")
+        if not os.path.exists(ruta):
+            return 0
+        try:
+            with open(ruta, 'r', encoding='utf-8') as archivo:
+                return int(json.load(archivo)["siguiente_id"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Error leyendo el registro de ids: {e}")
+            return 0
+    
+    def _guardar_siguiente_id(self):
+        """Registra el siguiente id junto a la base: tras eliminar la ultima regla, el maximo del archivo ya no basta"""
+        ruta = self._ruta_auxiliar("ids.json")
+        try:
+            escribir_atomicamente(ruta, lambda archivo: json.dump({"siguiente_id": self._siguiente_id}, archivo))
+            return True
+        except (OSError, TypeError) as e:
+            print(f"Error guardando el registro de ids: {e}")
+            return False
     
+    @sincronizado
     def agregar_regla(self, condiciones, recomendacion, justificacion, confianza):
         """Agrega una nueva regla a la base de conocimiento"""
-        nuevo_id = max([regla["id"] for regla in self.reglas]) + 1 if self.reglas else 1
+        nuevo_id = self._siguiente_id
+        self._siguiente_id += 1
         
         nueva_regla = {
             "id": nuevo_id,
@@ -62,9 +531,132 @@ class SistemaExpertoDL:
             "justificacion": justificacion,
             "confianza": confianza
         }
+        if self._compilador is not None:
+            nueva_regla = self._compilador.compilar(nueva_regla)
         
-        self.reglas.append(nueva_regla)
-        return self.guardar_reglas_en_json()
+        posicion = len(self._reglas)
+        self._reglas.append(nueva_regla)
+        if self._posiciones is not None:
+            self._posiciones[nuevo_id] = posicion
+        self._indexar(posicion, nueva_regla)
+        self._reglas_modificadas()
+        return self._persistir({"operacion": "guardar", "regla": nueva_regla})
+    
+    @sincronizado
+    def actualizar_regla(self, regla_id, condiciones=None, recomendacion=None, justificacion=None, confianza=None):
+        """Modifica los campos indicados de una regla, que conserva su id y su lugar en la base"""
+        posicion = self._indice_ids().get(regla_id)
+        if posicion is None:
+            print(f"No existe la regla #{regla_id}")
+            return False
+        anterior = self._reglas[posicion]
+        
+        datos = dict(anterior.items())
+        cambios = {"condiciones": condiciones, "recomendacion": recomendacion,
+                   "justificacion": justificacion, "confianza": confianza}
+        datos.update((campo, valor) for campo, valor in cambios.items() if valor is not None)
+        validar_regla(datos)
+        if self._compilador is not None:
+            datos = self._compilador.compilar(datos)
+        
+        self._desindexar(posicion, anterior)
+        self._reglas[posicion] = datos
+        self._indexar(posicion, datos)
+        self._reglas_modificadas()
+        return self._persistir({"operacion": "guardar", "regla": datos})
+    
+    @sincronizado
+    def eliminar_regla(self, regla_id):
+        """Elimina una regla dejando un hueco en su posicion (las demas no se mueven)"""
+        posicion = self._indice_ids().pop(regla_id, None)
+        if posicion is None:
+            print(f"No existe la regla #{regla_id}")
+            return False
+        self._desindexar(posicion, self._reglas[posicion])
+        self._reglas[posicion] = None
+        self._eliminadas += 1
+        self._reglas_modificadas()
+        # El siguiente id se registra antes de que el archivo deje de contener el eliminado
+        registrado = self._guardar_siguiente_id()
+        guardado = self._persistir({"operacion": "eliminar", "id": regla_id})
+        if self._eliminadas > max(MIN_ELIMINADAS_COMPACTAR, len(self._reglas) // 4):
+            self._compactar_posiciones()
+        return guardado and registrado
+    
+    def _indexar(self, posicion, regla):
+        """Registra la regla de 'posicion' en el motor y la tabla"""
+        self._motor.indexar(posicion, regla)
+        if self._tabla is not None:
+            self._tabla.indexar(posicion, regla)
+    
+    def _desindexar(self, posicion, regla):
+        """Quita la regla de 'posicion' (aun presente en self._reglas) de todas las estructuras derivadas"""
+        self._motor.retirar(posicion, regla)
+        if self._tabla is not None:
+            self._tabla.retirar(posicion, regla)
+    
+    def _compactar_posiciones(self):
+        """Elimina los huecos de las reglas borradas y reconstruye las estructuras por posicion"""
+        self._usar_reglas(self.reglas)
+        self._motor = crear_motor(self.nombre_motor, self._reglas, self._selectividad)
+        # La tabla guardada puede tener la misma firma si no se pudo reescribir la base
+        self._tabla = self._crear_tabla_respuestas(self._reglas, usar_guardada=False)
+        self._reglas_modificadas()
+    
+    def _persistir(self, entrada):
+        """Guarda un cambio en el diario o, si no se usa, reescribe la base completa"""
+        if not self.usar_diario:
+            return self.guardar_reglas_en_json()
+        try:
+            self._diario.registrar(entrada, default=regla_a_json)
+            # El cambio propio no debe verse como una modificacion externa
+            self._firma_disco = self._firma_en_disco()
+            return True
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error registrando el cambio en el diario: {e}")
+            return False
+    
+    @sincronizado
+    def agregar_reglas_lote(self, reglas):
+        """Agrega muchas reglas a la vez: valida todas antes de modificar nada y guarda la base una sola vez"""
+        # Se consume la fuente una unica vez, asi que admite generadores que leen de archivo
+        nuevas = []
+        siguiente_id = self._siguiente_id
+        for numero, datos in enumerate(reglas, 1):
+            try:
+                validar_regla(datos)
+            except ValueError as e:
+                raise ValueError(f"Regla {numero} del lote: {e}") from None
+            regla = {
+                "id": siguiente_id,
+                "condiciones": dict(datos["condiciones"]),
+                "recomendacion": datos["recomendacion"],
+                "justificacion": datos["justificacion"],
+                "confianza": datos["confianza"]
+            }
+            regla.update((clave, valor) for clave, valor in datos.items() if clave not in CAMPOS_REGLA)
+            if self._compilador is not None:
+                regla = self._compilador.compilar(regla)
+            nuevas.append(regla)
+            siguiente_id += 1
+        if not nuevas:
+            return True
+        
+        if self._eliminadas:
+            self._usar_reglas(self.reglas)
+        primera = len(self._reglas)
+        self._reglas.extend(nuevas)
+        if self._posiciones is not None:
+            self._posiciones.update((regla["id"], primera + i) for i, regla in enumerate(nuevas))
+        self._siguiente_id = siguiente_id
+        # Reconstruir los indices una vez es lineal; indexar regla por regla no siempre lo es
+        self._motor = crear_motor(self.nombre_motor, self._reglas, self._selectividad)
+        self._reglas_modificadas()
+        guardado = self.guardar_reglas_en_json()
+        # La tabla se crea despues de guardar para que su archivo lleve la firma de la base nueva
+        self._tabla = self._crear_tabla_respuestas(self._reglas, usar_guardada=False)
+        print(f"Reglas agregadas: {len(nuevas)}")
+        return guardado
     
     def _preguntar_opciones(self, pregunta, opciones, obligatorio=True):
         """Hace una pregunta con opciones especificas"""
@@ -86,153 +678,185 @@ class SistemaExpertoDL:
             except ValueError:
                 print("ERROR: Por favor, ingrese un numero valido")
     
+    @sincronizado
+    def catalogo_preguntas(self):
+        """Catalogo de preguntas para las reglas vigentes (ver crear_catalogo)"""
+        # Se construye al pedirlo y se descarta al modificar las reglas
+        if self._catalogo is None:
+            self._catalogo = crear_catalogo(self._reglas)
+        return self._catalogo
+    
+    def crear_emparejador(self):
+        """Crea un emparejador incremental para una sesion de preguntas"""
+        return EmparejadorIncremental(self._reglas)
+    
+    @sincronizado
+    def vista_previa(self, hechos, k=TOP_VISTA_PREVIA):
+        """Las k recomendaciones de mayor confianza para un formulario a medio completar
+
+        Devuelve (recomendaciones, reglas aun posibles). Entre llamadas se conserva un
+        emparejador incremental y solo se le pasan los hechos que cambiaron, asi que recalcular
+        tras cada respuesta cuesta lo que las reglas que mencionan ese atributo.
+        """
+        emparejador, version = self._vista_previa or (None, None)
+        if version != self._version_reglas:
+            # Las reglas cambiaron (edicion o recarga): se empieza con un emparejador nuevo
+            emparejador = self.crear_emparejador()
+            self._vista_previa = (emparejador, self._version_reglas)
+        for atributo in [atributo for atributo in emparejador.hechos if atributo not in hechos]:
+            emparejador.retirar(atributo)
+        for atributo, valor in hechos.items():
+            if atributo not in emparejador.hechos or emparejador.hechos[atributo] != valor:
+                emparejador.asignar(atributo, valor)
+        recomendaciones = [self._crear_recomendacion(self._reglas[posicion]) for posicion in emparejador.mejores(k)]
+        return recomendaciones, emparejador.cantidad_posibles()
+    
+    def _registrar_respuesta(self, hechos, clave, valor):
+        """Guarda una respuesta y muestra cuantas reglas siguen en juego"""
+        hechos[clave] = valor
+        self.emparejador.asignar(clave, valor)
+        print(f"  Reglas que ya aplican: {self.emparejador.cantidad_coincidencias()} | "
+              f"Reglas aun posibles: {self.emparejador.cantidad_posibles()}")
+    
     def recolectar_hechos_interactivo(self):
-        """Recolecta los hechos preguntando uno por uno"""
+        """Recolecta los hechos preguntando uno por uno, en el orden del catalogo de preguntas"""
         hechos = {}
+        self.emparejador = self.crear_emparejador()
+        catalogo = self.catalogo_preguntas()
         
         print("\n" + "="*60)
         print("ANALISIS DE SU DATASET - PREGUNTAS INTERACTIVAS")
         print("="*60)
         
-        # 1. Tipo de datos
-        print("\nPREGUNTA 1: TIPO DE DATOS")
-        tipo_opciones = [
-            "Imagenes (fotos, dibujos, etc.)",
-            "Texto (documentos, mensajes, etc.)", 
-            "Series Temporales (datos con orden temporal)",
-            "Datos Tabulares (tablas, hojas de calculo)",
-            "Audio (sonidos, voz, musica)"
-        ]
-        tipo_valores = ["imagenes", "texto", "series_temporales", "tabular", "audio"]
-        
-        respuesta = self._preguntar_opciones("Que tipo de datos tiene?", tipo_opciones)
-        hechos["tipo_datos"] = tipo_valores[tipo_opciones.index(respuesta)]
-        
-        # 2. Tamaño del dataset
-        print("\nPREGUNTA 2: TAMAÑO DEL DATASET")
-        tamano_opciones = [
-            "Muy pequeño (menos de 1,000 muestras)",
-            "Pequeño (1,000 - 10,000 muestras)",
-            "Medio (10,000 - 100,000 muestras)", 
-            "Grande (100,000 - 1,000,000 muestras)",
-            "Muy grande (mas de 1,000,000 muestras)"
-        ]
-        tamano_valores = ["muy_pequeno", "pequeno", "medio", "grande", "muy_grande"]
-        
-        respuesta = self._preguntar_opciones("Que tamaño tiene su dataset?", tamano_opciones)
-        hechos["tamano_dataset"] = tamano_valores[tamano_opciones.index(respuesta)]
-        
-        # 3. Recursos computacionales
-        print("\nPREGUNTA 3: RECURSOS COMPUTACIONALES")
-        recursos_opciones = [
-            "Muy bajos (solo CPU basico)",
-            "Bajos (CPU bueno, sin GPU)",
-            "Medios (GPU basica o limitada)",
-            "Altos (GPU buena, como RTX 3080/4090)",
-            "Muy altos (multiples GPUs, servidores)"
-        ]
-        recursos_valores = ["muy_bajo", "bajo", "medio", "alto", "muy_alto"]
-        
-        respuesta = self._preguntar_opciones("Que recursos computacionales tiene disponibles?", recursos_opciones)
-        hechos["recursos_computacionales"] = recursos_valores[recursos_opciones.index(respuesta)]
-        
-        # 4. Tarea principal
-        print("\nPREGUNTA 4: TAREA PRINCIPAL")
-        tarea_opciones = [
-            "Clasificacion (categorizar en clases)",
-            "Regresion (predecir valores numericos)",
-            "Segmentacion (dividir en partes)",
-            "Deteccion (encontrar objetos)",
-            "Generacion (crear nuevo contenido)",
-            "Reconocimiento de voz"
-        ]
-        tarea_valores = ["clasificacion", "regresion", "segmentacion", "deteccion", "generacion", "reconocimiento_voz"]
-        
-        respuesta = self._preguntar_opciones("Cual es la tarea principal que quiere realizar?", tarea_opciones, obligatorio=False)
-        if respuesta:
-            hechos["tarea"] = tarea_valores[tarea_opciones.index(respuesta)]
-        
-        # 5. Preguntas especificas segun tipo de datos
-        if hechos["tipo_datos"] == "texto":
-            print("\nPREGUNTA ESPECIFICA: LONGITUD DEL TEXTO")
-            longitud_opciones = [
-                "Corto (menos de 128 palabras/tokens)",
-                "Medio (128-512 palabras/tokens)", 
-                "Largo (mas de 512 palabras/tokens)"
-            ]
-            longitud_valores = ["corto", "medio", "largo"]
-            
-            respuesta = self._preguntar_opciones("Que longitud tienen sus textos?", longitud_opciones, obligatorio=False)
-            if respuesta:
-                hechos["longitud_texto"] = longitud_valores[longitud_opciones.index(respuesta)]
-        
-        elif hechos["tipo_datos"] == "series_temporales":
-            print("\nPREGUNTA ESPECIFICA: PATRONES TEMPORALES")
-            patrones_opciones = [
-                "Simples (patrones faciles de identificar)",
-                "Complejos (multiples patrones entrelazados)",
-                "Largos (dependencias de largo plazo)"
-            ]
-            patrones_valores = ["simples", "complejos", "largos"]
-            
-            respuesta = self._preguntar_opciones("Que tipo de patrones temporales espera encontrar?", patrones_opciones, obligatorio=False)
-            if respuesta:
-                hechos["patrones_temporales"] = patrones_valores[patrones_opciones.index(respuesta)]
-        
-        elif hechos["tipo_datos"] == "tabular":
-            print("\nPREGUNTA ESPECIFICA: RELACIONES ENTRE VARIABLES")
-            relaciones_opciones = [
-                "Si, hay relaciones complejas y no lineales",
-                "No, las relaciones son simples o lineales"
-            ]
-            
-            respuesta = self._preguntar_opciones("Espera encontrar relaciones complejas entre las variables?", relaciones_opciones, obligatorio=False)
-            if respuesta:
-                hechos["relaciones_no_lineales"] = respuesta.startswith("Si")
-        
-        # 6. Interpretabilidad
-        print("\nPREGUNTA FINAL: INTERPRETABILIDAD")
-        interpretabilidad_opciones = [
-            "Si, es importante entender como el modelo toma decisiones",
-            "No, el rendimiento es mas importante que la explicabilidad"
-        ]
-        
-        respuesta = self._preguntar_opciones("Requiere que el modelo sea interpretable?", interpretabilidad_opciones, obligatorio=False)
-        if respuesta:
-            hechos["requiere_interpretabilidad"] = respuesta.startswith("Si")
+        numero = 0
+        for pregunta in catalogo.preguntas:
+            # El tipo de datos se pregunta primero y decide que preguntas especificas se hacen
+            if pregunta.tipo_datos is not None and pregunta.tipo_datos != hechos.get("tipo_datos"):
+                continue
+            numero += 1
+            print(f"\nPREGUNTA {numero}: {pregunta.titulo.upper()}")
+            respuesta = self._preguntar_opciones(pregunta.texto, pregunta.etiquetas(), obligatorio=pregunta.obligatoria)
+            if respuesta is None:
+                continue
+            valor = pregunta.valor(respuesta)
+            if valor is not None:
+                self._registrar_respuesta(hechos, pregunta.atributo, valor)
         
         return hechos
     
-    def inferir(self, hechos_usuario):
-        """Ejecuta el motor de inferencia"""
+    @sincronizado
+    def inferir(self, hechos_usuario, top_k=None):
+        """Ejecuta el motor de inferencia (con top_k solo se devuelven las k de mayor confianza)"""
         self.hechos = hechos_usuario
         recomendaciones = []
         
         print(f"\nAnalizando caracteristicas del dataset...")
         print(f"Hechos proporcionados: {hechos_usuario}")
         
-        for regla in self.reglas:
-            if self._evaluar_condiciones(regla["condiciones"]):
-                recomendaciones.append({
-                    "tecnica": regla["recomendacion"],
-                    "justificacion": regla["justificacion"],
-                    "confianza": regla["confianza"],
-                    "regla_id": regla["id"]
-                })
-                print(f"Regla #{regla['id']} aplicada: {regla['recomendacion']}")
+        if top_k is not None:
+            recomendaciones, _ = self.inferir_pagina(hechos_usuario, top_k)
+            for rec in recomendaciones:
+                print(f"Regla #{rec['regla_id']} aplicada: {rec['tecnica']}")
+            return recomendaciones
+        
+        motor = self._motor
+        for posicion in self._coincidencias(motor, hechos_usuario):
+            regla = motor.reglas[posicion]
+            recomendaciones.append(self._crear_recomendacion(regla))
+            print(f"Regla #{regla['id']} aplicada: {regla['recomendacion']}")
         
         # Ordenar por confianza
         recomendaciones.sort(key=lambda x: x["confianza"], reverse=True)
         return recomendaciones
     
+    @sincronizado
+    def inferir_pagina(self, hechos_usuario, tamano_pagina, cursor=0, cancelado=None):
+        """Devuelve la siguiente pagina de recomendaciones y el cursor para continuar (None al terminar)
+
+        El cursor es la cantidad de recomendaciones ya entregadas. 'cancelado' es una funcion sin
+        argumentos que se consulta entre etapas; si devuelve True la consulta se abandona (liberando
+        el bloqueo para la siguiente) y se devuelve None.
+        """
+        if cancelado is None:
+            cancelado = lambda: False
+        if cancelado():
+            return None
+        # Las coincidencias salen del indice del motor (o de la tabla o la cache) y solo
+        # se ordenan las que llegan hasta el final de la pagina pedida
+        motor = self._motor
+        posiciones = self._coincidencias(motor, hechos_usuario)
+        if cancelado():
+            return None
+        reglas = motor.reglas
+        fin = cursor + tamano_pagina
+        primeras = heapq.nsmallest(fin, posiciones, key=lambda p: (-reglas[p]["confianza"], p))
+        recomendaciones = []
+        for posicion in primeras[cursor:]:
+            # Con textos mapeados cada recomendacion lee de disco
+            if cancelado():
+                return None
+            recomendaciones.append(self._crear_recomendacion(reglas[posicion]))
+        return recomendaciones, (fin if fin < len(posiciones) else None)
+    
+    def _coincidencias(self, motor, hechos):
+        """Obtiene las posiciones de reglas que se cumplen, usando la tabla o la cache si estan activas"""
+        if self._tabla is not None:
+            posiciones = self._tabla.buscar(hechos)
+            if posiciones is not None:
+                return posiciones
+        if self._cache is None:
+            return self._emparejar(motor, hechos)
+        try:
+            clave = frozenset(hechos.items())
+        except TypeError:
+            # Hechos con valores no hashables no se pueden cachear
+            return self._emparejar(motor, hechos)
+        posiciones = self._cache.obtener(clave)
+        if posiciones is None:
+            posiciones = tuple(self._emparejar(motor, hechos))
+            self._cache.guardar(clave, posiciones)
+        return posiciones
+    
+    def _emparejar(self, motor, hechos):
+        """Ejecuta el motor (y, si esta activo, el aprendizaje de selectividad)"""
+        if self.aprender_selectividad:
+            self._observar_selectividad(motor, hechos)
+        return motor.coincidencias(hechos)
+    
+    @sincronizado
+    def inferir_lote(self, lista_de_hechos, top_k=None):
+        """Ejecuta el motor de inferencia sobre varios conjuntos de hechos a la vez
+
+        Con top_k solo se construyen las k recomendaciones de mayor confianza de cada conjunto.
+        """
+        if self._matriz_lote is None:
+            self._matriz_lote = MatrizReglas(self._reglas)
+        matriz = self._matriz_lote
+        reglas = matriz.reglas
+        
+        # Los perfiles repetidos comparten fila de codigos y se resuelven una sola vez
+        filas = [matriz.codificar(hechos) for hechos in lista_de_hechos]
+        posiciones_por_fila = matriz.coincidencias_lote(filas)
+        for posiciones in posiciones_por_fila.values():
+            posiciones.sort(key=lambda posicion: reglas[posicion]["confianza"], reverse=True)
+        
+        return [
+            [self._crear_recomendacion(reglas[posicion]) for posicion in posiciones_por_fila[fila][:top_k]]
+            for fila in filas
+        ]
+    
+    def _crear_recomendacion(self, regla):
+        """Construye el resultado de inferencia correspondiente a una regla"""
+        return {
+            "tecnica": regla["recomendacion"],
+            "justificacion": regla["justificacion"],
+            "confianza": regla["confianza"],
+            "regla_id": regla["id"]
+        }
+    
     def _evaluar_condiciones(self, condiciones):
         """Evalúa si se cumplen todas las condiciones de una regla"""
-        for clave, valor in condiciones.items():
-            if clave not in self.hechos:
-                return False
-            if self.hechos[clave] != valor:
-                return False
-        return True
+        return cumple_condiciones(condiciones, self.hechos)
     
     def mostrar_resultados(self, recomendaciones, hechos):
         """Muestra los resultados de forma clara"""
@@ -246,7 +870,8 @@ class SistemaExpertoDL:
             if isinstance(valor, bool):
                 valor_str = "Si" if valor else "No"
             else:
-                valor_str = valor.replace('_', ' ').title()
+                # Los atributos tomados de las reglas pueden tener valores numericos
+                valor_str = str(valor).replace('_', ' ').title()
             print(f"   - {nombre_bonito}: {valor_str}")
         
         print(f"\nTECNICAS RECOMENDADAS:")
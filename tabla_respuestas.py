@@ -0,0 +1,131 @@
+"""Tabla precalculada de respuestas sobre el dominio finito de hechos del sistema experto"""
+
+import bisect
+import itertools
+import json
+from catalogo_preguntas import CATALOGO_BASE
+from motores_inferencia import MatrizReglas, cumple_condiciones
+
+# Cada atributo general que agregan las reglas multiplica las combinaciones de todos los tipos de
+# datos; los tipos que superan este limite no se precalculan y sus consultas van al motor
+MAX_COMBINACIONES = 50000
+
+
+def enumerar_hechos(tipo_datos, catalogo=CATALOGO_BASE):
+    """Genera todas las combinaciones de respuestas posibles del catalogo para un tipo de datos"""
+    dominio = catalogo.dominio(tipo_datos)
+    atributos = list(dominio)
+    for valores in itertools.product(*(dominio[atributo] for atributo in atributos)):
+        yield {atributo: valor for atributo, valor in zip(atributos, valores) if valor is not None}
+
+
+def _clave(hechos):
+    """Forma canonica e inmutable de un diccionario de hechos"""
+    return frozenset(hechos.items())
+
+
+class TablaRespuestas:
+    """Recomendaciones ya ordenadas por confianza para cada combinacion de hechos del dominio"""
+
+    def __init__(self, reglas, perezosa=False, catalogo=CATALOGO_BASE):
+        self.reglas = reglas
+        # El dominio son las respuestas que pueden dar las interfaces segun el catalogo de preguntas
+        self.catalogo = catalogo
+        self._tipos_datos = frozenset(tipo_datos for tipo_datos in catalogo.tipos_datos()
+                                      if catalogo.combinaciones(tipo_datos) <= MAX_COMBINACIONES)
+        self._particiones = {}
+        self._matriz = None
+        if not perezosa:
+            for tipo_datos in catalogo.tipos_datos():
+                if tipo_datos in self._tipos_datos:
+                    self._construir_particion(tipo_datos)
+            self._matriz = None
+
+    def _construir_particion(self, tipo_datos):
+        """Calcula las respuestas de todas las combinaciones de un tipo de datos"""
+        if self._matriz is None:
+            self._matriz = MatrizReglas(self.reglas)
+        reglas = self.reglas
+        combinaciones = list(enumerar_hechos(tipo_datos, self.catalogo))
+        filas = [self._matriz.codificar(hechos) for hechos in combinaciones]
+        posiciones_por_fila = self._matriz.coincidencias_lote(filas)
+
+        particion = {}
+        for hechos, fila in zip(combinaciones, filas):
+            posiciones = sorted(posiciones_por_fila[fila], key=lambda p: reglas[p]["confianza"], reverse=True)
+            particion[_clave(hechos)] = posiciones
+        self._particiones[tipo_datos] = particion
+        return particion
+
+    def buscar(self, hechos):
+        """Devuelve las posiciones ordenadas de las reglas que se cumplen, o None si los hechos estan fuera del dominio
+
+        Tambien devuelve None para los tipos de datos con mas de MAX_COMBINACIONES combinaciones.
+        """
+        tipo_datos = hechos.get("tipo_datos")
+        try:
+            particion = self._particiones.get(tipo_datos)
+            if particion is None:
+                if tipo_datos not in self._tipos_datos:
+                    return None
+                particion = self._construir_particion(tipo_datos)
+            return particion.get(_clave(hechos))
+        except TypeError:
+            # Un valor no hashable no esta en el dominio
+            return None
+
+    def indexar(self, posicion, regla):
+        """Inserta una regla nueva en las respuestas de las combinaciones que la cumplen"""
+        self._matriz = None
+        condiciones = regla["condiciones"]
+        # Mismo orden que sorted(..., reverse=True) sobre la confianza: empates por posicion
+        orden = lambda p: (-self.reglas[p]["confianza"], p)
+        for tipo_datos, particion in self._particiones.items():
+            if condiciones.get("tipo_datos", tipo_datos) != tipo_datos:
+                continue
+            for clave, posiciones in particion.items():
+                if cumple_condiciones(condiciones, dict(clave)):
+                    bisect.insort(posiciones, posicion, key=orden)
+
+    def retirar(self, posicion, regla):
+        """Quita una regla (con sus condiciones y confianza de entonces) de las respuestas que la contenian"""
+        self._matriz = None
+        condiciones = regla["condiciones"]
+        for tipo_datos, particion in self._particiones.items():
+            if condiciones.get("tipo_datos", tipo_datos) != tipo_datos:
+                continue
+            for clave, posiciones in particion.items():
+                if cumple_condiciones(condiciones, dict(clave)):
+                    posiciones.remove(posicion)
+
+    def guardar(self, ruta, firma):
+        """Escribe la tabla en disco junto con la firma de la base de conocimiento"""
+        datos = {
+            "firma": firma,
+            "dominio": self.catalogo.a_json(),
+            "particiones": {
+                tipo_datos: [[sorted(clave, key=lambda par: par[0]), posiciones]
+                             for clave, posiciones in particion.items()]
+                for tipo_datos, particion in self._particiones.items()
+            }
+        }
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            json.dump(datos, archivo, ensure_ascii=False)
+
+    @classmethod
+    def cargar(cls, ruta, reglas, firma, catalogo=CATALOGO_BASE):
+        """Lee una tabla guardada; devuelve None si no corresponde a la base de conocimiento o al catalogo actuales"""
+        with open(ruta, 'r', encoding='utf-8') as archivo:
+            datos = json.load(archivo)
+        if datos.get("firma") != firma or datos.get("dominio") != catalogo.a_json():
+            return None
+
+        tabla = cls(reglas, perezosa=True, catalogo=catalogo)
+        for tipo_datos, entradas in datos["particiones"].items():
+            if tipo_datos not in tabla._tipos_datos:
+                continue
+            tabla._particiones[tipo_datos] = {
+                frozenset((atributo, valor) for atributo, valor in pares): posiciones
+                for pares, posiciones in entradas
+            }
+        return tabla
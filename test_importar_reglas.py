@@ -0,0 +1,85 @@
+import unittest
+from unittest import mock
+import io
+import json
+import os
+from importar_reglas import leer_reglas_csv, leer_reglas_jsonl, main
+from sistema_experto import SistemaExpertoDL
+from test_sistema_experto import generar_reglas_aleatorias, crear_base_temporal
+
+class TestImportarReglas(unittest.TestCase):
+    """Pruebas de la lectura de reglas desde JSON Lines y CSV"""
+    
+    def setUp(self):
+        self.reglas = generar_reglas_aleatorias(50, semilla=43)
+        self.archivo = crear_base_temporal(self.reglas)
+        self.entradas = []
+        
+    def tearDown(self):
+        for ruta in [self.archivo] + self.entradas:
+            if os.path.exists(ruta):
+                os.unlink(ruta)
+    
+    def _escribir_entrada(self, sufijo, contenido):
+        ruta = os.path.splitext(self.archivo)[0] + sufijo
+        with open(ruta, 'w', encoding='utf-8', newline='') as f:
+            f.write(contenido)
+        self.entradas.append(ruta)
+        return ruta
+    
+    def test_csv_columnas_como_condiciones(self):
+        """Las columnas adicionales son condiciones; las celdas vacias se omiten y true/false son booleanos"""
+        entrada = io.StringIO(
+            "recomendacion,justificacion,confianza,tipo_datos,requiere_interpretabilidad\n"
+            "Arbol,\"Simple, explicable\",0.8,tabular,true\n"
+            "CNN,Imagenes,0.9,imagenes,\n"
+        )
+        self.assertEqual(list(leer_reglas_csv(entrada)), [
+            {"condiciones": {"tipo_datos": "tabular", "requiere_interpretabilidad": True},
+             "recomendacion": "Arbol", "justificacion": "Simple, explicable", "confianza": 0.8},
+            {"condiciones": {"tipo_datos": "imagenes"},
+             "recomendacion": "CNN", "justificacion": "Imagenes", "confianza": 0.9},
+        ])
+    
+    def test_errores_con_numero_de_linea(self):
+        """Los errores de formato indican la linea y detienen la lectura"""
+        with self.assertRaisesRegex(ValueError, "linea 3"):
+            list(leer_reglas_csv(io.StringIO("recomendacion,justificacion,confianza\nA,B,0.5\nA,B,alta\n")))
+        with self.assertRaisesRegex(ValueError, "columnas: confianza"):
+            list(leer_reglas_csv(io.StringIO("recomendacion,justificacion\n")))
+        with self.assertRaisesRegex(ValueError, "linea 3"):
+            list(leer_reglas_jsonl(io.StringIO('{}\n\n{roto\n')))
+    
+    def test_lectura_perezosa(self):
+        """El lector JSONL no consume la entrada por adelantado"""
+        lineas = iter(['{"a": 1}\n', '{"a": 2}\n'])
+        lector = leer_reglas_jsonl(lineas)
+        self.assertEqual(next(lector), {"a": 1})
+        self.assertEqual(next(lineas), '{"a": 2}\n')
+    
+    def test_linea_de_comandos(self):
+        """El script agrega todas las reglas del archivo o ninguna si alguna es invalida"""
+        nuevas = [{"condiciones": {"tipo_datos": "audio"}, "recomendacion": f"Nueva {i}",
+                   "justificacion": "Importada", "confianza": 0.7} for i in range(20)]
+        jsonl = self._escribir_entrada(".jsonl", "".join(json.dumps(regla) + "\n" for regla in nuevas))
+        csv = self._escribir_entrada(".csv", "recomendacion,justificacion,confianza,tarea\nUna,Dos,0.6,regresion\n")
+        invalido = self._escribir_entrada(".invalido.jsonl", '{"condiciones": {}, "recomendacion": "X"}\n')
+        lista = self._escribir_entrada(".lista.jsonl", json.dumps(
+            {"condiciones": {"tipo_datos": ["audio"]}, "recomendacion": "X", "justificacion": "Y", "confianza": 0.5}))
+        
+        salida_error = io.StringIO()
+        with mock.patch("sys.stderr", salida_error):
+            self.assertEqual(main([jsonl, "-b", self.archivo]), 0)
+            self.assertEqual(main([csv, "-b", self.archivo]), 0)
+            self.assertEqual(main([invalido, "-b", self.archivo]), 1)
+            self.assertEqual(main([lista, "-b", self.archivo]), 1)
+        self.assertIn("No se importo ninguna regla", salida_error.getvalue())
+        
+        reglas = SistemaExpertoDL(self.archivo).reglas
+        self.assertEqual(len(reglas), 71)
+        self.assertEqual([regla["id"] for regla in reglas[50:]], list(range(51, 72)))
+        self.assertEqual(reglas[-1]["condiciones"], {"tarea": "regresion"})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
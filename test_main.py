@@ -0,0 +1,98 @@
+import unittest
+import os
+import selectors
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+# Limites holgados: la prueba busca regresiones grandes (p. ej. volver a importar Qt al inicio)
+LIMITE_IMPORTACION_S = 1.0
+LIMITE_PRIMER_PROMPT_S = 3.0
+
+
+def leer_hasta(proceso, marcador, limite_s):
+    """Lee la salida del proceso hasta encontrar el marcador; devuelve el tiempo transcurrido"""
+    inicio = time.perf_counter()
+    selector = selectors.DefaultSelector()
+    selector.register(proceso.stdout, selectors.EVENT_READ)
+    leido = b""
+    try:
+        while marcador.encode() not in leido:
+            restante = limite_s - (time.perf_counter() - inicio)
+            if restante <= 0 or not selector.select(restante):
+                raise AssertionError(f"No aparecio '{marcador}' en {limite_s}s. Salida: {leido!r}")
+            fragmento = os.read(proceso.stdout.fileno(), 4096)
+            if not fragmento:
+                raise AssertionError(f"El proceso termino antes de mostrar '{marcador}'. Salida: {leido!r}")
+            leido += fragmento
+    finally:
+        selector.close()
+    return time.perf_counter() - inicio
+
+
+class TestArranqueMain(unittest.TestCase):
+    """Pruebas de rendimiento del arranque de main.py en modo consola"""
+    
+    def test_importar_main_no_carga_qt(self):
+        """Importar main no debe importar la interfaz grafica ni PyQt5 (medido con -X importtime)"""
+        resultado = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            capture_output=True, text=True, cwd=DIRECTORIO
+        )
+        self.assertEqual(resultado.returncode, 0, resultado.stderr)
+        
+        modulos = {}
+        for linea in resultado.stderr.splitlines():
+            if not linea.startswith("import time:") or "|" not in linea:
+                continue
+            _, acumulado, nombre = linea[len("import time:"):].split("|")
+            if acumulado.strip().isdigit():
+                modulos[nombre.strip()] = int(acumulado)
+        
+        self.assertIn("main", modulos)
+        self.assertNotIn("interfaz_grafica", modulos)
+        self.assertFalse([nombre for nombre in modulos if nombre.startswith("PyQt5")])
+        print(f"\nImportacion de main: {modulos['main'] / 1e6:.3f}s acumulados")
+        self.assertLess(modulos["main"] / 1e6, LIMITE_IMPORTACION_S)
+    
+    def test_tiempo_hasta_primer_prompt(self):
+        """El modo consola debe mostrar su menu rapidamente"""
+        # main.py escribe la cache binaria junto a la base: se usa una copia en un directorio temporal
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        shutil.copy(os.path.join(DIRECTORIO, "base_conocimiento.json"), directorio.name)
+        
+        inicio = time.perf_counter()
+        proceso = subprocess.Popen(
+            [sys.executable, os.path.join(DIRECTORIO, "main.py")], cwd=directorio.name,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        try:
+            leer_hasta(proceso, "Seleccione el modo de interfaz", LIMITE_PRIMER_PROMPT_S)
+            primer_prompt = time.perf_counter() - inicio
+            
+            proceso.stdin.write(b"1\n")
+            proceso.stdin.flush()
+            leer_hasta(proceso, "Seleccione una opcion (1-4)", LIMITE_PRIMER_PROMPT_S)
+            menu_consola = time.perf_counter() - inicio
+            
+            proceso.stdin.write(b"4\n")
+            proceso.stdin.flush()
+            self.assertEqual(proceso.wait(timeout=LIMITE_PRIMER_PROMPT_S), 0)
+        finally:
+            if proceso.poll() is None:
+                proceso.kill()
+            proceso.stdin.close()
+            proceso.stdout.close()
+        
+        print(f"\nPrimer prompt: {primer_prompt:.3f}s, menu de consola: {menu_consola:.3f}s")
+        self.assertLess(primer_prompt, LIMITE_PRIMER_PROMPT_S)
+        self.assertLess(menu_consola, LIMITE_PRIMER_PROMPT_S)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
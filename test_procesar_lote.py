@@ -0,0 +1,79 @@
+import unittest
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from procesar_lote import leer_bloques, procesar
+from sistema_experto import SistemaExpertoDL
+from test_sistema_experto import generar_hechos_aleatorios, generar_reglas_aleatorias, inferir_lineal, crear_base_temporal
+
+class TestProcesarLote(unittest.TestCase):
+    """Pruebas del procesamiento por lotes en formato JSON Lines"""
+    
+    def setUp(self):
+        self.reglas = generar_reglas_aleatorias(200, semilla=20)
+        self.archivo = crear_base_temporal(self.reglas)
+        # main activa la cache binaria, que se escribe junto a la base
+        self.archivo_cache = os.path.splitext(self.archivo)[0] + ".cache.pkl"
+        
+    def tearDown(self):
+        for archivo in (self.archivo, self.archivo_cache):
+            if os.path.exists(archivo):
+                os.unlink(archivo)
+    
+    def test_bloques_acotados(self):
+        """La entrada se consume en bloques del tamano pedido, omitiendo lineas vacias"""
+        entrada = io.StringIO("a\n\nb\nc\nd\ne\n")
+        bloques = list(leer_bloques(entrada, 2))
+        self.assertEqual([len(bloque) for bloque in bloques], [2, 2, 1])
+        self.assertEqual(bloques[0], [(1, "a\n"), (3, "b\n")])
+    
+    def test_una_salida_por_linea(self):
+        """Cada linea de entrada produce una linea de salida en el mismo orden"""
+        perfiles = [generar_hechos_aleatorios(semilla) for semilla in range(25)]
+        entrada = io.StringIO("".join(json.dumps(hechos) + "\n" for hechos in perfiles) +
+                              '{roto\n[1, 2]\n{"tipo_datos": ["imagenes"]}\n')
+        salida = io.StringIO()
+        sistema = SistemaExpertoDL(self.archivo)
+        
+        procesadas, errores = procesar(entrada, salida, sistema, tamano_bloque=4)
+        
+        self.assertEqual((procesadas, errores), (25, 3))
+        registros = [json.loads(linea) for linea in salida.getvalue().splitlines()]
+        self.assertEqual(len(registros), 28)
+        for hechos, registro in zip(perfiles, registros):
+            self.assertEqual(registro["hechos"], hechos)
+            self.assertEqual(registro["recomendaciones"], inferir_lineal(self.reglas, hechos))
+        self.assertEqual([registro["linea"] for registro in registros[25:]], [26, 27, 28])
+    
+    def test_top_k(self):
+        """Con top_k se limita la cantidad de recomendaciones por linea"""
+        salida = io.StringIO()
+        procesar(io.StringIO("{}\n"), salida, SistemaExpertoDL(self.archivo), top_k=1)
+        self.assertLessEqual(len(json.loads(salida.getvalue())["recomendaciones"]), 1)
+    
+    def test_linea_de_comandos_sin_qt(self):
+        """El script debe dejar stdout limpio y no importar PyQt5"""
+        codigo = (
+            "import sys, procesar_lote\n"
+            "codigo = procesar_lote.main(sys.argv[1:])\n"
+            "assert not any(m.split('.')[0] == 'PyQt5' for m in sys.modules)\n"
+            "sys.exit(codigo)\n"
+        )
+        entrada = '{"tipo_datos": "imagenes"}\n{"tipo_datos": "audio"}\n'
+        resultado = subprocess.run(
+            [sys.executable, "-c", codigo, "-b", self.archivo],
+            input=entrada, capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        self.assertEqual(resultado.returncode, 0, resultado.stderr)
+        lineas = resultado.stdout.splitlines()
+        self.assertEqual(len(lineas), 2)
+        self.assertEqual(json.loads(lineas[1])["hechos"], {"tipo_datos": "audio"})
+        self.assertIn("Base de conocimiento cargada", resultado.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
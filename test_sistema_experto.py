@@ -2,7 +2,83 @@ import unittest
 import json
 import os
 import tempfile
+import random
+import io
+import contextlib
+import gc
+import time
+import tracemalloc
+from unittest import mock
 from sistema_experto import SistemaExpertoDL
+from motores_inferencia import MOTORES, EmparejadorIncremental, PredicadosReglas, cumple_condiciones
+import tabla_respuestas
+from tabla_respuestas import TablaRespuestas, enumerar_hechos
+from busqueda_reglas import IndiceBusqueda
+from catalogo_preguntas import CATALOGO_BASE, crear_catalogo
+from representacion_reglas import CompiladorReglas, Regla, ReglaDiferida, regla_a_json
+from almacenamiento import AlmacenTextos, escribir_atomicamente, leer_reglas_json
+
+ATRIBUTOS_PRUEBA = {
+    "tipo_datos": ["imagenes", "texto", "series_temporales", "tabular", "audio"],
+    "tamano_dataset": ["muy_pequeno", "pequeno", "medio", "grande", "muy_grande"],
+    "recursos_computacionales": ["muy_bajo", "bajo", "medio", "alto", "muy_alto"],
+    "tarea": ["clasificacion", "regresion", "generacion"],
+    "requiere_interpretabilidad": [True, False],
+}
+
+def generar_reglas_aleatorias(cantidad, semilla=0):
+    """Genera reglas con condiciones aleatorias sobre ATRIBUTOS_PRUEBA"""
+    azar = random.Random(semilla)
+    reglas = []
+    for i in range(cantidad):
+        atributos = azar.sample(sorted(ATRIBUTOS_PRUEBA), azar.randint(0, 3))
+        reglas.append({
+            "id": i + 1,
+            "condiciones": {clave: azar.choice(ATRIBUTOS_PRUEBA[clave]) for clave in atributos},
+            "recomendacion": f"Tecnica {i}",
+            "justificacion": f"Justificacion {i}",
+            "confianza": azar.choice([0.5, 0.7, 0.8, 0.9])
+        })
+    return reglas
+
+def generar_hechos_aleatorios(semilla=0):
+    """Genera un diccionario de hechos con un subconjunto de ATRIBUTOS_PRUEBA"""
+    azar = random.Random(semilla)
+    atributos = azar.sample(sorted(ATRIBUTOS_PRUEBA), azar.randint(0, len(ATRIBUTOS_PRUEBA)))
+    return {clave: azar.choice(ATRIBUTOS_PRUEBA[clave]) for clave in atributos}
+
+def inferir_lineal(reglas, hechos):
+    """Implementacion de referencia: recorre todas las reglas en orden"""
+    recomendaciones = []
+    for regla in reglas:
+        if all(clave in hechos and hechos[clave] == valor
+               for clave, valor in regla["condiciones"].items()):
+            recomendaciones.append({
+                "tecnica": regla["recomendacion"],
+                "justificacion": regla["justificacion"],
+                "confianza": regla["confianza"],
+                "regla_id": regla["id"]
+            })
+    recomendaciones.sort(key=lambda x: x["confianza"], reverse=True)
+    return recomendaciones
+
+def crear_base_temporal(reglas):
+    """Escribe las reglas en un archivo JSON temporal y devuelve su ruta"""
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+        json.dump({"reglas": reglas}, f)
+        return f.name
+
+class HechosRegistrados(dict):
+    """Diccionario de hechos que registra los atributos consultados por los predicados"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.consultados = []
+    
+    def get(self, clave, *args):
+        self.consultados.append(clave)
+        return super().get(clave, *args)
+
 
 class TestSistemaExpertoDL(unittest.TestCase):
     
@@ -303,6 +379,1593 @@ class TestRendimientoSistema(unittest.TestCase):
         self.assertEqual(len(recomendaciones), 0)
 
 
+class TestIndiceReglas(unittest.TestCase):
+    """Pruebas del indice (atributo, valor) usado por inferir"""
+    
+    def setUp(self):
+        self.reglas = generar_reglas_aleatorias(300)
+        self.archivo = crear_base_temporal(self.reglas)
+        
+    def tearDown(self):
+        if os.path.exists(self.archivo):
+            os.unlink(self.archivo)
+    
+    def test_mismo_resultado_que_recorrido_lineal(self):
+        """El indice debe devolver exactamente las mismas recomendaciones y en el mismo orden"""
+        sistema = SistemaExpertoDL(self.archivo)
+        for semilla in range(200):
+            hechos = generar_hechos_aleatorios(semilla)
+            self.assertEqual(sistema.inferir(hechos), inferir_lineal(self.reglas, hechos))
+    
+    def test_reglas_sin_condiciones_siempre_aplican(self):
+        """Una regla sin condiciones se cumple con cualquier conjunto de hechos"""
+        sistema = SistemaExpertoDL(self.archivo)
+        ids = [rec["regla_id"] for rec in sistema.inferir({})]
+        esperados = [regla["id"] for regla in self.reglas if not regla["condiciones"]]
+        self.assertTrue(esperados)
+        self.assertEqual(sorted(ids), sorted(esperados))
+    
+    def test_indice_actualizado_al_agregar_regla(self):
+        """Las reglas agregadas deben quedar indexadas inmediatamente"""
+        sistema = SistemaExpertoDL(self.archivo)
+        hechos = {"tipo_datos": "audio", "tarea": "regresion"}
+        sistema.agregar_regla(hechos, "Nueva tecnica", "Justificacion nueva", 0.99)
+        
+        recomendaciones = sistema.inferir(hechos)
+        self.assertEqual(recomendaciones[0]["tecnica"], "Nueva tecnica")
+        self.assertEqual(recomendaciones, inferir_lineal(sistema.reglas, hechos))
+
+
+
+class TestMotoresInferencia(unittest.TestCase):
+    """Pruebas de los motores de emparejamiento seleccionables"""
+    
+    def setUp(self):
+        self.reglas = generar_reglas_aleatorias(500, semilla=1)
+        self.archivo = crear_base_temporal(self.reglas)
+        self.archivo_tabla = os.path.splitext(self.archivo)[0] + ".tabla.json"
+        
+    def tearDown(self):
+        for ruta in (self.archivo, self.archivo_tabla):
+            if os.path.exists(ruta):
+                os.unlink(ruta)
+    
+    def test_motores_equivalentes(self):
+        """Todos los motores deben entregar las mismas recomendaciones"""
+        for nombre in MOTORES:
+            with self.subTest(motor=nombre):
+                sistema = SistemaExpertoDL(self.archivo, motor=nombre)
+                for semilla in range(100):
+                    hechos = generar_hechos_aleatorios(semilla)
+                    self.assertEqual(sistema.inferir(hechos), inferir_lineal(self.reglas, hechos))
+    
+    def test_motores_actualizados_al_agregar_regla(self):
+        """Cada motor debe reflejar las reglas agregadas"""
+        for nombre in MOTORES:
+            with self.subTest(motor=nombre):
+                # agregar_regla persiste en disco: cada motor parte de la base original
+                with open(self.archivo, 'w') as f:
+                    json.dump({"reglas": self.reglas}, f)
+                sistema = SistemaExpertoDL(self.archivo, motor=nombre)
+                hechos = {"tipo_datos": "texto", "tarea": "generacion"}
+                sistema.agregar_regla(hechos, f"Tecnica {nombre}", "Justificacion", 1.0)
+                recomendaciones = sistema.inferir(hechos)
+                self.assertEqual(recomendaciones[0]["tecnica"], f"Tecnica {nombre}")
+                self.assertEqual(recomendaciones, inferir_lineal(sistema.reglas, hechos))
+    
+    def test_hechos_no_hashables(self):
+        """Un hecho con una lista o un diccionario como valor no cumple condiciones, pero no falla"""
+        perfiles = [{"tipo_datos": ["imagenes"]},
+                    {"tipo_datos": "texto", "tarea": {"nombre": "generacion"}},
+                    {"atributo_nuevo": ["x"]}]
+        for nombre in MOTORES:
+            with self.subTest(motor=nombre):
+                sistema = SistemaExpertoDL(self.archivo, motor=nombre)
+                for hechos in perfiles:
+                    self.assertEqual(sistema.inferir(hechos), inferir_lineal(self.reglas, hechos))
+                    self.assertEqual(sistema.inferir(hechos, top_k=3), inferir_lineal(self.reglas, hechos)[:3])
+                self.assertEqual(sistema.inferir_lote(perfiles),
+                                 [inferir_lineal(self.reglas, hechos) for hechos in perfiles])
+        for modo in ("completa", "perezosa"):
+            with self.subTest(tabla_respuestas=modo):
+                sistema = SistemaExpertoDL(self.archivo, tabla_respuestas=modo)
+                for hechos in perfiles:
+                    self.assertEqual(sistema.inferir(hechos), inferir_lineal(self.reglas, hechos))
+    
+    def test_motor_desconocido(self):
+        """Un nombre de motor invalido debe rechazarse"""
+        with self.assertRaises(ValueError):
+            SistemaExpertoDL(self.archivo, motor="inexistente")
+
+
+
+class TestInferenciaLote(unittest.TestCase):
+    """Pruebas de inferir_lote"""
+    
+    def setUp(self):
+        self.reglas = generar_reglas_aleatorias(400, semilla=2)
+        self.archivo = crear_base_temporal(self.reglas)
+        self.sistema = SistemaExpertoDL(self.archivo)
+        
+    def tearDown(self):
+        if os.path.exists(self.archivo):
+            os.unlink(self.archivo)
+    
+    def test_lote_igual_a_inferir(self):
+        """Cada resultado del lote debe coincidir con inferir sobre el mismo perfil"""
+        perfiles = [generar_hechos_aleatorios(semilla % 60) for semilla in range(300)]
+        perfiles.append({"tipo_datos": "valor_desconocido", "atributo_nuevo": "x"})
+        resultados = self.sistema.inferir_lote(perfiles)
+        
+        self.assertEqual(len(resultados), len(perfiles))
+        for hechos, recomendaciones in zip(perfiles, resultados):
+            self.assertEqual(recomendaciones, inferir_lineal(self.reglas, hechos))
+    
+    def test_lote_top_k(self):
+        """Con top_k el lote solo construye las k primeras recomendaciones de cada perfil"""
+        perfiles = [generar_hechos_aleatorios(semilla) for semilla in range(30)]
+        with mock.patch.object(SistemaExpertoDL, "_crear_recomendacion",
+                               autospec=True, side_effect=SistemaExpertoDL._crear_recomendacion) as crear:
+            resultados = self.sistema.inferir_lote(perfiles, top_k=2)
+        for hechos, recomendaciones in zip(perfiles, resultados):
+            self.assertEqual(recomendaciones, inferir_lineal(self.reglas, hechos)[:2])
+        self.assertEqual(crear.call_count, sum(len(recomendaciones) for recomendaciones in resultados))
+    
+    def test_lote_sin_mensajes(self):
+        """La inferencia por lotes no debe escribir en la consola"""
+        salida = io.StringIO()
+        with contextlib.redirect_stdout(salida):
+            self.sistema.inferir_lote([generar_hechos_aleatorios(i) for i in range(20)])
+        self.assertEqual(salida.getvalue(), "")
+    
+    def test_lote_refleja_reglas_agregadas(self):
+        """El lote debe considerar las reglas agregadas despues de la primera llamada"""
+        hechos = {"tipo_datos": "audio", "tarea": "clasificacion"}
+        self.sistema.inferir_lote([hechos])
+        self.sistema.agregar_regla(hechos, "Tecnica lote", "Justificacion", 1.0)
+        
+        resultado = self.sistema.inferir_lote([hechos, {}])
+        self.assertEqual(resultado[0][0]["tecnica"], "Tecnica lote")
+        self.assertEqual(resultado[0], inferir_lineal(self.sistema.reglas, hechos))
+        self.assertEqual(resultado[1], inferir_lineal(self.sistema.reglas, {}))
+
+
+
+class TestCacheResultados(unittest.TestCase):
+    """Pruebas de la cache LRU de inferir"""
+    
+    def setUp(self):
+        self.reglas = generar_reglas_aleatorias(200, semilla=3)
+        self.archivo = crear_base_temporal(self.reglas)
+        
+    def tearDown(self):
+        if os.path.exists(self.archivo):
+            os.unlink(self.archivo)
+    
+    def test_cache_desactivada_por_defecto(self):
+        """Sin tamano_cache no hay estadisticas de cache"""
+        sistema = SistemaExpertoDL(self.archivo)
+        self.assertIsNone(sistema.estadisticas_cache())
+    
+    def test_aciertos_fallos_y_desalojos(self):
+        """Los contadores deben reflejar el uso de la cache"""
+        sistema = SistemaExpertoDL(self.archivo, tamano_cache=2)
+        a = {"tipo_datos": "imagenes", "tamano_dataset": "grande"}
+        b = {"tipo_datos": "texto"}
+        c = {"tipo_datos": "audio"}
+        
+        primera = sistema.inferir(a)
+        # El orden de las claves no debe afectar a la clave de cache
+        self.assertEqual(sistema.inferir({"tamano_dataset": "grande", "tipo_datos": "imagenes"}), primera)
+        sistema.inferir(b)
+        sistema.inferir(c)  # desaloja a
+        sistema.inferir(a)
+        
+        estadisticas = sistema.estadisticas_cache()
+        self.assertEqual(estadisticas["aciertos"], 1)
+        self.assertEqual(estadisticas["fallos"], 4)
+        self.assertEqual(estadisticas["desalojos"], 2)
+        self.assertEqual(estadisticas["entradas"], 2)
+    
+    def test_resultados_cacheados_correctos(self):
+        """Los resultados servidos desde cache deben coincidir con la referencia"""
+        sistema = SistemaExpertoDL(self.archivo, tamano_cache=64)
+        for semilla in list(range(30)) * 2:
+            hechos = generar_hechos_aleatorios(semilla)
+            self.assertEqual(sistema.inferir(hechos), inferir_lineal(self.reglas, hechos))
+        self.assertGreaterEqual(sistema.estadisticas_cache()["aciertos"], 30)
+    
+    def test_invalidacion_al_agregar_regla(self):
+        """agregar_regla debe invalidar los resultados cacheados"""
+        sistema = SistemaExpertoDL(self.archivo, tamano_cache=8)
+        hechos = {"tipo_datos": "tabular", "tarea": "regresion"}
+        sistema.inferir(hechos)
+        sistema.agregar_regla(hechos, "Tecnica cacheada", "Justificacion", 1.0)
+        self.assertEqual(sistema.inferir(hechos)[0]["tecnica"], "Tecnica cacheada")
+    
+    def test_invalidacion_al_recargar(self):
+        """recargar_reglas debe leer el archivo de nuevo e invalidar la cache"""
+        sistema = SistemaExpertoDL(self.archivo, tamano_cache=8)
+        hechos = {"tipo_datos": "tabular"}
+        sistema.inferir(hechos)
+        
+        nuevas = [{"id": 1, "condiciones": {"tipo_datos": "tabular"}, "recomendacion": "Recargada",
+                   "justificacion": "Test", "confianza": 0.6}]
+        with open(self.archivo, 'w') as f:
+            json.dump({"reglas": nuevas}, f)
+        sistema.recargar_reglas()
+        
+        self.assertEqual([rec["tecnica"] for rec in sistema.inferir(hechos)], ["Recargada"])
+
+
+
+class TestTablaRespuestas(unittest.TestCase):
+    """Pruebas de la tabla precalculada sobre el dominio de hechos"""
+    
+    def setUp(self):
+        self.reglas = generar_reglas_aleatorias(150, semilla=4)
+        self.archivo = crear_base_temporal(self.reglas)
+        self.archivo_tabla = os.path.splitext(self.archivo)[0] + ".tabla.json"
+        
+    def tearDown(self):
+        for ruta in (self.archivo, self.archivo_tabla):
+            if os.path.exists(ruta):
+                os.unlink(ruta)
+    
+    def test_tabla_igual_a_referencia(self):
+        """La tabla debe responder lo mismo que la inferencia completa"""
+        for modo in ("completa", "perezosa"):
+            with self.subTest(modo=modo):
+                sistema = SistemaExpertoDL(self.archivo, tabla_respuestas=modo)
+                for hechos in list(enumerar_hechos("texto"))[::7] + list(enumerar_hechos("tabular"))[::5]:
+                    self.assertEqual(sistema.inferir(hechos), inferir_lineal(self.reglas, hechos))
+    
+    def test_hechos_fuera_del_dominio(self):
+        """Con hechos fuera del dominio se recurre al motor de inferencia"""
+        sistema = SistemaExpertoDL(self.archivo, tabla_respuestas="perezosa")
+        for hechos in ({"tipo_datos": "video"}, {"tipo_datos": "texto", "relaciones_no_lineales": True}, {}):
+            self.assertEqual(sistema.inferir(hechos), inferir_lineal(self.reglas, hechos))
+    
+    def test_tabla_actualizada_al_agregar_regla(self):
+        """agregar_regla debe insertar la regla en las combinaciones que la cumplen"""
+        sistema = SistemaExpertoDL(self.archivo, tabla_respuestas="completa")
+        sistema.agregar_regla({"tarea": "deteccion"}, "Tecnica tabla", "Justificacion", 0.8)
+        for hechos in list(enumerar_hechos("imagenes"))[::3]:
+            self.assertEqual(sistema.inferir(hechos), inferir_lineal(sistema.reglas, hechos))
+    
+    def test_tabla_persistida(self):
+        """Un segundo arranque debe leer la tabla guardada en lugar de construirla"""
+        SistemaExpertoDL(self.archivo, tabla_respuestas="completa")
+        self.assertTrue(os.path.exists(self.archivo_tabla))
+        
+        with mock.patch.object(TablaRespuestas, "_construir_particion") as construir:
+            sistema = SistemaExpertoDL(self.archivo, tabla_respuestas="completa")
+            hechos = {"tipo_datos": "audio", "tamano_dataset": "medio", "recursos_computacionales": "bajo"}
+            self.assertEqual(sistema.inferir(hechos), inferir_lineal(self.reglas, hechos))
+        construir.assert_not_called()
+    
+    def test_tabla_persistida_obsoleta(self):
+        """Si la base cambia, la tabla guardada se descarta"""
+        SistemaExpertoDL(self.archivo, tabla_respuestas="completa")
+        nuevas = generar_reglas_aleatorias(40, semilla=5)
+        with open(self.archivo, 'w') as f:
+            json.dump({"reglas": nuevas}, f)
+        
+        sistema = SistemaExpertoDL(self.archivo, tabla_respuestas="completa")
+        hechos = {"tipo_datos": "imagenes", "tamano_dataset": "grande", "recursos_computacionales": "alto"}
+        self.assertEqual(sistema.inferir(hechos), inferir_lineal(nuevas, hechos))
+
+
+
+class TestEmparejadorIncremental(unittest.TestCase):
+    """Pruebas del emparejamiento incremental por respuesta"""
+    
+    def test_estado_tras_cada_respuesta(self):
+        """Tras cada cambio, las reglas cumplidas y posibles deben coincidir con un recalculo completo"""
+        reglas = generar_reglas_aleatorias(300, semilla=6)
+        emparejador = EmparejadorIncremental(reglas)
+        azar = random.Random(6)
+        atributos = sorted(ATRIBUTOS_PRUEBA)
+        
+        for _ in range(300):
+            atributo = azar.choice(atributos)
+            if azar.random() < 0.2:
+                emparejador.retirar(atributo)
+            else:
+                emparejador.asignar(atributo, azar.choice(ATRIBUTOS_PRUEBA[atributo]))
+            hechos = emparejador.hechos
+            
+            cumplidas = [p for p, regla in enumerate(reglas)
+                         if all(hechos.get(k, object()) == v for k, v in regla["condiciones"].items())]
+            posibles = [p for p, regla in enumerate(reglas)
+                        if all(k not in hechos or hechos[k] == v for k, v in regla["condiciones"].items())]
+            self.assertEqual(emparejador.coincidencias(), cumplidas)
+            self.assertEqual(emparejador.posibles(), posibles)
+            self.assertEqual(emparejador.cantidad_posibles(), len(posibles))
+    
+    def test_recoleccion_interactiva_actualiza_emparejador(self):
+        """La recoleccion por consola debe alimentar el emparejador respuesta a respuesta"""
+        sistema = SistemaExpertoDL("base_conocimiento.json")
+        # imagenes, grande, alto, sin tarea, interpretabilidad: no
+        respuestas = iter(["1", "4", "4", "", "2"])
+        with mock.patch("builtins.input", lambda _: next(respuestas)), \
+                contextlib.redirect_stdout(io.StringIO()):
+            hechos = sistema.recolectar_hechos_interactivo()
+            recomendaciones = sistema.inferir(hechos)
+        
+        self.assertEqual(sistema.emparejador.hechos, hechos)
+        ids = [sistema.reglas[p]["id"] for p in sistema.emparejador.coincidencias()]
+        self.assertEqual(sorted(ids), sorted(rec["regla_id"] for rec in recomendaciones))
+
+
+
+class TestInferenciaTopK(unittest.TestCase):
+    """Pruebas de top_k y de la paginacion por cursor"""
+    
+    def setUp(self):
+        self.reglas = generar_reglas_aleatorias(300, semilla=7)
+        self.archivo = crear_base_temporal(self.reglas)
+        self.sistema = SistemaExpertoDL(self.archivo)
+        
+    def tearDown(self):
+        if os.path.exists(self.archivo):
+            os.unlink(self.archivo)
+    
+    def test_top_k_igual_a_prefijo(self):
+        """top_k debe devolver el prefijo de la lista completa"""
+        for semilla in range(50):
+            hechos = generar_hechos_aleatorios(semilla)
+            completas = inferir_lineal(self.reglas, hechos)
+            for k in (1, 3, 10):
+                self.assertEqual(self.sistema.inferir(hechos, top_k=k), completas[:k])
+    
+    def test_paginas_concatenadas(self):
+        """Recorrer todas las paginas debe reconstruir la lista completa"""
+        for semilla in range(30):
+            hechos = generar_hechos_aleatorios(semilla)
+            obtenidas, cursor = [], 0
+            while cursor is not None:
+                pagina, cursor = self.sistema.inferir_pagina(hechos, 4, cursor)
+                self.assertLessEqual(len(pagina), 4)
+                obtenidas.extend(pagina)
+            self.assertEqual(obtenidas, inferir_lineal(self.reglas, hechos))
+    
+    def test_pagina_usa_indice_y_cache(self):
+        """Las paginas solo evaluan las candidatas del motor y reutilizan la cache"""
+        sistema = SistemaExpertoDL(self.archivo, tamano_cache=8)
+        hechos = {"tipo_datos": "imagenes", "tarea": "clasificacion"}
+        with mock.patch.object(sistema._motor, "coincidencias", wraps=sistema._motor.coincidencias) as coincidencias:
+            pagina, cursor = sistema.inferir_pagina(hechos, 1)
+            self.assertEqual(len(pagina), 1)
+            self.assertEqual(cursor, 1)
+            sistema.inferir_pagina(hechos, 1, cursor)
+        coincidencias.assert_called_once()
+        self.assertEqual(sistema._cache.estadisticas()["aciertos"], 1)
+    
+    def test_pagina_cancelada(self):
+        """Una consulta cancelada se abandona sin terminar la pagina y devuelve None"""
+        self.assertIsNone(self.sistema.inferir_pagina({}, 10, cancelado=lambda: True))
+        consultas = []
+        cancelar_en_la_cuarta = lambda: consultas.append(1) or len(consultas) >= 4
+        with mock.patch.object(self.sistema, "_crear_recomendacion", wraps=self.sistema._crear_recomendacion) as crear:
+            self.assertIsNone(self.sistema.inferir_pagina({}, 10, cancelado=cancelar_en_la_cuarta))
+        self.assertEqual(crear.call_count, 1)
+        self.assertEqual(self.sistema.inferir_pagina({}, 10, cancelado=lambda: False), self.sistema.inferir_pagina({}, 10))
+    
+    def test_top_k_tras_agregar_regla(self):
+        """El orden por confianza debe incluir las reglas agregadas"""
+        hechos = {"tipo_datos": "imagenes"}
+        self.sistema.inferir(hechos, top_k=2)
+        self.sistema.agregar_regla(hechos, "Tecnica top", "Justificacion", 0.9)
+        self.assertEqual(self.sistema.inferir(hechos, top_k=50), inferir_lineal(self.sistema.reglas, hechos)[:50])
+
+
+
+class TestReglasCompactas(unittest.TestCase):
+    """Pruebas de la representacion compacta de reglas"""
+    
+    def setUp(self):
+        self.reglas = generar_reglas_aleatorias(300, semilla=8)
+        self.reglas[0]["autor"] = "equipo de pruebas"
+        self.archivo = crear_base_temporal(self.reglas)
+        
+    def tearDown(self):
+        if os.path.exists(self.archivo):
+            os.unlink(self.archivo)
+    
+    def test_accesos_compatibles(self):
+        """Las reglas compactas deben leerse igual que los diccionarios originales"""
+        sistema = SistemaExpertoDL(self.archivo, reglas_compactas=True)
+        self.assertIsInstance(sistema.reglas[0], Regla)
+        for regla, original in zip(sistema.reglas, self.reglas):
+            self.assertEqual(regla, original)
+            self.assertEqual(regla["id"], original["id"])
+            self.assertIsInstance(regla["condiciones"], dict)
+            self.assertIn("confianza", regla)
+        self.assertEqual(sistema.reglas[0]["autor"], "equipo de pruebas")
+        with self.assertRaises(KeyError):
+            sistema.reglas[1]["autor"]
+    
+    def test_textos_y_condiciones_compartidos(self):
+        """Los valores repetidos deben compartir una unica instancia"""
+        sistema = SistemaExpertoDL(self.archivo, reglas_compactas=True)
+        por_tipo = {}
+        for regla in sistema.reglas:
+            for valor in regla["condiciones"].values():
+                self.assertIs(por_tipo.setdefault(valor, valor), valor)
+    
+    def test_inferencia_igual(self):
+        """Los resultados no deben depender de la representacion"""
+        for nombre in MOTORES:
+            with self.subTest(motor=nombre):
+                sistema = SistemaExpertoDL(self.archivo, motor=nombre, reglas_compactas=True)
+                for semilla in range(40):
+                    hechos = generar_hechos_aleatorios(semilla)
+                    self.assertEqual(sistema.inferir(hechos), inferir_lineal(self.reglas, hechos))
+                self.assertEqual(sistema.inferir_lote([{}])[0], inferir_lineal(self.reglas, {}))
+    
+    def test_guardar_y_agregar(self):
+        """Guardar reglas compactas debe producir el mismo JSON, incluidos campos adicionales"""
+        sistema = SistemaExpertoDL(self.archivo, reglas_compactas=True)
+        self.assertTrue(sistema.agregar_regla({"tipo_datos": "audio"}, "Nueva", "Justificacion", 0.6))
+        self.assertIsInstance(sistema.reglas[-1], Regla)
+        
+        with open(self.archivo, 'r', encoding='utf-8') as f:
+            guardadas = json.load(f)["reglas"]
+        self.assertEqual(guardadas[:-1], self.reglas)
+        self.assertEqual(guardadas[-1]["recomendacion"], "Nueva")
+    
+    def test_memoria_con_tracemalloc(self):
+        """La representacion compacta debe ocupar menos memoria que los diccionarios de json.load"""
+        reglas = generar_reglas_aleatorias(5000, semilla=9)
+        for regla in reglas:
+            regla["recomendacion"] = f"Tecnica {regla['id'] % 20}"
+            regla["justificacion"] = f"Justificacion de la tecnica {regla['id'] % 20}. " * 3
+        archivo = crear_base_temporal(reglas)
+        del reglas
+        
+        def memoria_retenida(compactas):
+            gc.collect()
+            tracemalloc.start()
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    sistema = SistemaExpertoDL(archivo, motor="lineal", reglas_compactas=compactas)
+                return tracemalloc.get_traced_memory()[0]
+            finally:
+                tracemalloc.stop()
+        
+        try:
+            con_diccionarios = memoria_retenida(False)
+            compacta = memoria_retenida(True)
+        finally:
+            os.unlink(archivo)
+        print(f"\nMemoria retenida: diccionarios={con_diccionarios} B, compacta={compacta} B")
+        self.assertLess(compacta, con_diccionarios * 0.6)
+
+
+
+class TestPredicadosCompilados(unittest.TestCase):
+    """Pruebas de la compilacion de reglas a predicados"""
+    
+    def test_predicados_equivalentes(self):
+        """Cada predicado debe evaluar igual que la comparacion generica"""
+        reglas = generar_reglas_aleatorias(400, semilla=10)
+        reglas.append({"id": 999, "condiciones": {"requiere_interpretabilidad": 1},
+                       "recomendacion": "Entero", "justificacion": "", "confianza": 0.1})
+        predicados = PredicadosReglas(reglas)
+        for semilla in range(60):
+            hechos = generar_hechos_aleatorios(semilla)
+            for posicion, regla in enumerate(reglas):
+                self.assertEqual(predicados[posicion](hechos), cumple_condiciones(regla["condiciones"], hechos))
+    
+    def test_codigo_compartido_por_forma(self):
+        """Las reglas con los mismos atributos comparten el codigo generado"""
+        reglas = generar_reglas_aleatorias(400, semilla=11)
+        predicados = PredicadosReglas(reglas)
+        formas = {frozenset(regla["condiciones"]) for regla in reglas}
+        self.assertLessEqual(len(predicados._fabricas), len(formas))
+    
+    def test_atributo_mas_selectivo_primero(self):
+        """Las condiciones sobre atributos con mas valores distintos se comprueban antes"""
+        sistema = SistemaExpertoDL("base_conocimiento.json")
+        predicados = sistema._motor.predicados
+        regla_7 = next(p for p, regla in enumerate(sistema.reglas) if regla["id"] == 7)
+        hechos = HechosRegistrados(tipo_datos="texto")
+        predicados[regla_7](hechos)
+        self.assertEqual(hechos.consultados, ["tipo_datos"])
+    
+    def test_solo_se_recompila_la_regla_agregada(self):
+        """agregar_regla debe compilar unicamente el predicado nuevo"""
+        archivo = crear_base_temporal(generar_reglas_aleatorias(50, semilla=12))
+        try:
+            sistema = SistemaExpertoDL(archivo, motor="lineal")
+            with mock.patch.object(PredicadosReglas, "_compilar", wraps=sistema._motor.predicados._compilar) as compilar:
+                sistema.agregar_regla({"tipo_datos": "audio"}, "Nueva", "Justificacion", 0.5)
+            self.assertEqual(compilar.call_count, 1)
+            self.assertEqual(sistema.inferir({"tipo_datos": "audio"}), inferir_lineal(sistema.reglas, {"tipo_datos": "audio"}))
+        finally:
+            os.unlink(archivo)
+
+
+
+class TestSelectividadAprendida(unittest.TestCase):
+    """Pruebas del reordenamiento de condiciones segun el trafico observado"""
+    
+    def setUp(self):
+        with open("base_conocimiento.json", 'r', encoding='utf-8') as f:
+            self.archivo = crear_base_temporal(json.load(f)["reglas"])
+        self.archivo_selectividad = os.path.splitext(self.archivo)[0] + ".selectividad.json"
+        # Trafico en el que el tipo de datos casi siempre es tabular y las relaciones casi nunca se informan
+        self.trafico = [{"tipo_datos": "tabular", "tamano_dataset": "grande"}] * 2000
+        
+    def tearDown(self):
+        for ruta in (self.archivo, self.archivo_selectividad):
+            if os.path.exists(ruta):
+                os.unlink(ruta)
+    
+    def _orden_regla_7(self, sistema):
+        posicion = next(p for p, regla in enumerate(sistema.reglas) if regla["id"] == 7)
+        hechos = HechosRegistrados(tipo_datos="tabular", relaciones_no_lineales=True, tamano_dataset="grande")
+        sistema._motor.predicados[posicion](hechos)
+        return hechos.consultados
+    
+    def _consultar(self, sistema, consultas):
+        with contextlib.redirect_stdout(io.StringIO()):
+            for hechos in consultas:
+                self.assertEqual(sistema.inferir(hechos), inferir_lineal(sistema.reglas, hechos))
+    
+    def test_reordena_segun_rechazos(self):
+        """La condicion que mas rechaza en el trafico real debe pasar a comprobarse primero"""
+        sistema = SistemaExpertoDL(self.archivo, aprender_selectividad=True)
+        self.assertEqual(self._orden_regla_7(sistema)[0], "tipo_datos")
+        self._consultar(sistema, self.trafico)
+        self.assertEqual(self._orden_regla_7(sistema)[0], "relaciones_no_lineales")
+    
+    def test_anclas_segun_frecuencia(self):
+        """Los pares presentes en casi todas las consultas dejan de usarse como ancla"""
+        sistema = SistemaExpertoDL(self.archivo, aprender_selectividad=True)
+        hechos = {"tipo_datos": "tabular", "tamano_dataset": "pequeno"}
+        antes = len(sistema._motor.candidatas(hechos))
+        self._consultar(sistema, self.trafico)
+        self.assertLess(len(sistema._motor.candidatas(hechos)), antes)
+    
+    def test_congelar_y_persistir(self):
+        """El orden congelado debe guardarse y aplicarse al volver a cargar la base"""
+        sistema = SistemaExpertoDL(self.archivo, aprender_selectividad=True)
+        self._consultar(sistema, self.trafico[:500])
+        sistema.congelar_selectividad()
+        consultas = sistema._selectividad.consultas
+        self._consultar(sistema, self.trafico[:500])
+        self.assertEqual(sistema._selectividad.consultas, consultas)
+        self.assertTrue(sistema.guardar_selectividad())
+        
+        recargado = SistemaExpertoDL(self.archivo)
+        self.assertFalse(recargado.aprender_selectividad)
+        self.assertEqual(self._orden_regla_7(recargado)[0], "relaciones_no_lineales")
+        self._consultar(recargado, [generar_hechos_aleatorios(i) for i in range(50)])
+
+
+class TestCacheBinaria(unittest.TestCase):
+    """Pruebas de la cache binaria precompilada de la base de conocimiento"""
+    
+    def setUp(self):
+        self.reglas = generar_reglas_aleatorias(300, semilla=13)
+        self.archivo = crear_base_temporal(self.reglas)
+        self.archivo_cache = os.path.splitext(self.archivo)[0] + ".cache.pkl"
+        self.consultas = [generar_hechos_aleatorios(i) for i in range(40)]
+    
+    def tearDown(self):
+        for ruta in (self.archivo, self.archivo_cache):
+            if os.path.exists(ruta):
+                os.unlink(ruta)
+    
+    def _crear(self, **opciones):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return SistemaExpertoDL(self.archivo, cache_binaria=True, **opciones)
+    
+    def _comprobar_resultados(self, sistema):
+        with contextlib.redirect_stdout(io.StringIO()):
+            for hechos in self.consultas:
+                self.assertEqual(sistema.inferir(hechos), inferir_lineal(self.reglas, hechos))
+    
+    def test_segunda_carga_omite_json(self):
+        """Con la cache vigente no se vuelve a leer ni indexar el JSON"""
+        for motor in ("indice", "bitset", "lineal"):
+            for compactas in (False, True):
+                with self.subTest(motor=motor, compactas=compactas):
+                    if os.path.exists(self.archivo_cache):
+                        os.unlink(self.archivo_cache)
+                    self._crear(motor=motor, reglas_compactas=compactas)
+                    self.assertTrue(os.path.exists(self.archivo_cache))
+                    with mock.patch.object(SistemaExpertoDL, "_cargar_reglas_desde_json") as cargar:
+                        sistema = self._crear(motor=motor, reglas_compactas=compactas)
+                    cargar.assert_not_called()
+                    self._comprobar_resultados(sistema)
+    
+    def test_configuracion_distinta_reconstruye(self):
+        """Una cache escrita con otro motor no se reutiliza"""
+        self._crear(motor="bitset")
+        with mock.patch.object(SistemaExpertoDL, "_cargar_reglas_desde_json",
+                               return_value=self.reglas) as cargar:
+            self._crear(motor="indice")
+        cargar.assert_called_once()
+    
+    def test_solo_cambia_fecha(self):
+        """Si solo cambia la fecha de modificacion, el hash del contenido valida la cache"""
+        self._crear()
+        estado = os.stat(self.archivo)
+        os.utime(self.archivo, ns=(estado.st_atime_ns, estado.st_mtime_ns + 10**9))
+        with mock.patch.object(SistemaExpertoDL, "_cargar_reglas_desde_json") as cargar:
+            sistema = self._crear()
+        cargar.assert_not_called()
+        self._comprobar_resultados(sistema)
+    
+    def test_cambio_de_contenido_reconstruye(self):
+        """Un archivo con otras reglas del mismo tamano invalida la cache al comparar el hash"""
+        self._crear()
+        estado = os.stat(self.archivo)
+        with open(self.archivo, 'r+', encoding='utf-8') as f:
+            contenido = f.read()
+            f.seek(0)
+            f.write(contenido.replace('"confianza": 0.', '"confianza": 1.', 1))
+        os.utime(self.archivo, ns=(estado.st_atime_ns, estado.st_mtime_ns + 10**9))
+        self.reglas[0]["confianza"] += 1
+    
+        sistema = self._crear()
+        self.assertEqual(sistema.reglas[0]["confianza"], self.reglas[0]["confianza"])
+        self._comprobar_resultados(sistema)
+    
+    def test_cache_corrupta(self):
+        """Una cache ilegible se ignora y se reescribe a partir del JSON"""
+        with open(self.archivo_cache, 'wb') as f:
+            f.write(b"no es un pickle")
+        sistema = self._crear()
+        self._comprobar_resultados(sistema)
+        with mock.patch.object(SistemaExpertoDL, "_cargar_reglas_desde_json") as cargar:
+            self._crear()
+        cargar.assert_not_called()
+    
+    def test_agregar_regla_actualiza_cache(self):
+        """Las reglas agregadas despues de cargar desde cache quedan indexadas y en la nueva cache"""
+        self._crear(reglas_compactas=True)
+        sistema = self._crear(reglas_compactas=True)
+        condiciones = {"tipo_datos": "audio", "tarea": "generacion"}
+        with contextlib.redirect_stdout(io.StringIO()):
+            sistema.agregar_regla(condiciones, "Nueva", "Prueba", 0.99)
+        self.reglas.append({"id": sistema.reglas[-1]["id"], "condiciones": condiciones,
+                            "recomendacion": "Nueva", "justificacion": "Prueba", "confianza": 0.99})
+        self.consultas.append(condiciones)
+        self._comprobar_resultados(sistema)
+    
+        with mock.patch.object(SistemaExpertoDL, "_cargar_reglas_desde_json") as cargar:
+            recargado = self._crear(reglas_compactas=True)
+        cargar.assert_not_called()
+        self._comprobar_resultados(recargado)
+
+
+class TestTextosMapeados(unittest.TestCase):
+    """Pruebas del almacenamiento de textos en un archivo mapeado en memoria"""
+    
+    def setUp(self):
+        self.reglas = generar_reglas_aleatorias(300, semilla=21)
+        self.reglas[0]["autor"] = "equipo de pruebas"
+        self.reglas[1]["justificacion"] = "Texto con acentos: señal, visión y «comillas»"
+        self.archivo = crear_base_temporal(self.reglas)
+        base = os.path.splitext(self.archivo)[0]
+        self.auxiliares = [base + ".textos.bin", base + ".cache.pkl"]
+    
+    def tearDown(self):
+        for ruta in [self.archivo] + self.auxiliares:
+            if os.path.exists(ruta):
+                os.unlink(ruta)
+    
+    def _crear(self, **opciones):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return SistemaExpertoDL(self.archivo, textos_mapeados=True, **opciones)
+    
+    def test_accesos_compatibles(self):
+        """Las reglas con textos diferidos deben leerse igual que los diccionarios originales"""
+        sistema = self._crear()
+        self.assertIsInstance(sistema.reglas[0], ReglaDiferida)
+        for regla, original in zip(sistema.reglas, self.reglas):
+            self.assertEqual(regla, original)
+        self.assertEqual(sistema.reglas[0]["autor"], "equipo de pruebas")
+    
+    def test_textos_leidos_solo_al_coincidir(self):
+        """Solo se decodifican los textos de las reglas que se cumplen"""
+        sistema = self._crear()
+        hechos = {"tipo_datos": "texto", "tarea": "clasificacion"}
+        esperadas = inferir_lineal(self.reglas, hechos)
+        with mock.patch.object(AlmacenTextos, "texto", autospec=True,
+                               side_effect=AlmacenTextos.texto) as texto:
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(sistema.inferir(hechos), esperadas)
+        # Recomendacion y justificacion para el resultado, mas la recomendacion impresa
+        self.assertEqual(texto.call_count, 3 * len(esperadas))
+    
+    def test_inferencia_igual(self):
+        """Los resultados no deben depender de donde se guardan los textos"""
+        for nombre in MOTORES:
+            with self.subTest(motor=nombre):
+                sistema = self._crear(motor=nombre)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    for semilla in range(40):
+                        hechos = generar_hechos_aleatorios(semilla)
+                        self.assertEqual(sistema.inferir(hechos), inferir_lineal(self.reglas, hechos))
+                self.assertEqual(sistema.inferir_lote([{}])[0], inferir_lineal(self.reglas, {}))
+    
+    def test_guardar_y_agregar(self):
+        """Guardar debe producir el mismo JSON y las reglas nuevas deben poder consultarse"""
+        sistema = self._crear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(sistema.agregar_regla({"tipo_datos": "audio"}, "Nueva", "Justificacion", 0.6))
+        self.assertEqual(sistema.reglas[-1]["recomendacion"], "Nueva")
+        
+        with open(self.archivo, 'r', encoding='utf-8') as f:
+            guardadas = json.load(f)["reglas"]
+        self.assertEqual(guardadas[:-1], self.reglas)
+        self.assertEqual(self._crear().reglas, guardadas)
+    
+    def test_con_cache_binaria(self):
+        """La cache binaria vuelve a abrir el archivo de textos y se descarta si este cambio"""
+        self._crear(cache_binaria=True)
+        with mock.patch.object(SistemaExpertoDL, "_cargar_reglas_desde_json") as cargar:
+            sistema = self._crear(cache_binaria=True)
+        cargar.assert_not_called()
+        self.assertEqual(sistema.reglas, self.reglas)
+        
+        with open(self.auxiliares[0], 'ab') as f:
+            f.write(b"basura")
+        sistema = self._crear(cache_binaria=True)
+        self.assertEqual(sistema.reglas, self.reglas)
+    
+    def test_memoria_con_tracemalloc(self):
+        """Con textos largos y distintos, las reglas diferidas deben retener mucha menos memoria"""
+        reglas = generar_reglas_aleatorias(3000, semilla=22)
+        for regla in reglas:
+            regla["justificacion"] = f"Justificacion detallada de la regla {regla['id']}. " * 40
+        archivo = crear_base_temporal(reglas)
+        del reglas
+        
+        def memoria_retenida(**opciones):
+            gc.collect()
+            tracemalloc.start()
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    sistema = SistemaExpertoDL(archivo, motor="lineal", **opciones)
+                return tracemalloc.get_traced_memory()[0]
+            finally:
+                tracemalloc.stop()
+        
+        try:
+            compacta = memoria_retenida(reglas_compactas=True)
+            mapeada = memoria_retenida(textos_mapeados=True)
+        finally:
+            for ruta in (archivo, os.path.splitext(archivo)[0] + ".textos.bin"):
+                os.unlink(ruta)
+        print(f"\nMemoria retenida: compacta={compacta} B, textos mapeados={mapeada} B")
+        self.assertLess(mapeada, compacta * 0.5)
+
+
+class TestDiarioReglas(unittest.TestCase):
+    """Pruebas del diario de solo anexado para reglas agregadas"""
+    
+    def setUp(self):
+        self.reglas = generar_reglas_aleatorias(200, semilla=31)
+        self.archivo = crear_base_temporal(self.reglas)
+        base = os.path.splitext(self.archivo)[0]
+        self.archivo_diario = base + ".diario.jsonl"
+        self.auxiliares = [self.archivo_diario, base + ".cache.pkl"]
+        with open(self.archivo, 'rb') as f:
+            self.contenido_original = f.read()
+    
+    def tearDown(self):
+        for ruta in [self.archivo] + self.auxiliares:
+            if os.path.exists(ruta):
+                os.unlink(ruta)
+    
+    def _crear(self, **opciones):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return SistemaExpertoDL(self.archivo, diario=True, **opciones)
+    
+    def _agregar(self, sistema, cantidad):
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(cantidad):
+                condiciones = {"tipo_datos": "audio", "tarea": ATRIBUTOS_PRUEBA["tarea"][i % 3]}
+                self.assertTrue(sistema.agregar_regla(condiciones, f"Nueva {i}", "Diario", 0.95))
+                self.reglas.append({"id": sistema.reglas[-1]["id"], "condiciones": condiciones,
+                                    "recomendacion": f"Nueva {i}", "justificacion": "Diario",
+                                    "confianza": 0.95})
+    
+    def _comprobar(self, sistema):
+        self.assertEqual(sistema.reglas, self.reglas)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for semilla in range(30):
+                hechos = generar_hechos_aleatorios(semilla)
+                self.assertEqual(sistema.inferir(hechos), inferir_lineal(self.reglas, hechos))
+    
+    def test_agregar_no_reescribe_la_base(self):
+        """Las reglas nuevas se anexan al diario y se recuperan al volver a cargar"""
+        sistema = self._crear()
+        self._agregar(sistema, 5)
+        with open(self.archivo, 'rb') as f:
+            self.assertEqual(f.read(), self.contenido_original)
+        with open(self.archivo_diario, 'r', encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 5)
+        self.assertEqual([regla["id"] for regla in sistema.reglas[-5:]], list(range(201, 206)))
+        self._comprobar(sistema)
+        self._comprobar(self._crear())
+        # Sin el modo diario tambien se aplica el diario pendiente
+        with contextlib.redirect_stdout(io.StringIO()):
+            self._comprobar(SistemaExpertoDL(self.archivo))
+    
+    def test_reproduccion_idempotente(self):
+        """Repetir entradas o actualizar una regla existente no duplica reglas"""
+        sistema = self._crear()
+        self._agregar(sistema, 2)
+        actualizada = dict(self.reglas[3], confianza=0.99)
+        self.reglas[3] = actualizada
+        with open(self.archivo_diario, 'r', encoding='utf-8') as f:
+            lineas = f.readlines()
+        with open(self.archivo_diario, 'a', encoding='utf-8') as f:
+            f.writelines(lineas)
+            f.write(json.dumps({"operacion": "guardar", "regla": actualizada}) + "\n")
+        self._comprobar(self._crear())
+    
+    def test_escritura_interrumpida(self):
+        """Una ultima linea incompleta se descarta sin perder las anteriores ni las siguientes"""
+        sistema = self._crear()
+        self._agregar(sistema, 2)
+        with open(self.archivo_diario, 'a', encoding='utf-8') as f:
+            f.write('{"operacion": "guardar", "regla": {"id": 999, "condic')
+        with open(self.archivo_diario, 'rb') as f:
+            contenido = f.read()
+        
+        sistema = self._crear()
+        self._comprobar(sistema)
+        # Leer el diario no lo recorta: la linea puede ser de un escritor que aun no termina
+        with open(self.archivo_diario, 'rb') as f:
+            self.assertEqual(f.read(), contenido)
+        self._agregar(sistema, 1)
+        self._comprobar(self._crear())
+    
+    def test_compactar(self):
+        """La compactacion vuelca el diario al JSON principal y lo elimina"""
+        sistema = self._crear()
+        self._agregar(sistema, 3)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(sistema.compactar_diario())
+        self.assertFalse(os.path.exists(self.archivo_diario))
+        with open(self.archivo, 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f)["reglas"], self.reglas)
+        self._comprobar(self._crear())
+    
+    def test_interrupcion_durante_compactar(self):
+        """Si el diario no llega a borrarse tras reescribir la base, reproducirlo no duplica reglas"""
+        sistema = self._crear()
+        self._agregar(sistema, 3)
+        with mock.patch("almacenamiento.DiarioReglas.eliminar"):
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertTrue(sistema.compactar_diario())
+        self.assertTrue(os.path.exists(self.archivo_diario))
+        self._comprobar(self._crear())
+    
+    def test_fallo_al_guardar_conserva_la_base(self):
+        """Un error a mitad de la escritura deja intacto el archivo anterior"""
+        sistema = self._crear()
+        self._agregar(sistema, 1)
+        with mock.patch("sistema_experto.json.dump", side_effect=OSError("disco lleno")):
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertFalse(sistema.compactar_diario())
+        with open(self.archivo, 'rb') as f:
+            self.assertEqual(f.read(), self.contenido_original)
+        directorio = os.path.dirname(self.archivo)
+        nombre = os.path.basename(self.archivo)
+        self.assertFalse([n for n in os.listdir(directorio) if n.startswith(f".{nombre}.")])
+        self._comprobar(self._crear())
+    
+    def test_con_cache_binaria(self):
+        """Las reglas del diario invalidan la cache binaria escrita antes de anexarlas"""
+        sistema = self._crear(cache_binaria=True)
+        self._agregar(sistema, 2)
+        self._comprobar(self._crear(cache_binaria=True))
+        with mock.patch.object(SistemaExpertoDL, "_cargar_reglas_desde_json") as cargar:
+            sistema = self._crear(cache_binaria=True)
+        cargar.assert_not_called()
+        self._comprobar(sistema)
+
+
+class TestAgregarReglasLote(unittest.TestCase):
+    """Pruebas de la importacion de muchas reglas con una sola escritura"""
+    
+    def setUp(self):
+        self.reglas = generar_reglas_aleatorias(100, semilla=41)
+        self.archivo = crear_base_temporal(self.reglas)
+        self.nuevas = generar_reglas_aleatorias(500, semilla=42)
+        for regla in self.nuevas:
+            del regla["id"]
+        
+    def tearDown(self):
+        if os.path.exists(self.archivo):
+            os.unlink(self.archivo)
+    
+    def test_una_escritura_e_indices_actualizados(self):
+        """El lote se guarda con una unica escritura y queda consultable con cualquier motor"""
+        esperadas = self.reglas + [dict({"id": 101 + i}, **regla) for i, regla in enumerate(self.nuevas)]
+        for nombre in MOTORES:
+            with self.subTest(motor=nombre):
+                with open(self.archivo, 'w', encoding='utf-8') as f:
+                    json.dump({"reglas": self.reglas}, f)
+                sistema = SistemaExpertoDL(self.archivo, motor=nombre, tabla_respuestas="perezosa")
+                with mock.patch("sistema_experto.escribir_atomicamente",
+                                wraps=escribir_atomicamente) as escribir:
+                    self.assertTrue(sistema.agregar_reglas_lote(iter(self.nuevas)))
+                escribir.assert_called_once()
+                self.assertEqual(sistema.reglas, esperadas)
+                for semilla in range(30):
+                    hechos = generar_hechos_aleatorios(semilla)
+                    self.assertEqual(sistema.inferir(hechos), inferir_lineal(esperadas, hechos))
+                self.assertEqual(sistema.inferir_pagina({}, 5)[0], inferir_lineal(esperadas, {})[:5])
+                with open(self.archivo, 'r', encoding='utf-8') as f:
+                    self.assertEqual(json.load(f)["reglas"], esperadas)
+                sistema.agregar_regla({}, "Despues del lote", "Prueba", 0.5)
+                self.assertEqual(sistema.reglas[-1]["id"], 601)
+    
+    def test_entrada_invalida_no_modifica_nada(self):
+        """Si alguna regla es invalida no se agrega ninguna ni se escribe el archivo"""
+        sistema = SistemaExpertoDL(self.archivo)
+        invalidas = [
+            {"condiciones": {}, "recomendacion": "X", "justificacion": "Y"},
+            {"condiciones": [], "recomendacion": "X", "justificacion": "Y", "confianza": 0.5},
+            {"condiciones": {}, "recomendacion": "", "justificacion": "Y", "confianza": 0.5},
+            {"condiciones": {}, "recomendacion": "X", "justificacion": "Y", "confianza": 1.5},
+            {"condiciones": {}, "recomendacion": "X", "justificacion": "Y", "confianza": True},
+            {"condiciones": {"tipo_datos": ["imagenes"]}, "recomendacion": "X", "justificacion": "Y", "confianza": 0.5},
+            {"condiciones": {"tarea": {"a": 1}}, "recomendacion": "X", "justificacion": "Y", "confianza": 0.5},
+        ]
+        for invalida in invalidas:
+            with self.subTest(regla=invalida):
+                with mock.patch("sistema_experto.escribir_atomicamente") as escribir:
+                    with self.assertRaisesRegex(ValueError, "Regla 3 del lote"):
+                        sistema.agregar_reglas_lote(self.nuevas[:2] + [invalida] + self.nuevas[2:])
+                escribir.assert_not_called()
+                self.assertEqual(sistema.reglas, self.reglas)
+                self.assertEqual(sistema.inferir_lote([{}]), [inferir_lineal(self.reglas, {})])
+        sistema.agregar_regla({}, "Nueva", "Prueba", 0.5)
+        self.assertEqual(sistema.reglas[-1]["id"], 101)
+
+
+class TestReglasPorId(unittest.TestCase):
+    """Pruebas de la consulta, modificacion y eliminacion de reglas por id"""
+    
+    def setUp(self):
+        self.reglas = generar_reglas_aleatorias(300, semilla=51)
+        self.archivo = crear_base_temporal(self.reglas)
+        base = os.path.splitext(self.archivo)[0]
+        self.auxiliares = [base + ".diario.jsonl", base + ".tabla.json", base + ".ids.json"]
+        
+    def tearDown(self):
+        for ruta in [self.archivo] + self.auxiliares:
+            if os.path.exists(ruta):
+                os.unlink(ruta)
+    
+    def _crear(self, **opciones):
+        with open(self.archivo, 'w', encoding='utf-8') as f:
+            json.dump({"reglas": self.reglas}, f)
+        for ruta in self.auxiliares:
+            if os.path.exists(ruta):
+                os.unlink(ruta)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return SistemaExpertoDL(self.archivo, **opciones)
+    
+    def _comprobar(self, sistema, esperadas):
+        self.assertEqual(sistema.reglas, esperadas)
+        self.assertEqual(sistema.cantidad_reglas(), len(esperadas))
+        consultas = [generar_hechos_aleatorios(semilla) for semilla in range(25)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            for hechos in consultas:
+                self.assertEqual(sistema.inferir(hechos), inferir_lineal(esperadas, hechos))
+                self.assertEqual(sistema.inferir(hechos, top_k=5), inferir_lineal(esperadas, hechos)[:5])
+        self.assertEqual(sistema.inferir_lote(consultas), [inferir_lineal(esperadas, h) for h in consultas])
+        emparejador = sistema.crear_emparejador()
+        for atributo, valor in consultas[0].items():
+            emparejador.asignar(atributo, valor)
+        self.assertEqual(emparejador.cantidad_coincidencias(), len(inferir_lineal(esperadas, consultas[0])))
+    
+    def test_operaciones_mantienen_indices(self):
+        """Tras cada cambio, todos los motores y la tabla coinciden con la evaluacion lineal"""
+        azar = random.Random(52)
+        configuraciones = [{"motor": nombre} for nombre in MOTORES] + [
+            {"tabla_respuestas": "completa"}, {"tabla_respuestas": "perezosa", "reglas_compactas": True}]
+        for opciones in configuraciones:
+            with self.subTest(**opciones):
+                sistema = self._crear(**opciones)
+                sistema.inferir_pagina({}, 1)
+                esperadas = [dict(regla) for regla in self.reglas]
+                with contextlib.redirect_stdout(io.StringIO()), \
+                        mock.patch.object(SistemaExpertoDL, "guardar_reglas_en_json", return_value=True):
+                    for _ in range(120):
+                        posicion = azar.randrange(len(esperadas))
+                        regla_id = esperadas[posicion]["id"]
+                        self.assertEqual(sistema.obtener_regla(regla_id), esperadas[posicion])
+                        if azar.random() < 0.5:
+                            self.assertTrue(sistema.eliminar_regla(regla_id))
+                            del esperadas[posicion]
+                            self.assertIsNone(sistema.obtener_regla(regla_id))
+                        else:
+                            cambios = {"confianza": azar.choice([0.5, 0.7, 0.8, 0.9])}
+                            if azar.random() < 0.5:
+                                cambios["condiciones"] = generar_hechos_aleatorios(azar.random())
+                            self.assertTrue(sistema.actualizar_regla(regla_id, **cambios))
+                            esperadas[posicion].update(cambios)
+                        if azar.random() < 0.2:
+                            sistema.agregar_regla({"tipo_datos": "audio"}, "Nueva", "Prueba", 0.8)
+                            esperadas.append({"id": sistema.reglas[-1]["id"], "condiciones": {"tipo_datos": "audio"},
+                                              "recomendacion": "Nueva", "justificacion": "Prueba",
+                                              "confianza": 0.8})
+                # Con mas de 64 eliminaciones los huecos ya se compactaron al menos una vez
+                self.assertLessEqual(len(sistema._reglas) - len(esperadas), 64)
+                self._comprobar(sistema, esperadas)
+    
+    def test_ids_no_se_reutilizan(self):
+        """Eliminar la ultima regla no hace que su id se asigne de nuevo"""
+        sistema = self._crear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(sistema.eliminar_regla(300))
+            self.assertTrue(sistema.agregar_regla({}, "Nueva", "Prueba", 0.5))
+        self.assertEqual(sistema.reglas[-1]["id"], 301)
+        self.assertIsNone(sistema.obtener_regla(300))
+        with open(self.archivo, 'r', encoding='utf-8') as f:
+            self.assertEqual([regla["id"] for regla in json.load(f)["reglas"]][-2:], [299, 301])
+        
+        # Tampoco tras reiniciar, aunque el id eliminado fuera el mayor del archivo
+        for opciones in ({}, {"diario": True}):
+            with self.subTest(**opciones):
+                sistema = self._crear(**opciones)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    self.assertTrue(sistema.eliminar_regla(300))
+                    sistema = SistemaExpertoDL(self.archivo, **opciones)
+                    self.assertTrue(sistema.agregar_regla({}, "Nueva", "Prueba", 0.5))
+                self.assertEqual(sistema.reglas[-1]["id"], 301)
+    
+    def test_reglas_solo_lectura(self):
+        """Asignar la lista de reglas dejaria motor, tabla y cache desactualizados: no se permite"""
+        sistema = self._crear()
+        with self.assertRaises(AttributeError):
+            sistema.reglas = []
+        self.assertEqual(sistema.reglas, self.reglas)
+    
+    def test_reglas_es_una_copia(self):
+        """Modificar la lista devuelta por reglas no afecta la inferencia, haya o no reglas eliminadas"""
+        sistema = self._crear()
+        hechos = {"tipo_datos": "imagenes"}
+        for eliminar in (False, True):
+            with self.subTest(eliminar=eliminar):
+                if eliminar:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        sistema.eliminar_regla(sistema.reglas[0]["id"])
+                esperadas = sistema.reglas
+                with contextlib.redirect_stdout(io.StringIO()):
+                    antes = sistema.inferir(hechos)
+                copia = sistema.reglas
+                copia.sort(key=lambda regla: regla["confianza"])
+                copia.append({"id": 999, "condiciones": {}, "recomendacion": "Intrusa",
+                              "justificacion": "Test", "confianza": 1.0})
+                with contextlib.redirect_stdout(io.StringIO()):
+                    self.assertEqual(sistema.inferir(hechos), antes)
+                self.assertEqual(sistema.reglas, esperadas)
+    
+    def test_id_inexistente_y_datos_invalidos(self):
+        """Un id desconocido o un cambio invalido no modifican la base"""
+        sistema = self._crear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertFalse(sistema.actualizar_regla(999, confianza=0.5))
+            self.assertFalse(sistema.eliminar_regla(999))
+        with self.assertRaises(ValueError):
+            sistema.actualizar_regla(5, confianza=2)
+        self._comprobar(sistema, self.reglas)
+    
+    def test_cambios_en_el_diario(self):
+        """Modificaciones y eliminaciones se anexan al diario y se reproducen al cargar"""
+        sistema = self._crear(diario=True)
+        esperadas = [dict(regla) for regla in self.reglas]
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(sistema.actualizar_regla(10, recomendacion="Editada"))
+            self.assertTrue(sistema.eliminar_regla(20))
+            self.assertTrue(sistema.agregar_regla({}, "Nueva", "Prueba", 0.5))
+            recargado = SistemaExpertoDL(self.archivo)
+        esperadas[9]["recomendacion"] = "Editada"
+        del esperadas[19]
+        esperadas.append({"id": 301, "condiciones": {}, "recomendacion": "Nueva",
+                          "justificacion": "Prueba", "confianza": 0.5})
+        with open(self.auxiliares[0], 'r', encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 3)
+        self._comprobar(recargado, esperadas)
+
+
+class TestGuardadoIncremental(unittest.TestCase):
+    """Pruebas de la escritura regla por regla de la base de conocimiento"""
+    
+    def setUp(self):
+        self.reglas = generar_reglas_aleatorias(2000, semilla=61)
+        self.reglas[0]["autor"] = {"nombre": "equipo", "etiquetas": ["a", 1, 2.5, None, True], "vacio": {}}
+        self.reglas[1]["justificacion"] = "Señal con \"comillas\", saltos\nde línea y \x01 control"
+        self.reglas[2]["condiciones"] = {}
+        self.archivo = crear_base_temporal(self.reglas)
+        self.archivo_cache = os.path.splitext(self.archivo)[0] + ".cache.pkl"
+        
+    def tearDown(self):
+        for ruta in (self.archivo, self.archivo_cache, os.path.splitext(self.archivo)[0] + ".ids.json"):
+            if os.path.exists(ruta):
+                os.unlink(ruta)
+    
+    def _leer(self):
+        with open(self.archivo, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def test_identico_a_json_dump(self):
+        """El formato por defecto es byte a byte el de json.dump con indent=2"""
+        for compactas in (False, True):
+            with self.subTest(compactas=compactas):
+                sistema = SistemaExpertoDL(self.archivo, reglas_compactas=compactas)
+                esperado = json.dumps({"reglas": sistema.reglas}, indent=2, ensure_ascii=False, default=regla_a_json)
+                self.assertTrue(sistema.guardar_reglas_en_json())
+                self.assertEqual(self._leer(), esperado)
+        
+        with open(self.archivo, 'w', encoding='utf-8') as f:
+            json.dump({"reglas": []}, f)
+        sistema = SistemaExpertoDL(self.archivo)
+        self.assertTrue(sistema.guardar_reglas_en_json())
+        self.assertEqual(self._leer(), json.dumps({"reglas": []}, indent=2))
+    
+    def test_formato_compacto(self):
+        """El formato compacto no lleva sangria ni espacios y se vuelve a cargar igual"""
+        sistema = SistemaExpertoDL(self.archivo, json_compacto=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            sistema.eliminar_regla(5)
+        del self.reglas[4]
+        contenido = self._leer()
+        self.assertEqual(contenido, json.dumps({"reglas": self.reglas}, ensure_ascii=False, separators=(",", ":")))
+        self.assertEqual(json.loads(contenido)["reglas"], self.reglas)
+        self.assertEqual(SistemaExpertoDL(self.archivo).reglas, self.reglas)
+
+
+class TestCargaIncremental(unittest.TestCase):
+    """Pruebas de la lectura regla por regla de la base de conocimiento"""
+    
+    def setUp(self):
+        self.reglas = generar_reglas_aleatorias(300, semilla=71)
+        self.reglas[0]["autor"] = {"nombre": "equipo", "etiquetas": ["a", 1, 2.5e-3, None, True]}
+        self.reglas[1]["justificacion"] = "Señal con \"comillas\", saltos\nde línea y 😀"
+        self.reglas[2]["confianza"] = 0.123456789
+        self.archivo = crear_base_temporal(self.reglas)
+        
+    def tearDown(self):
+        if os.path.exists(self.archivo):
+            os.unlink(self.archivo)
+    
+    def test_igual_a_json_load(self):
+        """Cualquier tamano de bloque produce las mismas reglas que json.load, en ambos formatos"""
+        documentos = {
+            "indentado": json.dumps({"version": 2, "reglas": self.reglas, "notas": [1, {"a": "}"}]},
+                                    indent=2, ensure_ascii=False),
+            "compacto": json.dumps({"reglas": self.reglas}, ensure_ascii=False, separators=(",", ":")),
+            "vacio": '{"reglas": []}'
+        }
+        for nombre, texto in documentos.items():
+            for tamano_bloque in (1, 5, 4096):
+                with self.subTest(documento=nombre, tamano_bloque=tamano_bloque):
+                    leidas = list(leer_reglas_json(io.StringIO(texto), tamano_bloque))
+                    self.assertEqual(leidas, json.loads(texto)["reglas"])
+    
+    def test_json_invalido(self):
+        """Los documentos mal formados o sin "reglas" se rechazan con ValueError"""
+        for texto in ('{}', '[]', '{"reglas": [1,]}', '{"reglas": [{"a": 1}', '{"reglas": []} x', ''):
+            with self.subTest(texto=texto):
+                with self.assertRaises(ValueError):
+                    list(leer_reglas_json(io.StringIO(texto), 3))
+        
+        with open(self.archivo, 'w', encoding='utf-8') as f:
+            f.write('{"reglas": [{"id": 1, "condiciones": {}')
+        with contextlib.redirect_stdout(io.StringIO()):
+            sistema = SistemaExpertoDL(self.archivo)
+        self.assertEqual(sistema.reglas, sistema._cargar_reglas_por_defecto())
+    
+    def test_representaciones_construidas_al_leer(self):
+        """Las reglas compactas y con textos mapeados se cargan igual que con json.load"""
+        for opciones in ({}, {"reglas_compactas": True}, {"textos_mapeados": True}):
+            with self.subTest(**opciones):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    sistema = SistemaExpertoDL(self.archivo, **opciones)
+                self.assertEqual([regla_a_json(regla) if isinstance(regla, Regla) else regla
+                                  for regla in sistema.reglas], self.reglas)
+        textos = os.path.splitext(self.archivo)[0] + ".textos.bin"
+        if os.path.exists(textos):
+            os.unlink(textos)
+    
+    def test_memoria_con_tracemalloc(self):
+        """Cargando reglas compactas, la memoria maxima queda por debajo de la de json.load"""
+        with open(self.archivo, 'w', encoding='utf-8') as f:
+            json.dump({"reglas": generar_reglas_aleatorias(20000, semilla=72)}, f, separators=(",", ":"))
+        
+        def pico(cargar):
+            gc.collect()
+            tracemalloc.start()
+            try:
+                with open(self.archivo, 'r', encoding='utf-8') as f:
+                    reglas = cargar(f)
+                return tracemalloc.get_traced_memory()[1], reglas
+            finally:
+                tracemalloc.stop()
+        
+        pico_load, esperadas = pico(lambda f: CompiladorReglas().compilar_todas(json.load(f)["reglas"]))
+        pico_incremental, reglas = pico(lambda f: CompiladorReglas().compilar_todas(leer_reglas_json(f)))
+        print(f"\nCarga json.load: {pico_load / 1024:.0f} KiB, incremental: {pico_incremental / 1024:.0f} KiB")
+        self.assertEqual(reglas, esperadas)
+        self.assertLess(pico_incremental, pico_load * 0.7)
+
+
+class TestRecargaEnCaliente(unittest.TestCase):
+    """Pruebas de la recarga en segundo plano cuando el archivo de reglas cambia"""
+    
+    def setUp(self):
+        self.archivo = crear_base_temporal(self._version("A", 200))
+        
+    def tearDown(self):
+        base = os.path.splitext(self.archivo)[0]
+        for ruta in (self.archivo, base + ".diario.jsonl", base + ".ids.json"):
+            if os.path.exists(ruta):
+                os.unlink(ruta)
+    
+    def _version(self, nombre, cantidad):
+        """Reglas que se cumplen todas con los mismos hechos y llevan el nombre de su version"""
+        reglas = generar_reglas_aleatorias(cantidad, semilla=81)
+        for regla in reglas:
+            regla["condiciones"] = {"tipo_datos": "imagenes"}
+            regla["recomendacion"] = f"{nombre} {regla['id']}"
+        return reglas
+    
+    def _publicar(self, reglas):
+        """Reemplaza el archivo como lo haria otro proceso"""
+        escribir_atomicamente(self.archivo, lambda f: json.dump({"reglas": reglas}, f))
+    
+    def test_recarga_solo_si_cambia(self):
+        """Los cambios externos se cargan; los propios (con o sin diario) no provocan recarga"""
+        for diario in (False, True):
+            with self.subTest(diario=diario):
+                self._publicar(self._version("A", 200))
+                with contextlib.redirect_stdout(io.StringIO()):
+                    sistema = SistemaExpertoDL(self.archivo, diario=diario)
+                    self.assertFalse(sistema.recargar_si_cambio())
+                    sistema.agregar_regla({"tipo_datos": "texto"}, "Propia", "Test", 0.5)
+                    self.assertFalse(sistema.recargar_si_cambio())
+                    
+                    self._publicar(self._version("B", 150))
+                    self.assertTrue(sistema.recargar_si_cambio())
+                    self.assertFalse(sistema.recargar_si_cambio())
+                # El diario pendiente se vuelve a aplicar sobre el archivo nuevo
+                tecnicas = [regla["recomendacion"] for regla in sistema.reglas]
+                self.assertEqual(len(tecnicas), 151 if diario else 150)
+                self.assertEqual(tecnicas[0], "B 1")
+                self.assertEqual("Propia" in tecnicas, diario)
+    
+    def test_archivo_invalido_conserva_reglas(self):
+        """Un archivo ilegible no reemplaza a las reglas en uso ni se reintenta hasta que vuelva a cambiar"""
+        sistema = SistemaExpertoDL(self.archivo)
+        with open(self.archivo, 'w', encoding='utf-8') as f:
+            f.write('{"reglas": [{"id": 1')
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaises(ValueError):
+                sistema.recargar_si_cambio()
+        self.assertFalse(sistema.recargar_si_cambio())
+        self.assertEqual(sistema.cantidad_reglas(), 200)
+    
+    def test_edicion_durante_la_carga(self):
+        """Si se edita una regla mientras se carga, lo leido se descarta en lugar de pisar la edicion"""
+        sistema = SistemaExpertoDL(self.archivo, diario=True)
+        cargar = sistema._cargar_estado
+        
+        def cargar_con_edicion(estricto):
+            estado = cargar(estricto)
+            sistema.eliminar_regla(1)
+            return estado
+        
+        self._publicar(self._version("B", 200))
+        with contextlib.redirect_stdout(io.StringIO()):
+            with mock.patch.object(sistema, "_cargar_estado", side_effect=cargar_con_edicion):
+                self.assertFalse(sistema.recargar_si_cambio())
+        self.assertIsNone(sistema.obtener_regla(1))
+    
+    def test_consultas_ven_una_sola_version(self):
+        """Mientras el hilo de vigilancia recarga, cada consulta ve solo las reglas viejas o solo las nuevas"""
+        versiones = {"A": 200, "B": 150}
+        with contextlib.redirect_stdout(io.StringIO()):
+            sistema = SistemaExpertoDL(self.archivo)
+            recargas = []
+            sistema.vigilar_cambios(intervalo=0.001, al_recargar=lambda: recargas.append(sistema.cantidad_reglas()))
+            try:
+                vistas = set()
+                limite = time.monotonic() + 10
+                while len(recargas) < 6 and time.monotonic() < limite:
+                    publicadas = len(recargas)
+                    nombre = "B" if publicadas % 2 == 0 else "A"
+                    self._publicar(self._version(nombre, versiones[nombre]))
+                    while len(recargas) == publicadas and time.monotonic() < limite:
+                        resultados = sistema.inferir({"tipo_datos": "imagenes"})
+                        nombres = {rec["tecnica"].split()[0] for rec in resultados}
+                        self.assertEqual(len(nombres), 1)
+                        self.assertEqual(len(resultados), versiones[nombres.pop()])
+                        vistas.add(len(resultados))
+            finally:
+                sistema.detener_vigilancia()
+        self.assertGreaterEqual(len(recargas), 6)
+        self.assertEqual(vistas, set(versiones.values()))
+    
+    def test_consulta_por_id_durante_recargas(self):
+        """obtener_regla nunca mezcla el indice por id de una version con las reglas de otra"""
+        # En la version B los ids estan en orden inverso: cada id cambia de posicion
+        versiones = [self._version("A", 200), self._version("B", 150)[::-1]]
+        with contextlib.redirect_stdout(io.StringIO()):
+            sistema = SistemaExpertoDL(self.archivo)
+            recargas = []
+            sistema.vigilar_cambios(intervalo=0.001, al_recargar=lambda: recargas.append(1))
+            try:
+                azar = random.Random(82)
+                limite = time.monotonic() + 10
+                while len(recargas) < 6 and time.monotonic() < limite:
+                    publicadas = len(recargas)
+                    self._publicar(versiones[publicadas % 2])
+                    while len(recargas) == publicadas and time.monotonic() < limite:
+                        regla_id = azar.randint(1, 200)
+                        regla = sistema.obtener_regla(regla_id)
+                        self.assertTrue(regla is None or regla["id"] == regla_id)
+                        self.assertIn(sistema.cantidad_reglas(), (150, 200))
+            finally:
+                sistema.detener_vigilancia()
+        self.assertGreaterEqual(len(recargas), 6)
+
+
+class TestBusquedaReglas(unittest.TestCase):
+    """Pruebas del indice de busqueda de la lista de reglas"""
+    
+    def setUp(self):
+        self.reglas = generar_reglas_aleatorias(3000, semilla=91)
+        self.reglas[0]["recomendacion"] = "Búsqueda de Imágenes con CNN"
+        self.archivo = crear_base_temporal(self.reglas)
+        
+    def tearDown(self):
+        base = os.path.splitext(self.archivo)[0]
+        for ruta in (self.archivo, base + ".diario.jsonl", base + ".ids.json"):
+            if os.path.exists(ruta):
+                os.unlink(ruta)
+    
+    @staticmethod
+    def _recorrer(reglas, recomendacion="", condiciones=()):
+        """Busqueda lineal de referencia"""
+        return [
+            regla for regla in reglas
+            if recomendacion in regla["recomendacion"].lower()
+            and all(regla["condiciones"].get(atributo) == valor for atributo, valor in condiciones)
+        ]
+    
+    def test_igual_a_recorrer_las_reglas(self):
+        """Texto, pares atributo=valor (incluso booleanos), prefijos e ids dan lo mismo que un recorrido lineal"""
+        sistema = SistemaExpertoDL(self.archivo)
+        casos = {
+            "tecnica 12": [regla for regla in self.reglas
+                           if regla["recomendacion"].startswith("Tecnica 12")],
+            "tipo_datos=texto": self._recorrer(self.reglas, condiciones=[("tipo_datos", "texto")]),
+            "TAREA=regresion tipo_datos=imag": self._recorrer(
+                self.reglas, condiciones=[("tarea", "regresion"), ("tipo_datos", "imagenes")]),
+            "requiere_interpretabilidad=true": self._recorrer(
+                self.reglas, condiciones=[("requiere_interpretabilidad", True)]),
+            "#25": [regla for regla in self.reglas if str(regla["id"]).startswith("25")],
+            "busqueda imagenes": [self.reglas[0]],
+            "inexistente": [],
+            "  ": self.reglas,
+        }
+        for consulta, esperadas in casos.items():
+            with self.subTest(consulta=consulta):
+                self.assertEqual(sistema.buscar_reglas(consulta), esperadas)
+    
+    def test_indice_sigue_las_ediciones(self):
+        """Las reglas agregadas o eliminadas aparecen o desaparecen de la busqueda"""
+        sistema = SistemaExpertoDL(self.archivo, diario=True)
+        self.assertEqual(sistema.buscar_reglas("transformer"), [])
+        with contextlib.redirect_stdout(io.StringIO()):
+            sistema.agregar_regla({"tipo_datos": "texto"}, "Transformer", "Test", 0.9)
+            self.assertEqual([regla["recomendacion"] for regla in sistema.buscar_reglas("transformer")],
+                             ["Transformer"])
+            sistema.eliminar_regla(1)
+        self.assertNotIn(1, [regla["id"] for regla in sistema.buscar_reglas("tecnica")])
+        self.assertEqual(len(sistema.buscar_reglas("")), len(self.reglas))
+    
+    def test_rendimiento(self):
+        """Mide la construccion del indice y una busqueda sobre 100k reglas"""
+        reglas = generar_reglas_aleatorias(100000, semilla=92)
+        inicio = time.perf_counter()
+        indice = IndiceBusqueda(reglas)
+        construccion = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        posiciones = indice.buscar("tipo_datos=audio tarea=clas")
+        busqueda = time.perf_counter() - inicio
+        print(f"\nIndice de busqueda: construccion {construccion:.2f} s, busqueda {busqueda * 1000:.1f} ms")
+        self.assertEqual([reglas[p] for p in posiciones],
+                         self._recorrer(reglas, condiciones=[("tipo_datos", "audio"), ("tarea", "clasificacion")]))
+
+
+class TestVistaPrevia(unittest.TestCase):
+    """Pruebas de las recomendaciones parciales mientras se completa el formulario"""
+    
+    def setUp(self):
+        self.reglas = generar_reglas_aleatorias(2000, semilla=101)
+        self.archivo = crear_base_temporal(self.reglas)
+        
+    def tearDown(self):
+        if os.path.exists(self.archivo):
+            os.unlink(self.archivo)
+    
+    def test_igual_a_inferir(self):
+        """Tras cada respuesta nueva, cambiada o retirada, coincide con las primeras de inferir"""
+        sistema = SistemaExpertoDL(self.archivo)
+        azar = random.Random(102)
+        hechos = {}
+        for _ in range(200):
+            atributo = azar.choice(sorted(ATRIBUTOS_PRUEBA))
+            if azar.random() < 0.3:
+                hechos.pop(atributo, None)
+            else:
+                hechos[atributo] = azar.choice(ATRIBUTOS_PRUEBA[atributo])
+            recomendaciones, posibles = sistema.vista_previa(dict(hechos))
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(recomendaciones, sistema.inferir(dict(hechos))[:3])
+            self.assertEqual(posibles, sum(
+                all(hechos.get(clave, valor) == valor for clave, valor in regla["condiciones"].items())
+                for regla in self.reglas))
+    
+    def test_reglas_modificadas(self):
+        """Una regla agregada entre dos llamadas aparece en la vista previa"""
+        sistema = SistemaExpertoDL(self.archivo)
+        hechos = {"tipo_datos": "audio"}
+        sistema.vista_previa(hechos)
+        with contextlib.redirect_stdout(io.StringIO()):
+            sistema.agregar_regla({"tipo_datos": "audio"}, "Nueva", "Test", 1.0)
+        recomendaciones, _ = sistema.vista_previa(hechos, k=1)
+        self.assertEqual(recomendaciones[0]["tecnica"], "Nueva")
+
+
+class TestCatalogoPreguntas(unittest.TestCase):
+    """Pruebas del catalogo de preguntas compartido por la consola y la interfaz grafica"""
+    
+    def setUp(self):
+        self.archivos = []
+        
+    def tearDown(self):
+        for archivo in self.archivos:
+            if os.path.exists(archivo):
+                os.unlink(archivo)
+    
+    def _recolectar(self, sistema, respuestas):
+        respuestas = iter(respuestas)
+        with mock.patch("builtins.input", lambda _: next(respuestas)), \
+                contextlib.redirect_stdout(io.StringIO()) as salida:
+            hechos = sistema.recolectar_hechos_interactivo()
+        return hechos, salida.getvalue()
+    
+    def _reglas_con_atributo_nuevo(self):
+        reglas = generar_reglas_aleatorias(50, semilla=111)
+        reglas.append({"id": 51, "condiciones": {"tipo_datos": "audio", "nivel_ruido": "alto"},
+                       "recomendacion": "Filtrado espectral", "justificacion": "Test", "confianza": 0.95})
+        reglas.append({"id": 52, "condiciones": {"tarea": "traduccion"},
+                       "recomendacion": "Transformer", "justificacion": "Test", "confianza": 0.9})
+        return reglas
+    
+    def test_base_conocimiento_cubierta(self):
+        """Cada condicion de la base incluida tiene su opcion en el catalogo base"""
+        with open("base_conocimiento.json", encoding="utf-8") as archivo:
+            reglas = json.load(archivo)["reglas"]
+        catalogo = crear_catalogo(reglas)
+        self.assertEqual(catalogo.a_json(), CATALOGO_BASE.a_json())
+        for regla in reglas:
+            for atributo, valor in regla["condiciones"].items():
+                preguntas = [p for p in catalogo.preguntas if p.atributo == atributo]
+                self.assertTrue(any(p.indice(valor) is not None for p in preguntas), (atributo, valor))
+    
+    def test_busquedas_por_etiqueta_y_valor(self):
+        """Cada etiqueta lleva a su valor y cada valor a su opcion, sin confundir True con 1"""
+        for pregunta in CATALOGO_BASE.preguntas:
+            for indice, (etiqueta, valor) in enumerate(pregunta.opciones):
+                self.assertIs(pregunta.valor(etiqueta), valor)
+                if valor is not None:
+                    self.assertEqual(pregunta.indice(valor), indice)
+        relaciones = CATALOGO_BASE.especificas("tabular")[0]
+        self.assertEqual(relaciones.indice(True), 0)
+        self.assertIsNone(relaciones.indice(1))
+    
+    def test_atributo_nuevo_en_la_base(self):
+        """Los atributos y valores nuevos de las reglas se preguntan sin cambiar codigo"""
+        catalogo = crear_catalogo(self._reglas_con_atributo_nuevo())
+        self.assertEqual([p.atributo for p in catalogo.especificas("audio")], ["tarea", "nivel_ruido"])
+        ruido = catalogo.especificas("audio")[1:]
+        self.assertEqual(ruido[0].opciones, (("Alto", "alto"),))
+        self.assertNotIn(ruido[0], catalogo.generales())
+        tarea = next(p for p in catalogo.generales() if p.atributo == "tarea")
+        self.assertEqual(tarea.valor("Traduccion"), "traduccion")
+        self.assertIn("nivel_ruido", catalogo.dominio("audio"))
+        self.assertNotIn("nivel_ruido", catalogo.dominio("texto"))
+    
+    def test_consola_pregunta_atributo_nuevo(self):
+        """La consola hace la pregunta nueva y la tabla de respuestas cubre su dominio"""
+        archivo = crear_base_temporal(self._reglas_con_atributo_nuevo())
+        self.archivos.append(archivo)
+        sistema = SistemaExpertoDL(archivo, tabla_respuestas="completa")
+        self.archivos.append(sistema._ruta_auxiliar("tabla.json"))
+        # audio, pequeno, bajo, sin tarea, tipo de audio y ruido (alto), sin interpretabilidad
+        hechos, salida = self._recolectar(sistema, ["5", "2", "2", "", "", "1", ""])
+        self.assertIn("NIVEL RUIDO", salida)
+        self.assertEqual(hechos, {"tipo_datos": "audio", "tamano_dataset": "pequeno",
+                                  "recursos_computacionales": "bajo", "nivel_ruido": "alto"})
+        self.assertIsNotNone(sistema._tabla.buscar(hechos))
+        with contextlib.redirect_stdout(io.StringIO()):
+            recomendaciones = sistema.inferir(hechos)
+        self.assertIn("Filtrado espectral", [rec["tecnica"] for rec in recomendaciones])
+    
+    def test_consola_preguntas_especificas(self):
+        """Solo se hacen las preguntas especificas del tipo elegido; una opcion sin valor no registra hechos"""
+        sistema = SistemaExpertoDL("base_conocimiento.json")
+        hechos, _ = self._recolectar(sistema, ["2", "3", "1", "1", "3", "1"])
+        self.assertEqual(hechos, {"tipo_datos": "texto", "tamano_dataset": "medio", "recursos_computacionales": "muy_bajo",
+                                  "tarea": "clasificacion", "longitud_texto": "largo",
+                                  "requiere_interpretabilidad": True})
+        # En audio, "Clasificacion de sonidos" conserva la tarea respondida antes
+        hechos, _ = self._recolectar(sistema, ["5", "1", "1", "6", "2", "2"])
+        self.assertEqual(hechos["tarea"], "reconocimiento_voz")
+        self.assertIs(hechos["requiere_interpretabilidad"], False)
+        self.assertEqual(sistema.emparejador.hechos, hechos)
+    
+    def test_catalogo_sigue_a_las_reglas(self):
+        """Una regla agregada con un valor nuevo aparece en el catalogo del sistema"""
+        archivo = crear_base_temporal(generar_reglas_aleatorias(20, semilla=112))
+        self.archivos.append(archivo)
+        sistema = SistemaExpertoDL(archivo)
+        self.assertIsNone(sistema.catalogo_preguntas().pregunta_tipo.indice("grafos"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            sistema.agregar_regla({"tipo_datos": "grafos"}, "GNN", "Test", 0.9)
+        self.assertIsNotNone(sistema.catalogo_preguntas().pregunta_tipo.indice("grafos"))
+    
+    def test_resultados_con_valor_numerico(self):
+        """Un atributo numerico tomado de las reglas se muestra en los resultados sin fallar"""
+        reglas = generar_reglas_aleatorias(20, semilla=113)
+        reglas.append({"id": 21, "condiciones": {"tipo_datos": "imagenes", "num_clases": 3},
+                       "recomendacion": "Softmax", "justificacion": "Test", "confianza": 0.9})
+        archivo = crear_base_temporal(reglas)
+        self.archivos.append(archivo)
+        sistema = SistemaExpertoDL(archivo)
+        hechos = {"tipo_datos": "imagenes", "num_clases": 3, "requiere_interpretabilidad": True}
+        with contextlib.redirect_stdout(io.StringIO()) as salida:
+            sistema.mostrar_resultados(sistema.inferir(hechos), hechos)
+        self.assertIn("Num Clases: 3", salida.getvalue())
+        self.assertIn("Requiere Interpretabilidad: Si", salida.getvalue())
+        self.assertIn("Tipo Datos: Imagenes", salida.getvalue())
+    
+    def test_dominio_de_la_tabla_acotado(self):
+        """Si los atributos de las reglas hacen crecer demasiado el dominio, esos tipos van al motor"""
+        reglas = generar_reglas_aleatorias(50, semilla=114)
+        for i in range(40):
+            reglas.append({"id": 51 + i, "condiciones": {"nivel_a": i, "nivel_b": i, "tipo_datos": "texto" if i % 2 else "audio"},
+                           "recomendacion": f"Tecnica {i}", "justificacion": "Test", "confianza": 0.5})
+        archivo = crear_base_temporal(reglas)
+        self.archivos.append(archivo)
+        sistema = SistemaExpertoDL(archivo, tabla_respuestas="completa")
+        self.archivos.append(sistema._ruta_auxiliar("tabla.json"))
+        catalogo = sistema.catalogo_preguntas()
+        self.assertGreater(catalogo.combinaciones("texto"), tabla_respuestas.MAX_COMBINACIONES)
+        self.assertEqual(sistema._tabla._particiones, {})
+        hechos = {"tipo_datos": "texto", "nivel_a": 3, "nivel_b": 3}
+        self.assertIsNone(sistema._tabla.buscar(hechos))
+        self.assertEqual(sistema.inferir(hechos), inferir_lineal(reglas, hechos))
+
+
 def ejecutar_pruebas_rapidas():
     """Función para ejecutar pruebas rápidas sin unittest"""
     print("Ejecutando pruebas rápidas...")